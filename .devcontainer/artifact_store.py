@@ -0,0 +1,142 @@
+"""Content-addressed storage and retention for playwright_executor artifacts.
+
+Screenshots are stored once under the SHA-256 of their bytes, so identical
+captures share one file. Fixed paths such as ``.screenshots/screenshot.jpeg``
+are hardlinks to the stored object (symlinks where hardlinks are not
+possible), swapped in atomically. ``prune`` keeps the store under
+``max_bytes`` and ``max_age`` by evicting the least recently used objects;
+storing an object again counts as a use. It also removes run directories
+beyond ``max_runs`` or older than ``max_age``; only directories named like
+the ones ``run_job`` creates are considered.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Run directories as playwright_executor.run_job names them:
+# "<YYYYmmdd_HHMMSS>_<random>". Anything else under runs_dir, such as the
+# HAR cache, is left alone.
+RUN_DIR_PATTERN = re.compile(r"^\d{8}_\d{6}_")
+
+
+class ArtifactStore:
+    def __init__(
+        self,
+        root: str,
+        runs_dir: Optional[str] = None,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_age: float = 7 * 24 * 3600,
+        max_runs: int = 500,
+        prune_interval: float = 60.0,
+    ):
+        self.root = Path(root)
+        self.runs_dir = Path(runs_dir) if runs_dir is not None else None
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_runs = max_runs
+        self.prune_interval = prune_interval
+        self._last_prune: Optional[float] = None
+
+        self.stored = 0
+        self.deduplicated = 0
+        self.evicted = 0
+        self.runs_removed = 0
+
+    def put(self, data: bytes, suffix: str = "") -> Path:
+        """Store ``data`` and return its path; identical bytes are stored once."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.root / digest[:2] / f"{digest[2:]}{suffix}"
+        if path.exists():
+            try:
+                # mtime doubles as the last-use time for LRU eviction.
+                os.utime(path)
+                self.deduplicated += 1
+                return path
+            except FileNotFoundError:
+                pass  # Evicted in the meantime; store it again.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.stored += 1
+        return path
+
+    def link(self, target: Path, link_path: Path):
+        """Point ``link_path`` at ``target``, replacing whatever was there."""
+        link_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = link_path.with_name(f".{link_path.name}.{os.getpid()}.{time.monotonic_ns()}")
+        try:
+            os.link(target, tmp)
+        except OSError:
+            # Different filesystem, or one without hardlinks.
+            os.symlink(os.path.abspath(target), tmp)
+        os.replace(tmp, link_path)
+
+    def maybe_prune(self, now: Optional[float] = None) -> Optional[Dict[str, int]]:
+        """``prune`` at most once per ``prune_interval``."""
+        now = time.time() if now is None else now
+        if self._last_prune is not None and now - self._last_prune < self.prune_interval:
+            return None
+        return self.prune(now)
+
+    def prune(self, now: Optional[float] = None) -> Dict[str, int]:
+        now = time.time() if now is None else now
+        self._last_prune = now
+        cutoff = now - self.max_age
+
+        objects = []
+        for path in self.root.glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            objects.append((stat.st_mtime, stat.st_size, path))
+        objects.sort()
+        total = sum(size for _, size, _ in objects)
+        evicted = 0
+        for mtime, size, path in objects:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self.evicted += evicted
+
+        runs_removed = 0
+        if self.runs_dir is not None and self.runs_dir.is_dir():
+            runs = []
+            for path in self.runs_dir.iterdir():
+                if RUN_DIR_PATTERN.match(path.name) and path.is_dir():
+                    try:
+                        runs.append((path.stat().st_mtime, path))
+                    except FileNotFoundError:
+                        continue
+            runs.sort(reverse=True)
+            for index, (mtime, path) in enumerate(runs):
+                if index >= self.max_runs or mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    runs_removed += 1
+            self.runs_removed += runs_removed
+
+        return {"evicted": evicted, "bytes": total, "runs_removed": runs_removed}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "evicted": self.evicted,
+            "runs_removed": self.runs_removed,
+        }
@@ -0,0 +1,176 @@
+"""A warm pool of Chromium browsers for playwright_executor's daemon mode.
+
+Launching Chromium costs far more than opening a ``BrowserContext`` in a
+browser that is already running, so the pool keeps ``size`` browsers up
+and every job gets a fresh, isolated context in one of them. A browser is
+retired and replaced once it has served ``max_jobs_per_browser`` jobs,
+once its processes use more than ``max_browser_memory_mb``, or once it
+disconnects. Retired browsers are closed when their last job finishes.
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from playwright.async_api import Browser, async_playwright
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+async def browser_memory_mb(browser: Browser) -> Optional[float]:
+    """Resident memory of all of ``browser``'s processes, or None if unknown.
+
+    Chromium reports its process ids over CDP; their RSS is read from /proc.
+    """
+    try:
+        session = await browser.new_browser_cdp_session()
+        try:
+            info = await session.send("SystemInfo.getProcessInfo")
+        finally:
+            await session.detach()
+    except Exception:
+        return None
+    total = 0
+    for process in info.get("processInfo", []):
+        try:
+            with open(f"/proc/{process['id']}/statm") as f:
+                total += int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, ValueError, IndexError):
+            continue
+    return total / (1024 * 1024) if total else None
+
+
+@dataclass
+class _Slot:
+    browser: Browser
+    jobs: int = 0
+    active: int = 0
+    retiring: bool = False
+    # Set while one release checks and replaces the slot, so jobs finishing
+    # together do not each launch a replacement.
+    recycling: bool = False
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        size: int = 2,
+        contexts_per_browser: int = 4,
+        max_jobs_per_browser: int = 200,
+        max_browser_memory_mb: float = 1024,
+        memory_check_every: int = 10,
+        launch_options: Optional[Dict[str, Any]] = None,
+        browser_type=None,
+    ):
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.max_jobs_per_browser = max_jobs_per_browser
+        self.max_browser_memory_mb = max_browser_memory_mb
+        self.memory_check_every = memory_check_every
+        self.launch_options = {"headless": True, **(launch_options or {})}
+        # Injectable for tests; defaults to playwright's chromium.
+        self._browser_type = browser_type
+        self._playwright = None
+        self._slots: List[_Slot] = []
+        self._retiring: List[_Slot] = []
+        self._capacity = asyncio.Semaphore(size * contexts_per_browser)
+
+        self.launched = 0
+        self.recycled = 0
+        self.jobs = 0
+
+    async def start(self):
+        if self._browser_type is None:
+            self._playwright = await async_playwright().start()
+            self._browser_type = self._playwright.chromium
+        self._slots = [_Slot(browser) for browser in await asyncio.gather(*(self._launch() for _ in range(self.size)))]
+
+    async def close(self):
+        slots, self._slots = self._slots + self._retiring, []
+        self._retiring = []
+        await asyncio.gather(*(slot.browser.close() for slot in slots), return_exceptions=True)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    @asynccontextmanager
+    async def browser(self) -> AsyncIterator[Browser]:
+        """Lend a browser for one job; open and close your own context in it."""
+        await self._capacity.acquire()
+        # No await between acquiring capacity and claiming a slot, so the
+        # least-loaded slot is guaranteed to have room.
+        slot = min(self._slots, key=lambda s: s.active)
+        slot.active += 1
+        try:
+            yield slot.browser
+        finally:
+            try:
+                await self._release(slot)
+            finally:
+                self._capacity.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "browsers": len(self._slots),
+            "retiring": len(self._retiring),
+            "active_jobs": sum(slot.active for slot in self._slots + self._retiring),
+            "jobs": self.jobs,
+            "launched": self.launched,
+            "recycled": self.recycled,
+        }
+
+    async def _launch(self) -> Browser:
+        browser = await self._browser_type.launch(**self.launch_options)
+        self.launched += 1
+        return browser
+
+    async def _release(self, slot: _Slot):
+        slot.active -= 1
+        slot.jobs += 1
+        self.jobs += 1
+        if not slot.retiring and not slot.recycling:
+            slot.recycling = True
+            try:
+                reason = await self._recycle_reason(slot)
+                if reason is not None:
+                    await self._replace(slot, reason)
+            finally:
+                slot.recycling = False
+        # close() may already have taken (and closed) every retiring slot.
+        if slot.retiring and slot.active == 0 and slot in self._retiring:
+            self._retiring.remove(slot)
+            try:
+                await slot.browser.close()
+            except Exception:
+                logger.debug("Closing a retired browser failed", exc_info=True)
+
+    async def _recycle_reason(self, slot: _Slot) -> Optional[str]:
+        if not slot.browser.is_connected():
+            return "disconnected"
+        if slot.jobs >= self.max_jobs_per_browser:
+            return f"served {slot.jobs} jobs"
+        if self.max_browser_memory_mb and slot.jobs % self.memory_check_every == 0:
+            memory = await browser_memory_mb(slot.browser)
+            if memory is not None and memory > self.max_browser_memory_mb:
+                return f"using {memory:.0f} MB"
+        return None
+
+    async def _replace(self, slot: _Slot, reason: str):
+        try:
+            replacement = _Slot(await self._launch())
+        except Exception:
+            logger.exception("Could not launch a replacement browser; keeping the current one")
+            return
+        if slot not in self._slots:
+            # The pool was closed while the replacement launched.
+            await replacement.browser.close()
+            return
+        logger.info("Recycling browser (%s)", reason)
+        self.recycled += 1
+        slot.retiring = True
+        self._slots[self._slots.index(slot)] = replacement
+        self._retiring.append(slot)
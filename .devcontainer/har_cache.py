@@ -0,0 +1,112 @@
+"""HAR record/replay for playwright_executor, so repeated runs skip the network.
+
+In ``record`` mode a job's traffic is saved as a HAR file, one per cache
+key; in ``replay`` mode requests are answered from that file through
+``BrowserContext.route_from_har``. ``auto`` replays when a fresh recording
+exists and records otherwise. The key is the page URL, normalized
+(``url``), the URL without its query string (``path``), or the URL plus a
+hash of the script (``script``). Recordings older than ``max_age`` seconds
+are stale; ``refresh`` re-records regardless.
+"""
+import hashlib
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+HAR_MODES = ("off", "record", "replay", "auto")
+HAR_KEYS = ("url", "path", "script")
+NOT_FOUND = ("abort", "fallback")
+
+
+def cache_key(url: str, script: str = "", key: str = "url") -> str:
+    if key not in HAR_KEYS:
+        raise ValueError(f"Unknown HAR cache key {key!r}")
+    parts = urlsplit(url)
+    query = "" if key == "path" else urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+    if key == "script":
+        normalized += " " + hashlib.sha256(script.encode("utf-8")).hexdigest()
+    return normalized
+
+
+@dataclass
+class HarPlan:
+    mode: str
+    key: str
+    path: Path
+    not_found: str = "abort"
+    recording: Optional[Path] = None
+
+    async def attach(self, context):
+        if self.mode == "replay":
+            await context.route_from_har(str(self.path), not_found=self.not_found)
+        else:
+            # Playwright writes the HAR when the context closes; commit() moves
+            # it into place so readers never see a partial recording.
+            self.recording = self.path.with_name(f".{self.path.stem}.{os.getpid()}.{time.monotonic_ns()}.har")
+            await context.route_from_har(str(self.recording), update=True, update_content="embed",
+                                         update_mode="minimal")
+
+    def commit(self):
+        if self.recording is not None and self.recording.exists():
+            os.replace(self.recording, self.path)
+
+    def discard(self):
+        if self.recording is not None and self.recording.exists():
+            self.recording.unlink()
+
+    def describe(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "key": self.key, "path": str(self.path)}
+
+
+class HarCache:
+    def __init__(self, root: str, key: str = "url", max_age: Optional[float] = None, not_found: str = "abort"):
+        if not_found not in NOT_FOUND:
+            raise ValueError(f"Unknown not_found behaviour {not_found!r}")
+        self.root = Path(root)
+        self.key = key
+        self.max_age = max_age
+        self.not_found = not_found
+
+    def path_for(self, key: str) -> Path:
+        host = re.sub(r"[^A-Za-z0-9.-]+", "_", urlsplit(key).netloc) or "local"
+        return self.root / f"{host}_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:24]}.har"
+
+    def is_fresh(self, path: Path, now: Optional[float] = None) -> bool:
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return self.max_age is None or (time.time() if now is None else now) - mtime <= self.max_age
+
+    def plan(self, mode: str, url: str, script: str = "", refresh: bool = False) -> Optional[HarPlan]:
+        """How a job should use the cache, or None when mode is ``off``."""
+        if mode not in HAR_MODES:
+            raise ValueError(f"Unknown HAR mode {mode!r}")
+        if mode == "off":
+            return None
+        key = cache_key(url, script, self.key)
+        path = self.path_for(key)
+        if mode == "replay" or (mode == "auto" and not refresh and self.is_fresh(path)):
+            if not path.exists():
+                raise FileNotFoundError(f"No HAR recorded for {key}; run with --har-mode record or auto first")
+            return HarPlan("replay", key, path, self.not_found)
+        self.root.mkdir(parents=True, exist_ok=True)
+        return HarPlan("record", key, path, self.not_found)
+
+
+def plan_from_options(options: Optional[Dict[str, Any]], url: str, script: str) -> Optional[HarPlan]:
+    """A plan from a job's ``har`` options, as sent to the daemon."""
+    if not options or options.get("mode", "off") == "off":
+        return None
+    cache = HarCache(
+        options["dir"],
+        key=options.get("key", "url"),
+        max_age=options.get("max_age"),
+        not_found=options.get("not_found", "abort"),
+    )
+    return cache.plan(options["mode"], url, script, refresh=options.get("refresh", False))
@@ -0,0 +1,187 @@
+"""Page load audits for playwright_executor's ``--audit`` mode.
+
+An init script registers PerformanceObservers before any page script runs,
+so LCP, CLS (largest session window) and long tasks are buffered from the
+start. After the load, Navigation Timing, FCP and per-request transfer
+sizes come from the Performance API, and the JS heap from the Chrome
+DevTools Protocol. ``summarize`` takes the median of several runs, and
+``compare`` checks a summary against a stored baseline.
+"""
+import statistics
+from typing import Any, Dict, List, Optional, Tuple
+
+OBSERVERS_SCRIPT = """
+(() => {
+  const audit = window.__perfAudit = {lcp: null, lcpElement: null, cls: 0, longTasks: []};
+  const observe = (type, callback) => {
+    try {
+      new PerformanceObserver(list => list.getEntries().forEach(callback)).observe({type, buffered: true});
+    } catch (e) {}
+  };
+  observe('largest-contentful-paint', entry => {
+    audit.lcp = entry.startTime;
+    audit.lcpElement = entry.element ? entry.element.tagName.toLowerCase() : null;
+  });
+  let windowValue = 0, windowStart = 0, lastShift = 0;
+  observe('layout-shift', entry => {
+    if (entry.hadRecentInput) return;
+    if (windowValue && entry.startTime - lastShift < 1000 && entry.startTime - windowStart < 5000) {
+      windowValue += entry.value;
+    } else {
+      windowValue = entry.value;
+      windowStart = entry.startTime;
+    }
+    lastShift = entry.startTime;
+    audit.cls = Math.max(audit.cls, windowValue);
+  });
+  observe('longtask', entry => audit.longTasks.push({start_ms: entry.startTime, duration_ms: entry.duration}));
+})();
+"""
+
+COLLECT_SCRIPT = """
+() => {
+  const audit = window.__perfAudit || {};
+  const nav = performance.getEntriesByType('navigation')[0];
+  const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+  return {
+    navigation: nav ? {
+      ttfb_ms: nav.responseStart,
+      dom_interactive_ms: nav.domInteractive,
+      dom_content_loaded_ms: nav.domContentLoadedEventEnd,
+      load_ms: nav.loadEventEnd,
+      transfer_bytes: nav.transferSize,
+    } : null,
+    fcp_ms: fcp ? fcp.startTime : null,
+    lcp_ms: audit.lcp ?? null,
+    lcp_element: audit.lcpElement ?? null,
+    cls: audit.cls ?? null,
+    long_tasks: audit.longTasks || [],
+    resources: performance.getEntriesByType('resource').map(r => ({
+      url: r.name,
+      type: r.initiatorType,
+      transfer_bytes: r.transferSize,
+      body_bytes: r.encodedBodySize,
+      duration_ms: r.duration,
+    })),
+  };
+}
+"""
+
+# Compared metrics: (tolerated relative increase, smallest increase that
+# counts). The absolute floor keeps tiny values from flagging on noise.
+# For all of them lower is better.
+DEFAULT_THRESHOLDS: Dict[str, Tuple[float, float]] = {
+    "ttfb_ms": (0.25, 50),
+    "fcp_ms": (0.15, 50),
+    "lcp_ms": (0.15, 50),
+    "dom_content_loaded_ms": (0.15, 50),
+    "load_ms": (0.15, 50),
+    "cls": (0.25, 0.02),
+    "total_blocking_time_ms": (0.25, 30),
+    "js_heap_used_mb": (0.15, 1),
+    "transfer_kb": (0.05, 5),
+    "script_kb": (0.05, 5),
+    "requests": (0.10, 1),
+}
+
+
+async def prepare(context):
+    """Register the observers; call before the context opens its pages."""
+    await context.add_init_script(OBSERVERS_SCRIPT)
+
+
+async def js_heap_mb(context, page) -> Optional[Dict[str, float]]:
+    """Used and total JS heap over CDP, or None outside Chromium."""
+    try:
+        session = await context.new_cdp_session(page)
+        try:
+            await session.send("Performance.enable")
+            response = await session.send("Performance.getMetrics")
+        finally:
+            await session.detach()
+    except Exception:
+        return None
+    values = {metric["name"]: metric["value"] for metric in response.get("metrics", [])}
+    if "JSHeapUsedSize" not in values:
+        return None
+    return {
+        "used": round(values["JSHeapUsedSize"] / (1024 * 1024), 2),
+        "total": round(values.get("JSHeapTotalSize", 0) / (1024 * 1024), 2),
+    }
+
+
+async def collect(context, page) -> Dict[str, Any]:
+    """One run's measurements, from a page that has finished loading."""
+    raw = await page.evaluate(COLLECT_SCRIPT)
+    heap = await js_heap_mb(context, page)
+    navigation = raw.get("navigation") or {}
+    resources = raw.get("resources", [])
+    long_tasks = raw.get("long_tasks", [])
+
+    def kb(values):
+        return round(sum(value or 0 for value in values) / 1024, 1)
+
+    metrics = {
+        "ttfb_ms": navigation.get("ttfb_ms"),
+        "fcp_ms": raw.get("fcp_ms"),
+        "lcp_ms": raw.get("lcp_ms"),
+        "dom_content_loaded_ms": navigation.get("dom_content_loaded_ms"),
+        "load_ms": navigation.get("load_ms"),
+        "cls": raw.get("cls"),
+        "long_tasks": len(long_tasks),
+        "total_blocking_time_ms": sum(max(0.0, task["duration_ms"] - 50) for task in long_tasks),
+        "js_heap_used_mb": heap["used"] if heap else None,
+        "transfer_kb": kb([navigation.get("transfer_bytes")] + [r["transfer_bytes"] for r in resources]),
+        "script_kb": kb(r["transfer_bytes"] for r in resources if r["type"] == "script"),
+        "requests": len(resources) + (1 if navigation else 0),
+    }
+    return {
+        "metrics": {name: round(value, 4) if isinstance(value, float) else value for name, value in metrics.items()},
+        "lcp_element": raw.get("lcp_element"),
+        "long_tasks": long_tasks,
+        "resources": sorted(resources, key=lambda r: r["transfer_bytes"] or 0, reverse=True),
+    }
+
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median of each metric across runs; resources from the last run."""
+    metrics = {}
+    for name in samples[0]["metrics"]:
+        values = [sample["metrics"][name] for sample in samples if sample["metrics"][name] is not None]
+        metrics[name] = round(statistics.median(values), 4) if values else None
+    return {
+        "runs": len(samples),
+        "metrics": metrics,
+        "samples": [sample["metrics"] for sample in samples],
+        "lcp_element": samples[-1]["lcp_element"],
+        "resources": samples[-1]["resources"],
+    }
+
+
+def parse_thresholds(specs: List[str]) -> Dict[str, Tuple[float, float]]:
+    """``["lcp_ms=0.1", "cls=0.2:0.05"]`` -> DEFAULT_THRESHOLDS with overrides."""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for spec in specs:
+        name, _, value = spec.partition("=")
+        if name not in thresholds:
+            raise ValueError(f"Unknown audit metric {name!r} (from: {', '.join(thresholds)})")
+        relative, _, absolute = value.partition(":")
+        thresholds[name] = (float(relative), float(absolute) if absolute else thresholds[name][1])
+    return thresholds
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            thresholds: Dict[str, Tuple[float, float]] = DEFAULT_THRESHOLDS) -> Dict[str, Any]:
+    """Per-metric changes against ``baseline`` and the regressions among them."""
+    changes = {}
+    regressions = []
+    for name, (relative, absolute) in thresholds.items():
+        old, new = baseline.get("metrics", {}).get(name), current["metrics"].get(name)
+        if old is None or new is None:
+            continue
+        increase = new - old
+        regressed = increase > max(abs(old) * relative, absolute)
+        changes[name] = {"baseline": old, "current": new, "change": round(increase, 4), "regressed": regressed}
+        if regressed:
+            regressions.append(f"{name}: {old} -> {new}")
+    return {"changes": changes, "regressions": regressions}
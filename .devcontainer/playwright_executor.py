@@ -6,26 +6,76 @@ import os
 import json
 from pathlib import Path
 import tempfile
-import base64
+import signal
+import sys
+import time
 
-async def execute_playwright_script(url: str, script: str, output_dir: str = ".screenshots", capture_logs: bool = False):
+import perf_audit
+
+from artifact_store import ArtifactStore
+from browser_pool import BrowserPool
+from har_cache import HAR_KEYS, HAR_MODES, NOT_FOUND, plan_from_options
+from script_cache import ScriptCache
+
+DEFAULT_SOCKET = os.environ.get("PLAYWRIGHT_EXECUTOR_SOCKET", "/tmp/playwright_executor.sock")
+DEFAULT_JOB_TIMEOUT = 180.0
+
+# Shared by every job in this process, so a daemon compiles each distinct
+# script once.
+SCRIPT_CACHE = ScriptCache(int(os.environ.get("PLAYWRIGHT_SCRIPT_CACHE_SIZE", "256")))
+
+SCREENSHOT_MODES = ("full", "viewport", "clip")
+SCREENSHOT_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+_artifact_stores = {}
+
+
+def artifact_store(automation_output_dir: str) -> ArtifactStore:
+    """The store for an output directory, shared so pruning is throttled per process."""
+    root = os.path.abspath(automation_output_dir)
+    if root not in _artifact_stores:
+        _artifact_stores[root] = ArtifactStore(
+            os.path.join(root, "artifacts"),
+            runs_dir=root,
+            max_bytes=int(float(os.environ.get("PLAYWRIGHT_ARTIFACTS_MAX_MB", "512")) * 1024 * 1024),
+            max_age=float(os.environ.get("PLAYWRIGHT_ARTIFACTS_MAX_AGE_HOURS", "168")) * 3600,
+            max_runs=int(os.environ.get("PLAYWRIGHT_MAX_RUNS", "500")),
+        )
+    return _artifact_stores[root]
+
+
+def screenshot_options(mode: str = "full", clip=None):
+    """page.screenshot() arguments; only "full" renders the whole page."""
+    if mode not in SCREENSHOT_MODES:
+        raise ValueError(f"Unknown screenshot mode {mode!r}")
+    if mode == "clip":
+        if not clip:
+            raise ValueError("Screenshot mode 'clip' needs a clip region")
+        x, y, width, height = clip
+        return {"clip": {"x": x, "y": y, "width": width, "height": height}}
+    return {"full_page": mode == "full"}
+
+
+async def run_job(browser, url: str, script: str, output_dir: str = ".screenshots", capture_logs: bool = False,
+                  automation_output_dir: str = "automation_output", timeout: float = DEFAULT_JOB_TIMEOUT,
+                  save_script: bool = False, screenshot: str = "full", clip=None, har=None):
     """
-    Executes a Playwright script and captures outputs.
+    Runs one script in a fresh, isolated context of an already running browser.
+    With save_script, the wrapped script is also written to the run directory.
+    Screenshots go to the artifact store; output_dir/screenshot.jpeg links to the latest.
+    har holds HAR record/replay options (see har_cache.plan_from_options).
     """
-    # Create output directory
-    
-    automation_output_dir = 'automation_output'
-
     os.makedirs(output_dir, exist_ok=True)
     os.makedirs(automation_output_dir, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    run_dir = Path(automation_output_dir) / timestamp
-    run_dir.mkdir(exist_ok=True)
+    # Unique per job: concurrent daemon jobs can start within the same second.
+    run_dir = Path(tempfile.mkdtemp(prefix=f"{timestamp}_", dir=automation_output_dir))
 
     screenshot_dir = Path(output_dir)
     screenshot_dir.mkdir(exist_ok=True)
-    
+    store = artifact_store(automation_output_dir)
+
     result = {
         "status": "success",
         "data": {
@@ -36,136 +86,501 @@ async def execute_playwright_script(url: str, script: str, output_dir: str = ".s
         }
     }
 
+    started = time.perf_counter()
+    context = None
+    har_plan = None
+    try:
+        har_plan = plan_from_options(har, url, script)
+        context = await browser.new_context()
+        if har_plan is not None:
+            await har_plan.attach(context)
+            result["har"] = har_plan.describe()
+        page = await context.new_page()
+        result["timing"] = {"startup_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+        async def capture():
+            # Captured once; the store dedupes it and "latest" is a link.
+            data = await page.screenshot(type="jpeg", quality=50, **screenshot_options(screenshot, clip))
+            path = store.put(data, ".jpeg")
+            store.link(path, screenshot_dir / "screenshot.jpeg")
+            result["data"]["screenshots"].append(str(path))
+
+        # Store console logs if requested
+        console_logs = []
+        if capture_logs:
+            page.on("console", lambda msg: console_logs.append(f"{msg.type}: {msg.text}"))
+
+        async def run_script():
+            # Decoded, wrapped and compiled once per distinct script
+            compiled = SCRIPT_CACHE.get(script)
+            if save_script:
+                # Write the test script to a file for debugging
+                (run_dir / "test_script.py").write_text(compiled.source)
+
+            # Navigate to URL first
+            await page.goto(url, wait_until="networkidle", timeout=30000)
+
+            # Run the test
+            return await compiled.run_test()(page, str(run_dir))
+
+        try:
+            try:
+                output = await asyncio.wait_for(run_script(), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Job timed out after {timeout:g}s")
+            if output is not None:
+                result["data"]["output"] = output
+
+            # Take a screenshot if none were taken
+            screenshot_files = sorted(f for f in run_dir.iterdir() if f.suffix.lower() in SCREENSHOT_SUFFIXES)
+            if not screenshot_files:
+                await capture()
+            else:
+                result["data"]["screenshots"].extend(str(f) for f in screenshot_files)
+
+            # Save console logs if captured
+            if capture_logs and console_logs:
+                log_path = run_dir / f"console_{timestamp}.log"
+                with open(log_path, "w", encoding="utf-8") as f:
+                    f.write("\n".join(console_logs))
+                result["data"]["console_logs"].append(str(log_path))
+
+        except Exception as e:
+            result["status"] = "error"
+            result["data"]["error"] = f"Script error: {str(e)}"
+            await capture()
+
+    except Exception as e:
+        result["status"] = "error"
+        result["data"]["error"] = f"Setup error: {str(e)}"
+
+    finally:
+        if context is not None:
+            await context.close()
+        if har_plan is not None:
+            # Only keep recordings of runs that went through.
+            if result["status"] == "success":
+                har_plan.commit()
+            else:
+                har_plan.discard()
+        result.setdefault("timing", {})["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        await asyncio.to_thread(store.maybe_prune)
+
+    return result
+
+
+async def execute_playwright_script(url: str, script: str, output_dir: str = ".screenshots", capture_logs: bool = False,
+                                    timeout: float = DEFAULT_JOB_TIMEOUT, **options):
+    """
+    Executes a Playwright script and captures outputs, in a browser launched just for this run.
+    Other run_job options (save_script, screenshot, clip, har) are passed through.
+    """
     try:
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context()
-            page = await context.new_page()
-            
-            # Store console logs if requested
-            console_logs = []
-            if capture_logs:
-                page.on("console", lambda msg: console_logs.append(f"{msg.type}: {msg.text}"))
-            
             try:
-                # Navigate to URL first
-                await page.goto(url, wait_until="networkidle", timeout=30000)
-                
-                # Decode script if base64 encoded
-                if script.startswith('base64:'):
-                    script = base64.b64decode(script[7:]).decode('utf-8')
-                
-                # Add proper indentation to the script
-                indented_script = ""
-                for line in script.split('\n'):
-                    if line.strip():
-                        indented_script += "    " + line + "\n"
-                    else:
-                        indented_script += "\n"
-                
-                # Create test script with proper indentation
-                test_script = f"""async def run_test(page, output_dir):
-{indented_script}"""
+                return await run_job(browser, url, script, output_dir, capture_logs, timeout=timeout, **options)
+            finally:
+                await browser.close()
+    except Exception as e:
+        return error_result(f"Setup error: {str(e)}")
 
-                # Write the test script to a file for debugging
-                test_script_path = run_dir / "test_script.py"
-                with open(test_script_path, "w") as f:
-                    f.write(test_script)
-
-                # Save script to temp file for execution
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                    f.write(test_script)
-                    script_path = f.name
-
-                # Import and execute the script
-                import importlib.util
-                spec = importlib.util.spec_from_file_location("dynamic_script", script_path)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                
-                # Run the test
-                output = await module.run_test(page, str(run_dir))
-                if output is not None:
-                    result["data"]["output"] = output
-                
-                # Take a screenshot if none were taken
-                screenshot_files = list(run_dir.glob('*.{png,jpg,jpeg}'))
-                if not screenshot_files:
-                    final_screenshot = run_dir / f"final_{timestamp}.png"
-                    await page.screenshot(
-                        path=str(final_screenshot),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-                    result["data"]["screenshots"].append(str(final_screenshot))
-
-                    # Save additional screenshot to .screenshot folder
-                    await page.screenshot(
-                        path=str(screenshot_dir / "screenshot.jpeg"),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-                else:
-                    result["data"]["screenshots"].extend(str(f) for f in screenshot_files)
-
-                # Save console logs if captured
-                if capture_logs and console_logs:
-                    log_path = run_dir / f"console_{timestamp}.log"
-                    with open(log_path, "w", encoding="utf-8") as f:
-                        f.write("\n".join(console_logs))
-                    result["data"]["console_logs"].append(str(log_path))
 
+def error_result(message: str):
+    return {"status": "error", "data": {"screenshots": [], "console_logs": [], "error": message, "output": None}}
+
+
+async def run_pooled_job(pool: BrowserPool, job: dict):
+    async with pool.browser() as browser:
+        return await run_job(
+            browser,
+            job["url"],
+            job["script"],
+            job.get("output_dir", ".screenshots"),
+            job.get("capture_logs", False),
+            job.get("automation_output_dir", "automation_output"),
+            job.get("timeout", DEFAULT_JOB_TIMEOUT),
+            job.get("save_script", False),
+            job.get("screenshot", "full"),
+            job.get("clip"),
+            job.get("har"),
+        )
+
+
+# Daemon mode: one long-lived process keeps a warm BrowserPool and accepts
+# jobs over a Unix socket, one JSON object per line in each direction.
+
+class DaemonAlreadyRunning(Exception):
+    """Raised by serve() when another daemon answers on the socket path."""
+
+
+async def claim_socket_path(socket_path: str):
+    """Removes a stale socket left by a dead daemon; refuses to take over a live one."""
+    if not os.path.exists(socket_path):
+        return
+    try:
+        _, writer = await asyncio.open_unix_connection(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(socket_path)
+        return
+    writer.close()
+    raise DaemonAlreadyRunning(f"A daemon is already listening on {socket_path}")
+
+
+async def serve(socket_path: str, pool: BrowserPool):
+    await claim_socket_path(socket_path)
+    await pool.start()
+
+    async def handle(reader, writer):
+        line = await reader.readline()
+        if not line:
+            # A liveness probe from claim_socket_path(); nothing to answer.
+            writer.close()
+            return
+        try:
+            request = json.loads(line)
+            if request.get("op") == "stats":
+                response = {**pool.stats(), "script_cache": SCRIPT_CACHE.stats()}
+            else:
+                response = await run_pooled_job(pool, request)
+        except Exception as e:
+            response = error_result(f"Daemon error: {str(e)}")
+        writer.write(json.dumps(response).encode() + b"\n")
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    # The socket is created owner-only, so there is no window in which other
+    # local users can connect with the default umask's permissions.
+    previous_umask = os.umask(0o077)
+    try:
+        server = await asyncio.start_unix_server(handle, path=socket_path, limit=64 * 1024 * 1024)
+    finally:
+        os.umask(previous_umask)
+    print(json.dumps({"status": "serving", "socket": socket_path, **pool.stats()}), flush=True)
+
+    # Stop accepting jobs on SIGTERM/SIGINT, then close the browsers cleanly.
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        await pool.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+async def submit_to_daemon(socket_path: str, job: dict):
+    """Sends a job to a running daemon; returns None if no daemon is listening."""
+    try:
+        reader, writer = await asyncio.open_unix_connection(socket_path, limit=64 * 1024 * 1024)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    try:
+        writer.write(json.dumps(job).encode() + b"\n")
+        await writer.drain()
+        return json.loads(await reader.readline())
+    finally:
+        writer.close()
+
+
+def har_options(args):
+    if args.har_mode == "off":
+        return None
+    return {
+        "mode": args.har_mode,
+        "dir": os.path.abspath(args.har_dir),
+        "key": args.har_key,
+        "max_age": args.har_max_age,
+        "not_found": args.har_not_found,
+        "refresh": args.har_refresh,
+    }
+
+
+def make_job(args, url: str, script: str, **overrides):
+    job = {
+        "url": url,
+        "script": script,
+        # The daemon may run in another directory; send absolute paths.
+        "output_dir": os.path.abspath(args.output),
+        "automation_output_dir": os.path.abspath("automation_output"),
+        "capture_logs": args.capture_logs,
+        "timeout": args.timeout,
+        "save_script": args.save_script,
+        "screenshot": args.screenshot,
+        "clip": args.clip,
+        "har": har_options(args),
+    }
+    job.update(overrides)
+    return job
+
+
+async def execute(args):
+    job = make_job(args, args.url, args.script)
+    if not args.no_daemon:
+        result = await submit_to_daemon(args.socket, job)
+        if result is not None:
+            return result
+    return await execute_playwright_script(args.url, args.script, args.output, args.capture_logs, args.timeout,
+                                           save_script=args.save_script, screenshot=args.screenshot, clip=args.clip,
+                                           har=har_options(args))
+
+
+# Batch mode: a manifest of (url, script) jobs runs concurrently on a
+# bounded number of contexts, and each result is printed as it finishes.
+
+def load_manifest(path: str, args):
+    """
+    Reads a JSON array or JSON Lines file of jobs. Each job needs a url and a
+    script (or a script_file, relative to the manifest), and may override id,
+    output, capture_logs, timeout, save_script, screenshot and clip.
+    """
+    manifest_dir = Path(path).resolve().parent
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    jobs = []
+    for index, entry in enumerate(entries):
+        script = entry.get("script")
+        if script is None and "script_file" in entry:
+            script = (manifest_dir / entry["script_file"]).read_text(encoding="utf-8")
+        if not entry.get("url") or script is None:
+            raise ValueError(f"Manifest entry {index} needs a url and a script or script_file")
+        overrides = {"id": entry.get("id", index)}
+        if "output" in entry:
+            overrides["output_dir"] = os.path.abspath(entry["output"])
+        for key in ("capture_logs", "timeout", "save_script", "screenshot", "clip"):
+            if key in entry:
+                overrides[key] = entry[key]
+        jobs.append(make_job(args, entry["url"], script, **overrides))
+    return jobs
+
+
+async def run_batch(jobs, parallel: int, runner, emit):
+    """
+    Runs jobs with at most ``parallel`` in flight, calling ``emit`` with each
+    result as soon as it finishes. Returns a summary of the sweep.
+    """
+    semaphore = asyncio.Semaphore(parallel)
+    sweep_started = time.perf_counter()
+
+    async def run_one(index, job):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await runner(job)
             except Exception as e:
-                result["status"] = "error"
-                result["data"]["error"] = f"Script error: {str(e)}"
-                error_screenshot = run_dir / f"error_{timestamp}.png"
-                await page.screenshot(
-                        path=str(error_screenshot),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-                result["data"]["screenshots"].append(str(error_screenshot))
-
-                # Save additional screenshot to .screenshot folder
-                await page.screenshot(
-                        path=str(screenshot_dir / "screenshot.jpeg"),
-                        full_page=True,
-                        type="jpeg",
-                        quality = 50
-                    )
-            
+                result = error_result(f"Batch error: {str(e)}")
+            finished = time.perf_counter()
+        result["job"] = {"index": index, "id": job.get("id", index), "url": job["url"]}
+        result.setdefault("timing", {}).update({
+            "queued_ms": round((started - sweep_started) * 1000, 1),
+            "job_ms": round((finished - started) * 1000, 1),
+        })
+        emit(result)
+        return result
+
+    results = await asyncio.gather(*(run_one(index, job) for index, job in enumerate(jobs)))
+    wall = time.perf_counter() - sweep_started
+    job_time = sum(result["timing"]["job_ms"] for result in results) / 1000
+    return {
+        "summary": {
+            "jobs": len(results),
+            "failed": sum(1 for result in results if result["status"] != "success"),
+            "parallel": parallel,
+            "wall_ms": round(wall * 1000, 1),
+            "sum_job_ms": round(job_time * 1000, 1),
+            # How many jobs' worth of work ran at once, on average.
+            "effective_parallelism": round(job_time / wall, 2) if wall else None,
+        }
+    }
+
+
+async def execute_batch(args, jobs):
+    def emit(result):
+        print(json.dumps(result), flush=True)
+
+    if not args.no_daemon and await submit_to_daemon(args.socket, {"op": "stats"}) is not None:
+        async def via_daemon(job):
+            result = await submit_to_daemon(args.socket, job)
+            return result if result is not None else error_result("Daemon went away")
+        return await run_batch(jobs, args.parallel, via_daemon, emit)
+
+    pool = BrowserPool(
+        size=args.pool_size,
+        # Enough contexts across the pool for every job in flight.
+        contexts_per_browser=-(-args.parallel // args.pool_size),
+        max_jobs_per_browser=args.max_jobs_per_browser,
+        max_browser_memory_mb=args.max_browser_memory_mb,
+    )
+    await pool.start()
+    try:
+        return await run_batch(jobs, args.parallel, lambda job: run_pooled_job(pool, job), emit)
+    finally:
+        await pool.close()
+
+
+# Audit mode: load the page in a few fresh contexts, report how fast it was,
+# and compare against a saved baseline.
+
+async def run_audit(browser, url: str, runs: int = 3, timeout: float = DEFAULT_JOB_TIMEOUT):
+    samples = []
+    for _ in range(runs):
+        context = await browser.new_context()
+        try:
+            await perf_audit.prepare(context)
+            page = await context.new_page()
+            try:
+                await asyncio.wait_for(page.goto(url, wait_until="networkidle", timeout=30000), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Audit run timed out after {timeout:g}s")
+            samples.append(await perf_audit.collect(context, page))
+        finally:
+            await context.close()
+    return {"url": url, **perf_audit.summarize(samples)}
+
+
+async def execute_audit(args, thresholds):
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            try:
+                audit = await run_audit(browser, args.url, args.audit_runs, args.timeout)
             finally:
-                if os.path.exists(script_path):
-                    os.unlink(script_path)
                 await browser.close()
-
     except Exception as e:
-        result["status"] = "error"
-        result["data"]["error"] = f"Setup error: {str(e)}"
+        return error_result(f"Audit error: {str(e)}")
 
+    result = {"status": "success", "audit": audit}
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps(audit, indent=2) + "\n")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        result["comparison"] = perf_audit.compare(audit, baseline, thresholds)
+        if result["comparison"]["regressions"]:
+            result["status"] = "regression"
     return result
 
-def main():
+
+def parse_clip(value: str):
+    try:
+        clip = [float(part) for part in value.split(",")]
+    except ValueError:
+        clip = []
+    if len(clip) != 4:
+        raise argparse.ArgumentTypeError("expected X,Y,WIDTH,HEIGHT")
+    return clip
+
+
+def build_parser():
     parser = argparse.ArgumentParser(description="Execute Playwright automation script")
-    parser.add_argument("url", help="URL to automate")
-    parser.add_argument("--script", required=True, help="Playwright script to execute (plain text or base64 encoded with 'base64:' prefix)")
+    parser.add_argument("url", nargs="?", help="URL to automate")
+    parser.add_argument("--script", help="Playwright script to execute (plain text or base64 encoded with 'base64:' prefix)")
     parser.add_argument("--output", "-o", default=".screenshots",
                         help="Output directory for screenshots and logs")
     parser.add_argument("--capture-logs", action="store_true", help="Capture console logs")
-    
+    parser.add_argument("--save-script", action="store_true",
+                        help="Write the wrapped script to the run directory for debugging")
+    parser.add_argument("--screenshot", choices=SCREENSHOT_MODES, default="full",
+                        help="Final screenshot: the full page, the viewport only, or the --clip region")
+    parser.add_argument("--clip", type=parse_clip, metavar="X,Y,WIDTH,HEIGHT",
+                        help="Region for --screenshot clip")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_JOB_TIMEOUT, help="Per-job timeout in seconds")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET,
+                        help="Daemon socket; jobs go through a running daemon when one is listening")
+    parser.add_argument("--no-daemon", action="store_true", help="Always launch a browser just for this run")
+
+    network = parser.add_argument_group("network cache")
+    network.add_argument("--har-mode", choices=HAR_MODES, default="off",
+                         help="Record traffic to a HAR, replay it instead of the network, or replay when fresh and "
+                              "record otherwise (auto)")
+    network.add_argument("--har-dir", default=os.path.join("automation_output", "har"), help="Where HAR files live")
+    network.add_argument("--har-key", choices=HAR_KEYS, default="url",
+                         help="Cache key: the normalized URL, the URL without its query, or the URL plus the script")
+    network.add_argument("--har-max-age", type=float, help="Seconds before a recording is stale (auto re-records it)")
+    network.add_argument("--har-refresh", action="store_true", help="Re-record even when a fresh HAR exists")
+    network.add_argument("--har-not-found", choices=NOT_FOUND, default="abort",
+                         help="When replaying, abort requests missing from the HAR or let them through to the network")
+
+    audit = parser.add_argument_group("audit mode")
+    audit.add_argument("--audit", action="store_true",
+                       help="Measure page load performance of url instead of running a script")
+    audit.add_argument("--audit-runs", type=int, default=3, help="Loads per audit; metrics are the median")
+    audit.add_argument("--baseline", help="Audit JSON to compare against; exits 1 on regression")
+    audit.add_argument("--save-baseline", help="Write this audit to a JSON file for later --baseline runs")
+    audit.add_argument("--threshold", action="append", default=[], metavar="METRIC=RELATIVE[:ABSOLUTE]",
+                       help="Override a regression threshold, e.g. lcp_ms=0.1 or cls=0.2:0.05")
+
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument("--manifest", help="JSON array or JSON Lines file of {url, script | script_file} jobs")
+    batch.add_argument("--parallel", type=int, default=os.cpu_count() or 1, help="Jobs in flight at once")
+
+    daemon = parser.add_argument_group("daemon mode")
+    daemon.add_argument("--serve", action="store_true", help="Run as a daemon with a warm browser pool")
+    daemon.add_argument("--pool-size", type=int, default=2, help="Browsers kept running (also used by batch mode)")
+    daemon.add_argument("--contexts-per-browser", type=int, default=4, help="Concurrent jobs per browser")
+    daemon.add_argument("--max-jobs-per-browser", type=int, default=200, help="Recycle a browser after this many jobs")
+    daemon.add_argument("--max-browser-memory-mb", type=float, default=1024,
+                        help="Recycle a browser whose processes use more memory than this")
+    return parser
+
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
-    
-    result = asyncio.run(execute_playwright_script(
-        args.url,
-        args.script,
-        args.output,
-        args.capture_logs
-    ))
-    
+
+    if args.serve:
+        pool = BrowserPool(
+            size=args.pool_size,
+            contexts_per_browser=args.contexts_per_browser,
+            max_jobs_per_browser=args.max_jobs_per_browser,
+            max_browser_memory_mb=args.max_browser_memory_mb,
+        )
+        try:
+            asyncio.run(serve(args.socket, pool))
+        except DaemonAlreadyRunning as e:
+            print(json.dumps(error_result(str(e))))
+            sys.exit(1)
+        return
+
+    if args.audit:
+        if not args.url:
+            parser.error("url is required with --audit")
+        try:
+            thresholds = perf_audit.parse_thresholds(args.threshold)
+        except ValueError as e:
+            parser.error(str(e))
+        result = asyncio.run(execute_audit(args, thresholds))
+        print(json.dumps(result))
+        if result["status"] != "success":
+            sys.exit(1)
+        return
+
+    if args.screenshot == "clip" and args.clip is None:
+        parser.error("--screenshot clip needs --clip X,Y,WIDTH,HEIGHT")
+
+    if args.manifest:
+        try:
+            jobs = load_manifest(args.manifest, args)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        print(json.dumps(asyncio.run(execute_batch(args, jobs))))
+        return
+
+    if not args.url or not args.script:
+        parser.error("url and --script are required unless --serve or --manifest is given")
+
+    result = asyncio.run(execute(args))
+
     print(json.dumps(result))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,78 @@
+"""Compiled user scripts for playwright_executor, cached in memory.
+
+A job's script is the body of an ``async def run_test(page, output_dir)``.
+Wrapping, base64 decoding and ``compile()`` happen once per distinct
+script; entries are keyed by the SHA-256 of the script as submitted and
+kept in a bounded LRU. Every job still gets its own ``run_test`` from a
+fresh namespace, so module-level state never leaks between jobs.
+"""
+import base64
+import hashlib
+import linecache
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import CodeType
+from typing import Any, Callable, Dict
+
+BASE64_PREFIX = "base64:"
+
+
+def decode_script(script: str) -> str:
+    """The plain source of ``script``, which may carry a ``base64:`` prefix."""
+    if script.startswith(BASE64_PREFIX):
+        return base64.b64decode(script[len(BASE64_PREFIX):]).decode("utf-8")
+    return script
+
+
+def wrap_script(source: str) -> str:
+    """Indent ``source`` into the body of ``run_test``."""
+    lines = ["    " + line if line.strip() else "" for line in source.split("\n")]
+    return "async def run_test(page, output_dir):\n" + "\n".join(lines) + "\n"
+
+
+@dataclass
+class CompiledScript:
+    digest: str
+    source: str
+    code: CodeType
+
+    def run_test(self) -> Callable:
+        namespace: Dict[str, Any] = {"__name__": "dynamic_script"}
+        exec(self.code, namespace)
+        return namespace["run_test"]
+
+
+class ScriptCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CompiledScript]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, script: str) -> CompiledScript:
+        """The compiled form of ``script``, which may carry a ``base64:`` prefix."""
+        digest = hashlib.sha256(script.encode("utf-8")).hexdigest()
+        entry = self._entries.get(digest)
+        if entry is not None:
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        source = wrap_script(decode_script(script))
+        filename = f"<playwright-script {digest[:12]}>"
+        entry = CompiledScript(digest, source, compile(source, filename, "exec"))
+        # Lets tracebacks from the script show its source lines.
+        linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+        self._entries[digest] = entry
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            linecache.cache.pop(evicted.code.co_filename, None)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,206 @@
+"""Read-through cache for serialized API responses.
+
+Entries live in Redis under versioned keys, ``<namespace>:<scope>:v<N>:<key>``.
+A write bumps the scope's version counter, which orphans every older
+entry at once; orphans then age out through their TTL. Concurrent misses
+for the same key in one process share a single load (single-flight).
+While Redis is unreachable the cache falls back to a bounded in-process
+LRU with the same versioning and TTL semantics.
+
+:meth:`ReadThroughCache.version` exposes a scope's version and the time
+of its last invalidation for HTTP validators (ETag, Last-Modified).
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Resolves the scope version and reads the entry in one round trip.
+_GET_VERSIONED = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return {version, redis.call('GET', ARGV[1] .. version .. ARGV[2])}
+"""
+
+
+def _text(value) -> Optional[str]:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def cache_key(*parts) -> str:
+    """Hash request parameters into a short, fixed-length key."""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+class ReadThroughCache:
+    def __init__(
+        self,
+        redis=None,
+        namespace: str = "cache",
+        ttl: float = 5.0,
+        lru_size: int = 1024,
+        retry_after: float = 5.0,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.lru_size = lru_size
+        self.retry_after = retry_after
+        self.use_redis(redis)
+        self._lru: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._local_versions: Dict[str, int] = {}
+        self._local_modified: Dict[str, float] = {}
+        # Tells local versions of different processes (and restarts) apart.
+        self._instance = uuid.uuid4().hex[:8]
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.redis_errors = 0
+
+    def use_redis(self, redis):
+        """Switch to ``redis`` (or to the in-process LRU alone with None)."""
+        self.redis = redis
+        self._get_versioned = redis.register_script(_GET_VERSIONED) if redis is not None else None
+        self._redis_down_until = 0.0
+
+    @property
+    def using_redis(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    async def get_or_load(self, scope: str, key: str, loader: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Return the cached value for ``key`` or load, store and return it."""
+        version, value = await self._get(scope, key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        entry_key = self._entry_key(scope, version, key)
+        pending = self._inflight.get(entry_key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        # The load runs in its own task, so a cancelled caller (e.g. a client
+        # that disconnected) does not cancel it for the callers sharing it.
+        task = asyncio.create_task(self._load(entry_key, loader))
+        self._inflight[entry_key] = task
+        task.add_done_callback(lambda done: self._load_done(entry_key, done))
+        return await asyncio.shield(task)
+
+    async def _load(self, entry_key: str, loader: Callable[[], Awaitable[bytes]]) -> bytes:
+        value = await loader()
+        await self._set(entry_key, value)
+        return value
+
+    def _load_done(self, entry_key: str, task: asyncio.Future):
+        if self._inflight.get(entry_key) is task:
+            del self._inflight[entry_key]
+        if not task.cancelled():
+            # Mark a failure retrieved in case every caller was cancelled.
+            task.exception()
+
+    async def invalidate(self, scope: str):
+        """Bump ``scope``'s version so existing entries are no longer read."""
+        now = time.time()
+        self._local_versions[scope] = self._local_versions.get(scope, 0) + 1
+        self._local_modified[scope] = now
+        if self.using_redis:
+            try:
+                await self.redis.incr(self._version_key(scope))
+                await self.redis.set(self._modified_key(scope), repr(now))
+            except RedisError as exc:
+                self._mark_down(exc)
+
+    async def version(self, scope: str) -> Tuple[str, Optional[datetime]]:
+        """Return ``scope``'s current version and when it was last invalidated.
+
+        With Redis the version is shared by every worker. The in-process
+        fallback only sees this worker's writes, so its version also rolls
+        over every ``ttl`` seconds: a validator is then never stale for
+        longer than a cached entry. Deletes that bypass :meth:`invalidate`
+        (e.g. TTL expiry) are not reflected until the next write.
+        """
+        if self.using_redis:
+            try:
+                version, modified = await self.redis.mget(self._version_key(scope), self._modified_key(scope))
+                return f"redis:{_text(version) or 0}", _utc(float(_text(modified))) if modified else None
+            except RedisError as exc:
+                self._mark_down(exc)
+        modified = self._local_modified.get(scope)
+        epoch = int(time.time() // self.ttl) if self.ttl > 0 else 0
+        version = f"local:{self._instance}:{self._local_versions.get(scope, 0)}:{epoch}"
+        return version, _utc(modified) if modified is not None else None
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": "redis" if self.using_redis else "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "redis_errors": self.redis_errors,
+            "lru_entries": len(self._lru),
+        }
+
+    def _version_key(self, scope: str) -> str:
+        return f"{self.namespace}:{scope}:version"
+
+    def _modified_key(self, scope: str) -> str:
+        return f"{self.namespace}:{scope}:modified"
+
+    def _entry_key(self, scope: str, version, key: str) -> str:
+        return f"{self.namespace}:{scope}:v{version}:{key}"
+
+    def _mark_down(self, exc: Exception):
+        self.redis_errors += 1
+        self._redis_down_until = time.monotonic() + self.retry_after
+        logger.warning("Redis unavailable, using in-process cache for %.0fs: %s", self.retry_after, exc)
+
+    async def _get(self, scope: str, key: str) -> Tuple[object, Optional[bytes]]:
+        if self.using_redis:
+            try:
+                version, value = await self._get_versioned(
+                    keys=[self._version_key(scope)],
+                    args=[f"{self.namespace}:{scope}:v", f":{key}"],
+                )
+                return version.decode() if isinstance(version, bytes) else version, value
+            except RedisError as exc:
+                self._mark_down(exc)
+
+        version = f"local{self._local_versions.get(scope, 0)}"
+        entry_key = self._entry_key(scope, version, key)
+        entry = self._lru.get(entry_key)
+        if entry is None:
+            return version, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._lru[entry_key]
+            return version, None
+        self._lru.move_to_end(entry_key)
+        return version, value
+
+    async def _set(self, entry_key: str, value: bytes):
+        if self.using_redis and ":vlocal" not in entry_key:
+            try:
+                await self.redis.set(entry_key, value, px=int(self.ttl * 1000))
+                return
+            except RedisError as exc:
+                self._mark_down(exc)
+        self._lru[entry_key] = (time.monotonic() + self.ttl, value)
+        self._lru.move_to_end(entry_key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
@@ -0,0 +1,37 @@
+"""Conditional GET support for cached list endpoints.
+
+ETags are built from the read-through cache's scope version (see
+:meth:`cache.ReadThroughCache.version`), which every write bumps, so
+answering a revalidation costs one Redis lookup and no Mongo round trip.
+
+Only ``If-None-Match`` is honoured. ``If-Modified-Since`` has one-second
+resolution and would miss writes landing in the same second, so
+``Last-Modified`` is sent for information only.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+
+
+def make_etag(version: str, *parts) -> str:
+    """Strong ETag for ``version`` combined with the request's parameters."""
+    digest = hashlib.sha1(repr((version, parts)).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as RFC 9110 requires for If-None-Match."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def http_date(value: datetime) -> str:
+    # Stored timestamps are naive UTC.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
@@ -0,0 +1,81 @@
+"""Streaming exports of status checks as NDJSON or CSV.
+
+Documents are read from the Motor cursor in fixed-size batches and
+written to the response as each batch arrives, so memory use depends on
+the batch size rather than on the size of the export.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FIELDS = ("id", "client_name", "timestamp")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def time_range_query(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build a Mongo filter for ``since <= timestamp < until``."""
+    query: Dict[str, Any] = {}
+    if since is not None or until is not None:
+        query["timestamp"] = {}
+        if since is not None:
+            query["timestamp"]["$gte"] = since
+        if until is not None:
+            query["timestamp"]["$lt"] = until
+    if client_name is not None:
+        query["client_name"] = client_name
+    return query
+
+
+def _row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": doc.get("id"),
+        "client_name": doc.get("client_name"),
+        "timestamp": doc["timestamp"].isoformat() if doc.get("timestamp") else None,
+    }
+
+
+async def stream_ndjson(cursor, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Yield one NDJSON chunk per ``batch_size`` documents."""
+    lines = []
+    async for doc in cursor:
+        lines.append(json.dumps(_row(doc), separators=(",", ":")))
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def stream_csv(cursor, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Yield a CSV header followed by one chunk per ``batch_size`` documents."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    pending = 0
+    async for doc in cursor:
+        writer.writerow(_row(doc))
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+STREAMERS = {
+    "ndjson": stream_ndjson,
+    "csv": stream_csv,
+}
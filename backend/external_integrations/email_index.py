@@ -0,0 +1,202 @@
+"""In-memory index of waitlist emails for rejecting duplicates locally.
+
+A Bloom filter answers "definitely new" for most sign-ups in a few
+microseconds. An exact set resolves the Bloom filter's positives, so a
+known duplicate can be rejected without a PostgREST round trip. If the
+exact set outgrows its memory budget it is dropped; Bloom positives then
+become "unknown" and fall through to Supabase's unique constraint.
+
+The index is warmed from the ``waitlist`` table at startup and rebuilt
+periodically, which also re-sizes the filter as the table grows and drops
+emails that are no longer in the table.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import sys
+from typing import Dict, Iterable, Optional
+
+from .postgrest import PostgrestClient
+from .waitlist import WAITLIST_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry overhead of a set slot on top of the string itself.
+_SET_ENTRY_OVERHEAD = 32
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, false_positive_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # Kirsch-Mitzenmacher: derive k positions from two 64-bit hashes.
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class EmailIndex:
+    def __init__(
+        self,
+        expected_items: int = 100_000,
+        false_positive_rate: float = 0.001,
+        max_exact_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.expected_items = expected_items
+        self.false_positive_rate = false_positive_rate
+        self.max_exact_bytes = max_exact_bytes
+        self.warmed = False
+        # Emails added while a rebuild is paging; None when no rebuild runs.
+        self._pending: Optional[set] = None
+        self._reset(expected_items)
+
+        self.hits = 0
+        self.misses = 0
+        self.unknown = 0
+
+    def _reset(self, capacity: int):
+        self._bloom = BloomFilter(capacity, self.false_positive_rate)
+        self._exact: Optional[set] = set()
+        self._exact_bytes = 0
+        self.count = 0
+
+    def contains(self, email: str) -> Optional[bool]:
+        """True if known, False if definitely new, None if only the Bloom filter matched."""
+        email = normalize_email(email)
+        if email not in self._bloom:
+            self.misses += 1
+            return False
+        if self._exact is None:
+            self.unknown += 1
+            return None
+        if email in self._exact:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, email: str):
+        email = normalize_email(email)
+        if self._pending is not None:
+            self._pending.add(email)
+        if self._exact is not None:
+            if email in self._exact:
+                return
+            self._exact.add(email)
+            self._exact_bytes += sys.getsizeof(email) + _SET_ENTRY_OVERHEAD
+        self._bloom.add(email)
+        self.count += 1
+        if self._exact_bytes > self.max_exact_bytes:
+            logger.warning(
+                "Waitlist email set exceeded %d bytes; falling back to Bloom filter only", self.max_exact_bytes
+            )
+            self._exact = None
+            self._exact_bytes = 0
+
+    def remove(self, email: str):
+        """Forget ``email``, e.g. after its submission was dead-lettered.
+
+        A Bloom filter cannot delete, so the email stays a Bloom positive and
+        is resolved by the exact set (or by Supabase once that is dropped).
+        """
+        email = normalize_email(email)
+        if self._pending is not None:
+            self._pending.discard(email)
+        if self._exact is not None and email in self._exact:
+            self._exact.remove(email)
+            self._exact_bytes -= sys.getsizeof(email) + _SET_ENTRY_OVERHEAD
+            self.count -= 1
+
+    async def rebuild(self, postgrest: PostgrestClient, page_size: int = 1000):
+        """Reload every email from Supabase and swap the new index in."""
+        # Leave headroom so the filter stays accurate until the next rebuild.
+        capacity = max(self.expected_items, self.count * 2)
+        fresh = EmailIndex(capacity, self.false_positive_rate, self.max_exact_bytes)
+        self._pending = set()
+        try:
+            offset = 0
+            while True:
+                rows = await postgrest.select(
+                    WAITLIST_TABLE, {"select": "email", "order": "id.asc"}, offset=offset, limit=page_size
+                )
+                for row in rows:
+                    if row.get("email"):
+                        fresh.add(row["email"])
+                if len(rows) < page_size:
+                    break
+                offset += page_size
+            # Emails added while the rebuild was paging may have been written
+            # after their page was read. Everything else comes from the table
+            # alone, so deleted rows drop out of the index.
+            for email in self._pending:
+                fresh.add(email)
+        finally:
+            self._pending = None
+        self._bloom, self._exact = fresh._bloom, fresh._exact
+        self._exact_bytes, self.count = fresh._exact_bytes, fresh.count
+        self.warmed = True
+        logger.info("Waitlist email index rebuilt with %d emails", self.count)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "emails": self.count,
+            "warmed": self.warmed,
+            "exact": self._exact is not None,
+            "bloom_bytes": self._bloom.nbytes,
+            "exact_bytes": self._exact_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "unknown": self.unknown,
+        }
+
+
+class EmailIndexRefresher:
+    """Warms the index at startup and rebuilds it every ``interval`` seconds."""
+
+    def __init__(self, index: EmailIndex, postgrest: PostgrestClient, interval: float = 3600.0):
+        self.index = index
+        self.postgrest = postgrest
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.index.rebuild(self.postgrest)
+            except Exception:
+                logger.exception("Waitlist email index rebuild failed")
+            await asyncio.sleep(self.interval if self.index.warmed else min(self.interval, 30.0))
@@ -0,0 +1,359 @@
+"""Durable on-disk outbox for waitlist submissions.
+
+A submission is acknowledged once it has been committed (and fsynced) to a
+local SQLite database in WAL mode. A background drainer then pushes rows
+to Supabase in batches:
+
+- each push is retried with exponential backoff (``tenacity``);
+- a circuit breaker stops hammering Supabase while it keeps failing;
+- rows that fail permanently, or exhaust ``max_attempts``, are moved to a
+  ``dead_letter`` table instead of being dropped.
+
+``on_delivered`` and ``on_dead_letter`` are told which payloads reached
+the table (or were already there) and which were given up on.
+
+Rows survive restarts; the drainer simply picks them up again. Several
+worker processes may share one outbox file: each drain claims its batch
+for ``claim_timeout`` seconds, so rows are pushed by one worker at a time.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+from .postgrest import PostgrestClient, PostgrestError
+from .waitlist import WAITLIST_TABLE
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_next_attempt ON outbox (next_attempt_at, id);
+CREATE TABLE IF NOT EXISTS dead_letter (
+    id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    failed_at REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT
+);
+"""
+
+
+def _transient(exc: BaseException) -> bool:
+    """Whether a failed push should be retried rather than dead-lettered.
+
+    401/403 come from missing keys or RLS policies; they are configuration
+    problems, so rows wait for a fix instead of being discarded.
+    Cancellation is never retried, so :meth:`WaitlistOutbox.close` can stop
+    the drainer mid-push.
+    """
+    if not isinstance(exc, Exception):
+        return False
+    if isinstance(exc, PostgrestError):
+        return exc.retryable or exc.status_code in (401, 403)
+    return True
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures.
+
+    While open, calls are refused for ``reset_timeout`` seconds; after that
+    a single trial call is allowed (half-open) and its outcome decides
+    whether the breaker closes again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class WaitlistOutbox:
+    def __init__(
+        self,
+        path: str,
+        postgrest: PostgrestClient,
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        max_attempts: int = 20,
+        max_backoff: float = 300.0,
+        push_retries: int = 3,
+        breaker: Optional[CircuitBreaker] = None,
+        claim_timeout: float = 120.0,
+        on_delivered: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        on_dead_letter: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ):
+        self.path = path
+        self.postgrest = postgrest
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.push_retries = push_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.claim_timeout = claim_timeout
+        self.on_delivered = on_delivered
+        self.on_dead_letter = on_dead_letter
+        # SQLite calls are blocking; run them on one dedicated thread so the
+        # connection is never shared between threads.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="waitlist-outbox")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+
+        self.depth = 0
+        self.oldest_created_at: Optional[float] = None
+        self.dead_letters = 0
+        self.delivered = 0
+        self.duplicates = 0
+        self.push_failures = 0
+
+    async def open(self):
+        await self._run_sync(self._open)
+        await self._refresh_counts()
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._conn is not None:
+            await self._run_sync(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, row: Dict[str, Any]):
+        """Durably store ``row``; returns once it is committed to disk."""
+        created_at = time.time()
+        await self._run_sync(self._insert, json.dumps(row), created_at)
+        self.depth += 1
+        if self.oldest_created_at is None:
+            self.oldest_created_at = created_at
+        self._wakeup.set()
+
+    async def replay_dead_letters(self) -> int:
+        """Move every dead-lettered row back into the outbox."""
+        moved = await self._run_sync(self._requeue_dead_letters)
+        await self._refresh_counts()
+        self._wakeup.set()
+        return moved
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.depth,
+            "lag_seconds": time.time() - self.oldest_created_at if self.oldest_created_at else 0.0,
+            "dead_letters": self.dead_letters,
+            "delivered": self.delivered,
+            "duplicates": self.duplicates,
+            "push_failures": self.push_failures,
+            "circuit_open": self.breaker.state == "open",
+        }
+
+    async def drain_once(self) -> int:
+        """Push one batch of due rows; returns how many rows left the outbox."""
+        if not self.breaker.allow():
+            return 0
+        rows = await self._run_sync(self._claim_due, time.time(), self.batch_size)
+        if not rows:
+            return 0
+        settled = await self._push(rows)
+        await self._refresh_counts()
+        return settled
+
+    async def _run(self):
+        while True:
+            # Cleared before draining so a submit that lands mid-drain is
+            # picked up immediately rather than after poll_interval.
+            self._wakeup.clear()
+            try:
+                settled = await self.drain_once()
+            except Exception:
+                logger.exception("Waitlist outbox drain failed")
+                settled = 0
+            if settled == 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _push(self, rows: List[Tuple[int, str, int]]) -> int:
+        payloads = [json.loads(payload) for _, payload, _ in rows]
+        try:
+            await self._insert_upstream(payloads)
+        except Exception as exc:
+            if _transient(exc):
+                self.push_failures += 1
+                self.breaker.record_failure()
+                await self._run_sync(self._reschedule, rows, str(exc), time.time())
+                exhausted = [
+                    payload for payload, (_, _, attempts) in zip(payloads, rows) if attempts + 1 >= self.max_attempts
+                ]
+                if exhausted:
+                    self._notify(self.on_dead_letter, exhausted)
+                return len(exhausted)
+            if len(rows) > 1:
+                # The bulk insert is atomic; isolate the offending row(s).
+                settled = 0
+                for row in rows:
+                    settled += await self._push([row])
+                return settled
+            if isinstance(exc, PostgrestError) and exc.status_code == 409:
+                # Already on the waitlist upstream; nothing left to deliver.
+                self.duplicates += 1
+                await self._run_sync(self._delete, [rows[0][0]])
+                self._notify(self.on_delivered, payloads)
+            else:
+                row_id, payload, attempts = rows[0]
+                await self._run_sync(self._dead_letter, [(row_id, payload, attempts + 1)], str(exc), time.time())
+                self._notify(self.on_dead_letter, payloads)
+            return 1
+        self.breaker.record_success()
+        self.delivered += len(rows)
+        await self._run_sync(self._delete, [row_id for row_id, _, _ in rows])
+        self._notify(self.on_delivered, payloads)
+        return len(rows)
+
+    def _notify(self, callback, payloads: List[Dict[str, Any]]):
+        if callback is None:
+            return
+        try:
+            callback(payloads)
+        except Exception:
+            logger.exception("Waitlist outbox callback failed")
+
+    async def _insert_upstream(self, payloads: List[Dict[str, Any]]):
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.push_retries),
+            wait=wait_exponential_jitter(initial=0.2, max=2.0),
+            retry=retry_if_exception_type(Exception) & retry_if_exception(_transient),
+            reraise=True,
+        ):
+            with attempt:
+                await self.postgrest.insert(WAITLIST_TABLE, payloads)
+
+    async def _refresh_counts(self):
+        self.depth, self.oldest_created_at, self.dead_letters = await self._run_sync(self._counts)
+
+    async def _run_sync(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # The methods below run on the outbox thread.
+
+    def _open(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL fsyncs the WAL on every commit, which is what makes a 202 durable.
+        self._conn.execute("PRAGMA synchronous=FULL")
+        # Other workers may hold the write lock briefly while claiming rows.
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+    def _insert(self, payload: str, created_at: float):
+        self._conn.execute("INSERT INTO outbox (payload, created_at) VALUES (?, ?)", (payload, created_at))
+
+    def _claim_due(self, now: float, limit: int) -> List[Tuple[int, str, int]]:
+        # BEGIN IMMEDIATE serializes claims across processes. Claimed rows are
+        # hidden until claim_timeout; a worker that dies mid-push just lets
+        # the claim lapse and another worker retries the rows.
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                "SELECT id, payload, attempts FROM outbox WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET next_attempt_at = ? WHERE id = ?",
+                [(now + self.claim_timeout, row_id) for row_id, _, _ in rows],
+            )
+        return rows
+
+    def _delete(self, ids: List[int]):
+        self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in ids])
+
+    def _reschedule(self, rows: List[Tuple[int, str, int]], error: str, now: float):
+        exhausted = [(row_id, payload, attempts + 1) for row_id, payload, attempts in rows if attempts + 1 >= self.max_attempts]
+        with self._conn:
+            self._conn.execute("BEGIN")
+            for row_id, _, attempts in rows:
+                if attempts + 1 >= self.max_attempts:
+                    continue
+                delay = min(self.max_backoff, 2 ** attempts)
+                self._conn.execute(
+                    "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (attempts + 1, now + delay, error, row_id),
+                )
+        if exhausted:
+            self._dead_letter(exhausted, error, now)
+
+    def _dead_letter(self, rows: List[Tuple[int, str, int]], error: str, now: float):
+        with self._conn:
+            self._conn.execute("BEGIN")
+            for row_id, _, attempts in rows:
+                self._conn.execute(
+                    "INSERT INTO dead_letter (id, payload, created_at, failed_at, attempts, error) "
+                    "SELECT id, payload, created_at, ?, ?, ? FROM outbox WHERE id = ?",
+                    (now, attempts, error, row_id),
+                )
+                self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+        logger.warning("Dead-lettered %d waitlist submissions: %s", len(rows), error)
+
+    def _requeue_dead_letters(self) -> int:
+        with self._conn:
+            self._conn.execute("BEGIN")
+            moved = self._conn.execute(
+                "INSERT INTO outbox (payload, created_at) SELECT payload, created_at FROM dead_letter ORDER BY id"
+            ).rowcount
+            self._conn.execute("DELETE FROM dead_letter")
+        return moved
+
+    def _counts(self) -> Tuple[int, Optional[float], int]:
+        depth, oldest = self._conn.execute("SELECT COUNT(*), MIN(created_at) FROM outbox").fetchone()
+        dead_letters = self._conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+        return depth, oldest, dead_letters
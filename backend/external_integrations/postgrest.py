@@ -0,0 +1,70 @@
+"""Minimal async PostgREST (Supabase REST) client on a pooled httpx client.
+
+One :class:`PostgrestClient` is created per process and reused for every
+request, so connections to Supabase stay warm (keep-alive) instead of
+paying a TLS handshake per submission.
+"""
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+class PostgrestError(Exception):
+    """Raised for non-2xx PostgREST responses."""
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"PostgREST returned {status_code}: {body[:200]}")
+        self.status_code = status_code
+        self.body = body
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code in (408, 429) or self.status_code >= 500
+
+
+class PostgrestClient:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout: float = 5.0,
+        max_connections: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=f"{base_url.rstrip('/')}/rest/v1",
+            headers={"apikey": api_key, "Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    async def insert(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        on_conflict: Optional[str] = None,
+        merge_duplicates: bool = False,
+    ):
+        """Insert ``rows`` in a single request; PostgREST applies it atomically."""
+        prefer = ["return=minimal"]
+        params = {}
+        if on_conflict is not None:
+            params["on_conflict"] = on_conflict
+            prefer.append("resolution=merge-duplicates" if merge_duplicates else "resolution=ignore-duplicates")
+        response = await self._client.post(f"/{table}", json=rows, params=params, headers={"Prefer": ",".join(prefer)})
+        if response.status_code >= 300:
+            raise PostgrestError(response.status_code, response.text)
+
+    async def select(self, table: str, params: Dict[str, str], offset: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        response = await self._client.get(
+            f"/{table}",
+            params=params,
+            headers={"Range-Unit": "items", "Range": f"{offset}-{offset + limit - 1}"},
+        )
+        if response.status_code >= 300:
+            raise PostgrestError(response.status_code, response.text)
+        return response.json()
+
+    async def aclose(self):
+        await self._client.aclose()
@@ -0,0 +1,229 @@
+"""Server-side waitlist ingestion in front of the Supabase ``waitlist`` table.
+
+``POST /api/waitlist`` validates a submission and hands it to a
+:class:`WaitlistBatcher`, which coalesces concurrent submissions into one
+bulk PostgREST insert. Each caller still gets its own success or error.
+Inserts that fail with a retryable status (408, 429, 5xx) or a network
+error are retried with a short exponential backoff first.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import APIRouter, HTTPException, Request, Response
+from pydantic import BaseModel, EmailStr, Field
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+from .postgrest import PostgrestClient, PostgrestError
+
+logger = logging.getLogger(__name__)
+
+WAITLIST_TABLE = "waitlist"
+
+_STOP = object()
+
+
+class BatcherClosed(Exception):
+    """Raised by :meth:`WaitlistBatcher.submit` once the batcher is closing."""
+
+
+def _retryable(exc: BaseException) -> bool:
+    if isinstance(exc, PostgrestError):
+        return exc.retryable
+    return isinstance(exc, httpx.TransportError)
+
+
+class WaitlistSubmission(BaseModel):
+    first_name: str = Field(..., min_length=1, max_length=100)
+    last_name: str = Field(..., min_length=1, max_length=100)
+    email: EmailStr
+    phone_number: str = Field(..., min_length=1, max_length=40)
+    institution: str = Field(..., min_length=1, max_length=200)
+    role: str = Field(..., min_length=1, max_length=100)
+    student_count: str = Field(..., min_length=1, max_length=50)
+
+    def to_row(self) -> Dict[str, Any]:
+        row = self.dict()
+        row["email"] = row["email"].lower()
+        return row
+
+
+class WaitlistBatcher:
+    """Groups submissions arriving within ``max_delay`` into one insert."""
+
+    def __init__(
+        self,
+        postgrest: PostgrestClient,
+        max_batch: int = 50,
+        max_delay: float = 0.02,
+        insert_attempts: int = 3,
+        max_backoff: float = 0.5,
+    ):
+        self.postgrest = postgrest
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.insert_attempts = insert_attempts
+        self.max_backoff = max_backoff
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.batches = 0
+        self.submitted = 0
+        self.failed = 0
+
+    def start(self):
+        if self._worker is None:
+            self._closing = False
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, row: Dict[str, Any]):
+        """Insert ``row`` as part of the next batch; raises :class:`PostgrestError`.
+
+        Raises :class:`BatcherClosed` straight away once :meth:`close` was
+        called, since nothing would send the row.
+        """
+        if self._closing or self._worker is None:
+            raise BatcherClosed("Waitlist batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        await future
+
+    async def close(self):
+        """Send everything already queued, then stop the worker."""
+        if self._worker is None or self._closing:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        await self._worker
+        self._worker = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "submitted": self.submitted,
+            "failed": self.failed,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        try:
+            self.batches += 1
+            await self._insert([row for row, _ in batch])
+        except PostgrestError as exc:
+            if len(batch) > 1 and not exc.retryable:
+                # A bulk insert is all-or-nothing; retry one by one so a
+                # single bad row does not fail everyone else in the batch.
+                for item in batch:
+                    await self._flush([item])
+                return
+            self._fail(batch, exc)
+            return
+        except Exception as exc:
+            self._fail(batch, exc)
+            return
+        self.submitted += len(batch)
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def _insert(self, rows: List[Dict[str, Any]]):
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(self.insert_attempts),
+            wait=wait_exponential_jitter(initial=0.05, max=self.max_backoff),
+            retry=retry_if_exception_type(Exception) & retry_if_exception(_retryable),
+            reraise=True,
+        ):
+            with attempt:
+                await self.postgrest.insert(WAITLIST_TABLE, rows)
+
+    def _fail(self, batch, exc: Exception):
+        self.failed += len(batch)
+        logger.warning("Waitlist insert of %d rows failed: %s", len(batch), exc)
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+
+def create_waitlist_router(duplicates: str = "reject") -> APIRouter:
+    """Build the waitlist routes.
+
+    The routes use whatever the app's lifespan put on ``app.state``:
+    ``waitlist_batcher``, ``waitlist_outbox`` and ``email_index``, any of
+    which may be missing. With an ``outbox`` (see :mod:`.outbox`) submissions are acknowledged
+    with 202 once stored locally and delivered in the background;
+    otherwise they are forwarded through ``batcher`` before answering 201.
+    An ``email_index`` (see :mod:`.email_index`) short-circuits known
+    duplicates: ``duplicates="reject"`` answers 409, ``"ignore"`` answers
+    200 and leaves the existing row untouched. Emails only enter the index
+    once Supabase has the row; in outbox mode that is up to the outbox's
+    ``on_delivered`` callback.
+    """
+    router = APIRouter(prefix="/api")
+
+    @router.post("/waitlist", status_code=201)
+    async def submit_waitlist(submission: WaitlistSubmission, request: Request, response: Response):
+        batcher = getattr(request.app.state, "waitlist_batcher", None)
+        outbox = getattr(request.app.state, "waitlist_outbox", None)
+        email_index = getattr(request.app.state, "email_index", None)
+        row = submission.to_row()
+        if email_index is not None and email_index.contains(row["email"]) is True:
+            if duplicates == "ignore":
+                response.status_code = 200
+                return {"status": "exists"}
+            raise HTTPException(status_code=409, detail="This email is already on the waitlist")
+
+        if outbox is not None:
+            await outbox.submit(row)
+            response.status_code = 202
+            return {"status": "queued"}
+        if batcher is None:
+            raise HTTPException(status_code=503, detail="Waitlist is not configured")
+        try:
+            await batcher.submit(row)
+        except BatcherClosed:
+            raise HTTPException(status_code=503, detail="Waitlist is shutting down", headers={"Retry-After": "1"})
+        except PostgrestError as exc:
+            if exc.status_code == 409:
+                if email_index is not None:
+                    email_index.add(row["email"])
+                raise HTTPException(status_code=409, detail="This email is already on the waitlist")
+            raise HTTPException(status_code=502, detail="Could not save your submission, please try again")
+        except Exception:
+            raise HTTPException(status_code=502, detail="Could not save your submission, please try again")
+
+        if email_index is not None:
+            email_index.add(row["email"])
+        return {"status": "ok"}
+
+    return router
@@ -0,0 +1,77 @@
+"""Liveness and readiness probes.
+
+``GET /api/healthz`` answers 200 as long as the event loop is serving
+requests. ``GET /api/readyz`` runs every registered check concurrently
+and answers 200 only when all critical checks pass; non-critical checks
+(e.g. Redis, which has an in-process fallback) are reported but do not
+fail readiness. The first time the app is ready, the time since startup
+is logged.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# A check returns None when healthy, or a short description of the problem.
+Check = Callable[[], Awaitable[Optional[str]]]
+
+
+def missing_env(names: Sequence[str]) -> Optional[str]:
+    missing = [name for name in names if not os.environ.get(name)]
+    return f"missing {', '.join(missing)}" if missing else None
+
+
+class Readiness:
+    def __init__(self, timeout: float = 2.0, started_at: Optional[float] = None):
+        self.timeout = timeout
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.ready_after: Optional[float] = None
+        self._checks: List[Tuple[str, Check, bool]] = []
+
+    def add(self, name: str, check: Check, critical: bool = True):
+        self._checks.append((name, check, critical))
+
+    async def _run_check(self, check: Check) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(check(), self.timeout)
+        except asyncio.TimeoutError:
+            return f"timed out after {self.timeout}s"
+        except Exception as exc:
+            return f"{type(exc).__name__}: {exc}"
+
+    async def run(self) -> Tuple[bool, Dict[str, str]]:
+        problems = await asyncio.gather(*(self._run_check(check) for _, check, _ in self._checks))
+        ready = True
+        results = {}
+        for (name, _, critical), problem in zip(self._checks, problems):
+            results[name] = problem or "ok"
+            if problem is not None and critical:
+                ready = False
+        if ready and self.ready_after is None:
+            self.ready_after = time.monotonic() - self.started_at
+            logger.info("Ready %.2fs after startup", self.ready_after)
+        return ready, results
+
+
+def create_health_router(readiness: Readiness) -> APIRouter:
+    router = APIRouter(prefix="/api")
+
+    @router.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @router.get("/readyz")
+    async def readyz():
+        ready, checks = await readiness.run()
+        return JSONResponse(
+            {"status": "ready" if ready else "not_ready", "checks": checks},
+            status_code=200 if ready else 503,
+        )
+
+    return router
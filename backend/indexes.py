@@ -0,0 +1,154 @@
+"""Declarative index registry for the backend's Mongo collections.
+
+``INDEXES`` is the single source of truth for which indexes exist.
+:func:`ensure_indexes` applies it idempotently and runs at startup.
+:func:`check_query_plans` explains every query in ``HOT_QUERIES`` and
+fails if any of them would run as a collection scan.
+
+Run from the backend directory:
+
+    python indexes.py ensure   # create missing indexes
+    python indexes.py check    # exit 1 if a hot query would COLLSCAN
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from export import time_range_query
+from pagination import encode_cursor, keyset_query
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "status_checks": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # Serves keyset pagination and range exports in either direction,
+        # and doubles as the timestamp-descending index.
+        IndexModel([("timestamp", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("client_name", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "status_rollups": [
+        # Also the key that the rollup $merge stage upserts on.
+        IndexModel([("granularity", ASCENDING), ("client_name", ASCENDING), ("bucket", ASCENDING)], unique=True),
+        IndexModel([("granularity", ASCENDING), ("bucket", ASCENDING)]),
+    ],
+}
+
+_SAMPLE_TIME = datetime(2025, 1, 1)
+_SAMPLE_CURSOR = encode_cursor(_SAMPLE_TIME, "00000000-0000-0000-0000-000000000000")
+
+# Queries issued by the API, keyed by a name used in failure reports.
+HOT_QUERIES: Dict[str, Dict[str, Any]] = {
+    "status_page": {
+        "collection": "status_checks",
+        "filter": keyset_query(None, "desc")[0],
+        "sort": keyset_query(None, "desc")[1],
+    },
+    "status_page_after_cursor": {
+        "collection": "status_checks",
+        "filter": keyset_query(_SAMPLE_CURSOR, "desc")[0],
+        "sort": keyset_query(_SAMPLE_CURSOR, "desc")[1],
+    },
+    "status_export_range": {
+        "collection": "status_checks",
+        "filter": time_range_query(_SAMPLE_TIME, datetime(2025, 2, 1)),
+        "sort": [("timestamp", 1), ("id", 1)],
+    },
+    "status_export_client": {
+        "collection": "status_checks",
+        "filter": time_range_query(_SAMPLE_TIME, None, "sample-client"),
+        "sort": [("timestamp", 1), ("id", 1)],
+    },
+    "status_oldest": {
+        # rollups.refresh_rollups and retention.retention_status.
+        "collection": "status_checks",
+        "filter": {},
+        "sort": [("timestamp", 1)],
+    },
+    "status_rollups_range": {
+        "collection": "status_rollups",
+        "filter": {"granularity": "hour", "bucket": {"$gte": _SAMPLE_TIME}},
+        "sort": [("bucket", 1), ("client_name", 1)],
+    },
+}
+
+
+class QueryPlanError(RuntimeError):
+    """Raised when a hot query's winning plan contains a COLLSCAN stage."""
+
+
+async def ensure_indexes(db, registry: Optional[Dict[str, List[IndexModel]]] = None) -> Dict[str, List[str]]:
+    """Create every registered index; existing identical indexes are no-ops."""
+    created = {}
+    for collection, models in (registry or INDEXES).items():
+        created[collection] = await db[collection].create_indexes(models)
+        logger.info("Ensured indexes on %s: %s", collection, ", ".join(created[collection]))
+    return created
+
+
+def _plan_stages(plan: Dict[str, Any]) -> Iterator[str]:
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+async def check_query_plans(db, queries: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, List[str]]:
+    """Explain each hot query and raise :class:`QueryPlanError` on COLLSCAN."""
+    plans = {}
+    offenders = []
+    for name, query in (queries or HOT_QUERIES).items():
+        cursor = db[query["collection"]].find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        explained = await cursor.limit(query.get("limit", 100)).explain()
+        stages = list(_plan_stages(explained["queryPlanner"]["winningPlan"]))
+        plans[name] = stages
+        if "COLLSCAN" in stages:
+            offenders.append(name)
+    if offenders:
+        raise QueryPlanError(f"Hot queries fall back to COLLSCAN: {', '.join(offenders)}")
+    return plans
+
+
+async def _main(command: str):
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        if command == "ensure":
+            print(json.dumps(await ensure_indexes(db), indent=2))
+        else:
+            print(json.dumps(await check_query_plans(db), indent=2))
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage Mongo indexes for the backend")
+    parser.add_argument("command", choices=["ensure", "check"], help="Create registered indexes or verify query plans")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(_main(args.command))
+    except QueryPlanError as exc:
+        logger.error(str(exc))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Prometheus instrumentation for the FastAPI app and the Motor client.
+
+- :class:`PrometheusMiddleware` records request latency per route template
+  and status code, tracks in-flight requests, and records the cold-start
+  time until the first successful request.
+- :class:`MongoCommandListener` is a PyMongo command listener that times
+  every command by collection and command name.
+- :func:`register_stats` exposes an object's ``stats()`` dict as gauges
+  that are read at scrape time, so it adds no cost on the request path.
+
+With several uvicorn workers, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty
+directory shared by the workers: request and Mongo metrics are then
+aggregated across workers, while ``register_stats`` gauges describe the
+worker that served the scrape.
+"""
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from pymongo import monitoring
+from starlette.requests import Request
+from starlette.responses import Response
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status code",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+COLD_START = Gauge(
+    "app_cold_start_seconds",
+    "Seconds from app import until the first successful non-probe request",
+    multiprocess_mode="max",
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency by collection and command",
+    ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["collection", "command"],
+)
+
+_IMPORTED_AT = time.monotonic()
+
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware; avoids BaseHTTPMiddleware's per-request task."""
+
+    def __init__(
+        self,
+        app,
+        skip_paths=("/metrics",),
+        probe_paths=("/api/healthz", "/api/readyz"),
+        started_at: Optional[float] = None,
+    ):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+        self.probe_paths = set(probe_paths)
+        self.started_at = started_at if started_at is not None else _IMPORTED_AT
+        self.cold_start: Optional[float] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # FastAPI records the matched APIRoute in the scope; unmatched
+            # paths share one label to keep cardinality bounded.
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or "unmatched"
+            REQUEST_LATENCY.labels(method, template, str(status)).observe(time.perf_counter() - start)
+            in_progress.dec()
+            if self.cold_start is None and status < 400 and scope["path"] not in self.probe_paths:
+                self.cold_start = time.monotonic() - self.started_at
+                COLD_START.set(self.cold_start)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self):
+        self._collections: Dict[tuple, str] = {}
+
+    def started(self, event):
+        # The collection is only present on the started event; getMore
+        # names it under "collection" rather than under the command name.
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get("collection", "none")
+        self._collections[(event.connection_id, event.request_id)] = target
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "none")
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "none")
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+class _StatsCollector(Collector):
+    def __init__(self, prefix: str, documentation: str, stats: Callable[[], Dict[str, object]]):
+        self.prefix = prefix
+        self.documentation = documentation
+        self.stats = stats
+
+    def collect(self):
+        for key, value in self.stats().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            yield GaugeMetricFamily(f"{self.prefix}_{key}", f"{self.documentation}: {key}", value=value)
+
+
+_stats_collectors: List[_StatsCollector] = []
+
+
+def register_stats(prefix: str, documentation: str, stats: Callable[[], Dict[str, object]]):
+    collector = _StatsCollector(prefix, documentation, stats)
+    REGISTRY.register(collector)
+    _stats_collectors.append(collector)
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the multiprocess directory on exit."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _stats_collectors:
+            registry.register(collector)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,72 @@
+"""Keyset (cursor) pagination helpers for timestamp-ordered collections.
+
+Pages are ordered on the compound key ``(timestamp, id)`` so that the
+position of the last row returned is enough to resume the scan with an
+index seek, regardless of how deep into the collection the client is.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pymongo
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+SORT_DIRECTIONS = {
+    "desc": pymongo.DESCENDING,
+    "asc": pymongo.ASCENDING,
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a cursor we did not issue."""
+
+
+def encode_cursor(timestamp: datetime, id: str) -> str:
+    """Encode the position of a row as an opaque, URL-safe cursor."""
+    raw = json.dumps({"t": timestamp.isoformat(), "i": id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor produced by :func:`encode_cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), str(data["i"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor("Malformed pagination cursor") from exc
+
+
+def keyset_query(cursor: Optional[str], order: str) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """Build the filter and sort for the page that follows ``cursor``."""
+    direction = SORT_DIRECTIONS[order]
+    sort = [("timestamp", direction), ("id", direction)]
+    if cursor is None:
+        return {}, sort
+
+    timestamp, id = decode_cursor(cursor)
+    op = "$lt" if direction == pymongo.DESCENDING else "$gt"
+    query = {
+        "$or": [
+            {"timestamp": {op: timestamp}},
+            {"timestamp": timestamp, "id": {op: id}},
+        ]
+    }
+    return query, sort
+
+
+def next_cursor(rows: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """Return the cursor for the next page, trimming the look-ahead row.
+
+    Callers fetch ``limit + 1`` rows; the extra row only tells us whether
+    another page exists and is removed from ``rows`` in place.
+    """
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    last = rows[-1]
+    return encode_cursor(last["timestamp"], last["id"])
@@ -0,0 +1,266 @@
+"""Token-bucket rate limiting for write endpoints.
+
+Buckets live in Redis and are checked and debited by a Lua script, so
+every worker shares the same limits and a request that spans several
+buckets (per IP, per client, global) is admitted or refused atomically.
+When Redis is not configured or unreachable, the same algorithm runs on
+an in-process table, and limits then apply per worker.
+
+Limits are written ``"<rate>:<burst>"``: ``rate`` tokens are refilled per
+second, up to ``burst`` tokens.
+"""
+import logging
+import math
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# KEYS: bucket keys. ARGV: now_ms, then rate, burst, cost per key.
+# Returns allowed (0/1) followed by remaining, retry_after_ms and
+# reset_ms for each key. Nothing is debited unless every bucket allows.
+_TOKEN_BUCKET = """
+local now = tonumber(ARGV[1])
+local state = {}
+local allowed = 1
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 3 - 1])
+  local burst = tonumber(ARGV[i * 3])
+  local cost = tonumber(ARGV[i * 3 + 1])
+  local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(bucket[1]) or burst
+  local ts = tonumber(bucket[2]) or now
+  tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+  if tokens < cost then allowed = 0 end
+  state[i] = {tokens, rate, burst, cost}
+end
+local result = {allowed}
+for i, key in ipairs(KEYS) do
+  local tokens, rate, burst, cost = unpack(state[i])
+  if allowed == 1 then tokens = tokens - cost end
+  redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+  redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+  local retry_after = 0
+  if tokens < cost then retry_after = math.ceil((cost - tokens) / rate * 1000) end
+  table.insert(result, math.floor(tokens))
+  table.insert(result, retry_after)
+  table.insert(result, math.ceil((burst - tokens) / rate * 1000))
+end
+return result
+"""
+
+
+class Limit(NamedTuple):
+    rate: float
+    burst: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "Limit":
+        rate, _, burst = spec.partition(":")
+        return cls(float(rate), int(burst or math.ceil(float(rate))))
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: float
+    retry_after: float
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(max(0, self.remaining)),
+            "RateLimit-Reset": str(math.ceil(self.reset)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        redis=None,
+        namespace: str = "ratelimit",
+        retry_after: float = 5.0,
+        max_local_buckets: int = 100_000,
+    ):
+        self.namespace = namespace
+        self.retry_after = retry_after
+        self.max_local_buckets = max_local_buckets
+        self.use_redis(redis)
+        self._local: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+        self.allowed = 0
+        self.limited = 0
+        self.redis_errors = 0
+
+    def use_redis(self, redis):
+        """Switch to ``redis`` (or to in-process buckets alone with None)."""
+        self.redis = redis
+        self._script = redis.register_script(_TOKEN_BUCKET) if redis is not None else None
+        self._redis_down_until = 0.0
+
+    async def check(self, buckets: Sequence[Tuple[str, Limit, int]]) -> Decision:
+        """Debit ``cost`` from every ``(key, limit, cost)`` bucket, or from none.
+
+        The returned decision describes the most constrained bucket.
+        """
+        now_ms = time.time() * 1000
+        results = None
+        if self.redis is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                results = await self._check_redis(buckets, now_ms)
+            except RedisError as exc:
+                self.redis_errors += 1
+                self._redis_down_until = time.monotonic() + self.retry_after
+                logger.warning("Redis unavailable, rate limiting per process for %.0fs: %s", self.retry_after, exc)
+        if results is None:
+            results = self._check_local(buckets, now_ms)
+
+        allowed, per_bucket = results
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        # Report the bucket with the fewest tokens left relative to its size.
+        index = min(range(len(buckets)), key=lambda i: per_bucket[i][0] / buckets[i][1].burst)
+        remaining, retry_after_ms, reset_ms = per_bucket[index]
+        if not allowed:
+            retry_after_ms = max(entry[1] for entry in per_bucket)
+        return Decision(allowed, buckets[index][1].burst, remaining, reset_ms / 1000, retry_after_ms / 1000)
+
+    async def enforce(self, buckets: Sequence[Tuple[str, Limit, int]]) -> Decision:
+        """Like :meth:`check`, but raises 429 with rate-limit headers when refused."""
+        decision = await self.check(buckets)
+        if not decision.allowed:
+            raise HTTPException(status_code=429, detail="Rate limit exceeded", headers=decision.headers())
+        return decision
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "redis_errors": self.redis_errors,
+            "local_buckets": len(self._local),
+        }
+
+    async def _check_redis(self, buckets, now_ms: float) -> Tuple[bool, List[Tuple[int, float, float]]]:
+        args: List[object] = [int(now_ms)]
+        for _, limit, cost in buckets:
+            args.extend([limit.rate, limit.burst, cost])
+        keys = [f"{self.namespace}:{key}" for key, _, _ in buckets]
+        raw = await self._script(keys=keys, args=args)
+        per_bucket = [tuple(raw[i:i + 3]) for i in range(1, len(raw), 3)]
+        return raw[0] == 1, per_bucket
+
+    def _check_local(self, buckets, now_ms: float) -> Tuple[bool, List[Tuple[int, float, float]]]:
+        state = []
+        allowed = True
+        for key, limit, cost in buckets:
+            tokens, ts = self._local.get(key, (limit.burst, now_ms))
+            tokens = min(limit.burst, tokens + max(0.0, now_ms - ts) * limit.rate / 1000)
+            if tokens < cost:
+                allowed = False
+            state.append(tokens)
+
+        per_bucket = []
+        for (key, limit, cost), tokens in zip(buckets, state):
+            if allowed:
+                tokens -= cost
+            self._local[key] = (tokens, now_ms)
+            self._local.move_to_end(key)
+            retry_after = math.ceil((cost - tokens) / limit.rate * 1000) if tokens < cost else 0
+            per_bucket.append((math.floor(tokens), retry_after, math.ceil((limit.burst - tokens) / limit.rate * 1000)))
+        while len(self._local) > self.max_local_buckets:
+            self._local.popitem(last=False)
+        return allowed, per_bucket
+
+
+class RateLimitMiddleware:
+    """Applies per-IP and global write budgets to selected routes.
+
+    ``routes`` is a set of ``(method, path)`` pairs to limit; each request
+    costs one token. Routes in ``sized_routes`` cost one token per item
+    written instead: the middleware only puts itself on
+    ``request.state.rate_limit`` and the handler charges
+    :meth:`buckets` once it knows the item count. The peer address is
+    used as the client IP unless the request came through the local nginx
+    proxy, in which case ``X-Real-IP`` is trusted.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: RateLimiter,
+        routes: Set[Tuple[str, str]],
+        per_ip: Limit,
+        global_writes: Limit,
+        trusted_proxies: Sequence[str] = ("127.0.0.1", "::1"),
+        sized_routes: Set[Tuple[str, str]] = frozenset(),
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.routes = routes
+        self.sized_routes = sized_routes
+        self.per_ip = per_ip
+        self.global_writes = global_writes
+        self.trusted_proxies = set(trusted_proxies)
+
+    def _client_ip(self, scope) -> str:
+        peer = scope.get("client")[0] if scope.get("client") else "unknown"
+        if peer in self.trusted_proxies:
+            for name, value in scope["headers"]:
+                if name == b"x-real-ip":
+                    return value.decode("latin-1")
+        return peer
+
+    def buckets(self, scope, cost: int = 1) -> List[Tuple[str, Limit, int]]:
+        """The per-IP and global buckets for a request writing ``cost`` items."""
+        return [
+            (f"ip:{self._client_ip(scope)}", self.per_ip, cost),
+            ("global:writes", self.global_writes, cost),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = (scope["method"], scope["path"])
+        if route in self.sized_routes:
+            scope.setdefault("state", {})["rate_limit"] = self
+            await self.app(scope, receive, send)
+            return
+        if route not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        decision = await self.limiter.check(self.buckets(scope))
+        headers = [(name.lower().encode(), value.encode()) for name, value in decision.headers().items()]
+        if not decision.allowed:
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [(b"content-type", b"application/json"), *headers],
+            })
+            await send({"type": "http.response.body", "body": b'{"detail":"Rate limit exceeded"}'})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *headers]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def client_buckets(limit: Optional[Limit], client_names: Iterable[str]) -> List[Tuple[str, Limit, int]]:
+    """Per-``client_name`` buckets; each item costs one token for the client it is written for."""
+    if limit is None:
+        return []
+    return [(f"client:{name}", limit, count) for name, count in Counter(client_names).items()]
@@ -0,0 +1,191 @@
+"""Retention for status_checks: raw events expire, their rollups stay.
+
+Raw events expire through a TTL index on ``timestamp``. Before they go,
+the rollup refresher (see rollups.py) has downsampled them into
+``status_rollups``, the compact archive of per-client counts per minute,
+hour and day. Minute buckets expire too, later than the raw events they
+summarize; hour and day buckets are kept. Changing a TTL updates the
+existing index in place with ``collMod`` instead of rebuilding it.
+
+Both TTLs are opt-in. A raw TTL is only safe while the rollup refresher
+runs: the server refuses to start with one when the refresher is disabled.
+
+MongoDB's TTL monitor knows nothing about rollups, so
+:func:`retention_status` reports how close the oldest unarchived raw
+event is to expiring, and :func:`storage_report` adds collection and
+index sizes next to the WiredTiger cache size.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from rollups import GRANULARITIES, ROLLUPS_COLLECTION, STATE_COLLECTION, STATE_ID
+
+logger = logging.getLogger(__name__)
+
+RAW_TTL_INDEX = "timestamp_ttl"
+MINUTE_ROLLUP_TTL_INDEX = "minute_bucket_ttl"
+# Only hour buckets are derived from minute buckets (days come from hours,
+# which never expire). A refresh re-derives the hour containing its
+# high-water mark, re-reading up to an hour of minute buckets older than the
+# raw events it rolls up, so minute buckets must outlive them by an hour.
+MINUTE_ROLLUP_MARGIN = GRANULARITIES["hour"]
+# Unarchived raw events closer than this to expiry are reported at risk.
+ARCHIVE_WARNING = timedelta(days=1)
+
+INDEX_NOT_FOUND = 27
+NAMESPACE_NOT_FOUND = 26
+
+
+@dataclass
+class TtlIndex:
+    collection: str
+    name: str
+    field: str
+    # None means no expiry; an existing index is dropped.
+    ttl: Optional[timedelta]
+    partial_filter: Optional[Dict[str, Any]] = None
+
+    def model(self) -> IndexModel:
+        options: Dict[str, Any] = {"name": self.name, "expireAfterSeconds": int(self.ttl.total_seconds())}
+        if self.partial_filter is not None:
+            options["partialFilterExpression"] = self.partial_filter
+        return IndexModel([(self.field, ASCENDING)], **options)
+
+
+@dataclass
+class RetentionPolicy:
+    raw_ttl: Optional[timedelta] = None
+    minute_rollup_ttl: Optional[timedelta] = None
+
+    def __post_init__(self):
+        if self.raw_ttl is not None and self.minute_rollup_ttl is not None:
+            if self.minute_rollup_ttl < self.raw_ttl + MINUTE_ROLLUP_MARGIN:
+                raise ValueError("Minute rollups must be kept at least an hour longer than raw status checks")
+
+    @classmethod
+    def from_days(cls, raw_days: float, minute_rollup_days: float) -> "RetentionPolicy":
+        """0 days keeps documents forever."""
+        return cls(
+            raw_ttl=timedelta(days=raw_days) if raw_days > 0 else None,
+            minute_rollup_ttl=timedelta(days=minute_rollup_days) if minute_rollup_days > 0 else None,
+        )
+
+    def ttl_indexes(self) -> List[TtlIndex]:
+        return [
+            # A TTL index has to be single-field, so it cannot reuse the
+            # (timestamp, id) index.
+            TtlIndex("status_checks", RAW_TTL_INDEX, "timestamp", self.raw_ttl),
+            TtlIndex(ROLLUPS_COLLECTION, MINUTE_ROLLUP_TTL_INDEX, "bucket", self.minute_rollup_ttl,
+                     partial_filter={"granularity": "minute"}),
+        ]
+
+
+async def apply_ttl_index(db, spec: TtlIndex) -> str:
+    """Make ``spec`` hold on the server; returns what had to be done."""
+    collection = db[spec.collection]
+    existing = next((index for index in await collection.list_indexes().to_list(None)
+                     if index["name"] == spec.name), None)
+    if spec.ttl is None:
+        if existing is None:
+            return "absent"
+        try:
+            await collection.drop_index(spec.name)
+        except OperationFailure as exc:
+            # Another worker dropped it first.
+            if exc.code != INDEX_NOT_FOUND:
+                raise
+        return "dropped"
+    if existing is None:
+        await collection.create_indexes([spec.model()])
+        return "created"
+    seconds = int(spec.ttl.total_seconds())
+    if existing.get("expireAfterSeconds") == seconds:
+        return "unchanged"
+    await db.command("collMod", spec.collection, index={"name": spec.name, "expireAfterSeconds": seconds})
+    return "updated"
+
+
+async def apply_retention(db, policy: RetentionPolicy) -> Dict[str, str]:
+    applied = {}
+    for spec in policy.ttl_indexes():
+        applied[spec.name] = await apply_ttl_index(db, spec)
+        logger.info("TTL index %s on %s: %s", spec.name, spec.collection, applied[spec.name])
+    return applied
+
+
+async def retention_status(db, policy: RetentionPolicy, now: Optional[datetime] = None) -> Dict[str, Any]:
+    now = now or datetime.utcnow()
+    state = await db[STATE_COLLECTION].find_one({"_id": STATE_ID})
+    archived_through = state["high_water_mark"] if state else None
+    oldest = await db.status_checks.find_one({}, {"timestamp": 1}, sort=[("timestamp", 1)])
+    oldest_raw = oldest["timestamp"] if oldest else None
+
+    status: Dict[str, Any] = {
+        "raw_ttl_seconds": int(policy.raw_ttl.total_seconds()) if policy.raw_ttl else None,
+        "minute_rollup_ttl_seconds": int(policy.minute_rollup_ttl.total_seconds()) if policy.minute_rollup_ttl else None,
+        "archived_through": archived_through,
+        "oldest_raw": oldest_raw,
+        "archive_at_risk": False,
+    }
+    # Everything from the high-water mark on is not yet in the rollups.
+    unarchived_since = archived_through if archived_through is not None else oldest_raw
+    if policy.raw_ttl is not None and unarchived_since is not None and oldest_raw is not None:
+        expires_in = unarchived_since + policy.raw_ttl - now
+        status["unarchived_expires_in_seconds"] = round(expires_in.total_seconds())
+        status["archive_at_risk"] = expires_in < min(ARCHIVE_WARNING, policy.raw_ttl / 2)
+    return status
+
+
+async def collection_stats(db, name: str) -> Dict[str, Any]:
+    try:
+        shards = await db[name].aggregate([{"$collStats": {"storageStats": {}}}]).to_list(None)
+    except OperationFailure as exc:
+        if exc.code == NAMESPACE_NOT_FOUND:
+            return {"exists": False}
+        raise
+    if not shards:
+        return {"exists": False}
+    stats = {"exists": True, "count": 0, "size_bytes": 0, "storage_bytes": 0, "index_bytes": 0, "indexes": {}}
+    # One document per shard on a sharded collection.
+    for shard in shards:
+        storage = shard["storageStats"]
+        stats["count"] += storage.get("count", 0)
+        stats["size_bytes"] += storage.get("size", 0)
+        stats["storage_bytes"] += storage.get("storageSize", 0)
+        stats["index_bytes"] += storage.get("totalIndexSize", 0)
+        for index, size in storage.get("indexSizes", {}).items():
+            stats["indexes"][index] = stats["indexes"].get(index, 0) + size
+    stats["avg_doc_bytes"] = round(stats["size_bytes"] / stats["count"]) if stats["count"] else 0
+    return stats
+
+
+async def cache_stats(db) -> Optional[Dict[str, int]]:
+    """WiredTiger cache size and usage, or None without clusterMonitor rights."""
+    try:
+        cache = (await db.command("serverStatus"))["wiredTiger"]["cache"]
+    except (OperationFailure, KeyError):
+        return None
+    return {
+        "max_bytes": int(cache["maximum bytes configured"]),
+        "used_bytes": int(cache["bytes currently in the cache"]),
+    }
+
+
+async def storage_report(db, policy: RetentionPolicy, now: Optional[datetime] = None) -> Dict[str, Any]:
+    collections = {name: await collection_stats(db, name)
+                   for name in ("status_checks", ROLLUPS_COLLECTION)}
+    index_bytes = sum(stats.get("index_bytes", 0) for stats in collections.values())
+    cache = await cache_stats(db)
+    return {
+        "collections": collections,
+        "index_bytes": index_bytes,
+        "cache": cache,
+        # Indexes are the part of the working set that must stay in RAM.
+        "indexes_fit_in_cache": index_bytes <= cache["max_bytes"] if cache else None,
+        "retention": await retention_status(db, policy, now),
+    }
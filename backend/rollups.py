@@ -0,0 +1,243 @@
+"""Per-client status check counts bucketed by minute, hour and day.
+
+Rollups are materialized incrementally into ``status_rollups``. Each
+refresh aggregates the raw events between the stored high-water mark and
+``now - settle`` into minute buckets, then re-derives the affected hour
+and day buckets from the minute buckets. Windows are minute-aligned and
+every bucket is fully recomputed and replaced, so re-running a refresh
+after a crash never double counts.
+
+Every worker runs a :class:`RollupRefresher`, but only the one holding
+the lease document in ``rollup_state`` refreshes; the others watch the
+high-water mark so they still learn about new rollups.
+
+Requires MongoDB 5.0+ for ``$dateTrunc``.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_COLLECTION = "status_rollups"
+STATE_COLLECTION = "rollup_state"
+STATE_ID = "status_checks"
+LEASE_ID = "status_checks_refresher"
+
+GRANULARITIES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+# Each coarser granularity is derived from the one before it.
+DERIVED_FROM = {"hour": "minute", "day": "hour"}
+
+# Raw events younger than this are left for the next refresh so that
+# late inserts (e.g. from the write-behind buffer) are not skipped.
+DEFAULT_SETTLE = timedelta(seconds=60)
+# Upper bound on how much raw history a single refresh pass aggregates.
+MAX_WINDOW = timedelta(days=1)
+
+
+def floor_time(value: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return value.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_time(value: datetime, granularity: str) -> datetime:
+    floored = floor_time(value, granularity)
+    return floored if floored == value else floored + GRANULARITIES[granularity]
+
+
+def _merge_stage() -> Dict[str, Any]:
+    return {
+        "$merge": {
+            "into": ROLLUPS_COLLECTION,
+            "on": ["granularity", "client_name", "bucket"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert",
+        }
+    }
+
+
+def raw_to_minutes_pipeline(start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {"timestamp": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {
+                "client_name": "$client_name",
+                "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": "minute"}},
+            },
+            "count": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": 0,
+            "granularity": "minute",
+            "client_name": "$_id.client_name",
+            "bucket": "$_id.bucket",
+            "count": 1,
+        }},
+        _merge_stage(),
+    ]
+
+
+def derive_pipeline(granularity: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {"granularity": DERIVED_FROM[granularity], "bucket": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {
+                "client_name": "$client_name",
+                "bucket": {"$dateTrunc": {"date": "$bucket", "unit": granularity}},
+            },
+            "count": {"$sum": "$count"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "granularity": granularity,
+            "client_name": "$_id.client_name",
+            "bucket": "$_id.bucket",
+            "count": 1,
+        }},
+        _merge_stage(),
+    ]
+
+
+async def refresh_rollups(db, now: Optional[datetime] = None, settle: timedelta = DEFAULT_SETTLE) -> Optional[datetime]:
+    """Advance the rollups as far as ``now - settle``; return the new high-water mark."""
+    upto = floor_time((now or datetime.utcnow()) - settle, "minute")
+    state = await db[STATE_COLLECTION].find_one({"_id": STATE_ID})
+    high_water_mark = state["high_water_mark"] if state else None
+
+    if high_water_mark is None:
+        oldest = await db.status_checks.find_one({}, {"timestamp": 1}, sort=[("timestamp", 1)])
+        if oldest is None:
+            return None
+        high_water_mark = floor_time(oldest["timestamp"], "minute")
+
+    while high_water_mark < upto:
+        window_end = min(upto, high_water_mark + MAX_WINDOW)
+        await db.status_checks.aggregate(raw_to_minutes_pipeline(high_water_mark, window_end)).to_list(None)
+        for granularity in ("hour", "day"):
+            start = floor_time(high_water_mark, granularity)
+            end = ceil_time(window_end, granularity)
+            await db[ROLLUPS_COLLECTION].aggregate(derive_pipeline(granularity, start, end)).to_list(None)
+        # $max: with several workers refreshing, the mark never moves back.
+        await db[STATE_COLLECTION].update_one(
+            {"_id": STATE_ID}, {"$max": {"high_water_mark": window_end}}, upsert=True
+        )
+        high_water_mark = window_end
+    return high_water_mark
+
+
+async def acquire_lease(db, owner: str, duration: timedelta, now: Optional[datetime] = None) -> bool:
+    """Take or renew the refresher lease; False while another owner holds it."""
+    now = now or datetime.utcnow()
+    try:
+        lease = await db[STATE_COLLECTION].find_one_and_update(
+            {"_id": LEASE_ID, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + duration}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # The upsert lost to a live lease held by someone else.
+        return False
+    return lease is not None and lease["owner"] == owner
+
+
+async def release_lease(db, owner: str):
+    await db[STATE_COLLECTION].delete_one({"_id": LEASE_ID, "owner": owner})
+
+
+async def get_rollups(
+    db,
+    granularity: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+    limit: int = 1000,
+) -> List[Dict[str, Any]]:
+    query: Dict[str, Any] = {"granularity": granularity}
+    if client_name is not None:
+        query["client_name"] = client_name
+    if since is not None or until is not None:
+        query["bucket"] = {}
+        if since is not None:
+            query["bucket"]["$gte"] = floor_time(since, granularity)
+        if until is not None:
+            query["bucket"]["$lt"] = until
+    cursor = db[ROLLUPS_COLLECTION].find(query, {"_id": 0}).sort([("bucket", 1), ("client_name", 1)])
+    return await cursor.limit(limit).to_list(limit)
+
+
+class RollupRefresher:
+    """Runs :func:`refresh_rollups` every ``interval`` seconds while holding the lease."""
+
+    def __init__(
+        self,
+        db,
+        interval: float = 30.0,
+        settle: timedelta = DEFAULT_SETTLE,
+        on_refresh: Optional[Callable[[], Awaitable[None]]] = None,
+        lease: Optional[timedelta] = None,
+        owner: Optional[str] = None,
+    ):
+        self.db = db
+        self.interval = interval
+        self.settle = settle
+        self.on_refresh = on_refresh
+        # Long enough to be renewed a few times before a live leader loses it.
+        self.lease = lease or timedelta(seconds=max(3 * interval, 30))
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.leader = False
+        self.high_water_mark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.leader:
+            # Let another worker take over without waiting for expiry.
+            try:
+                await release_lease(self.db, self.owner)
+            except Exception:
+                logger.exception("Releasing the status rollup lease failed")
+            self.leader = False
+
+    async def run_once(self):
+        self.leader = await acquire_lease(self.db, self.owner, self.lease)
+        if self.leader:
+            high_water_mark = await refresh_rollups(self.db, settle=self.settle)
+        else:
+            state = await self.db[STATE_COLLECTION].find_one({"_id": STATE_ID})
+            high_water_mark = state["high_water_mark"] if state else None
+        if high_water_mark != self.high_water_mark and self.on_refresh is not None:
+            await self.on_refresh()
+        self.high_water_mark = high_water_mark
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Status rollup refresh failed")
+            await asyncio.sleep(self.interval)
@@ -1,26 +1,292 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from redis.asyncio import Redis
 import os
 import logging
+import secrets
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List
+from pydantic import BaseModel, Field, ValidationError
+from pymongo.errors import BulkWriteError
+from typing import List, Literal, Optional
+import orjson
 import uuid
 from datetime import datetime
 
+from export import EXPORT_BATCH_SIZE, MEDIA_TYPES, STREAMERS, time_range_query
+from health import Readiness, create_health_router, missing_env
+from cache import ReadThroughCache, cache_key
+from conditional import etag_matches, http_date, make_etag
+from external_integrations.email_index import EmailIndex, EmailIndexRefresher
+from external_integrations.outbox import WaitlistOutbox
+from external_integrations.postgrest import PostgrestClient
+from external_integrations.waitlist import WaitlistBatcher, create_waitlist_router
+from indexes import check_query_plans, ensure_indexes
+from metrics import MongoCommandListener, PrometheusMiddleware, mark_process_dead, metrics_endpoint, register_stats
+from retention import RetentionPolicy, apply_retention, retention_status, storage_report
+from rollups import GRANULARITIES, RollupRefresher, get_rollups
+from write_buffer import BufferFull, WriteBehindBuffer
+from rate_limit import Limit, RateLimiter, RateLimitMiddleware, client_buckets
+from pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    InvalidCursor,
+    keyset_query,
+    next_cursor,
+)
+
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection. The client is opened per worker process in
+# lifespan(): a MongoClient starts monitor threads and must not cross fork().
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+db_name = os.environ['DB_NAME']
+client: Optional[AsyncIOMotorClient] = None
+db = None
+indexes_ready = False
+
+# Optional Redis; the read-through cache falls back to an in-process LRU
+# when it is not configured or unreachable. Like the Mongo client, the
+# Redis client is opened in lifespan() and handed to the cache and limiter.
+redis_url = os.environ.get('REDIS_URL')
+redis_client: Optional[Redis] = None
+status_cache = ReadThroughCache(
+    namespace="status",
+    ttl=float(os.environ.get('STATUS_CACHE_TTL_SECONDS', 5)),
+    lru_size=int(os.environ.get('STATUS_CACHE_LRU_SIZE', 1024)),
+)
+
+# Token-bucket limits on write endpoints, shared across workers via Redis.
+# Each limit is "<tokens per second>:<burst>".
+rate_limit_enabled = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+rate_limiter = RateLimiter()
+per_client_limit = Limit.parse(os.environ.get('RATE_LIMIT_PER_CLIENT', '20:100')) if rate_limit_enabled else None
+
+# Optional write-behind mode: POST /api/status enqueues documents and a
+# background worker coalesces them into insert_many calls. Like the rollup
+# refresher below, the buffer is bound to the worker's client in lifespan().
+write_behind_enabled = os.environ.get('STATUS_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+write_buffer: Optional[WriteBehindBuffer] = None
+
+# Incremental status rollups. Every worker starts a refresher, but only the
+# one holding the lease in rollup_state refreshes; set
+# STATUS_ROLLUP_INTERVAL_SECONDS=0 to disable the background refresh.
+rollup_interval = float(os.environ.get('STATUS_ROLLUP_INTERVAL_SECONDS', 30))
+rollup_refresher: Optional[RollupRefresher] = None
+
+# Opt-in retention: raw status checks expire after STATUS_RAW_TTL_DAYS and
+# minute rollups after STATUS_MINUTE_ROLLUP_TTL_DAYS; 0 (the default) keeps
+# them forever. Hour and day rollups are the long-term archive and never
+# expire. A raw TTL requires the rollup refresher, which archives raw events
+# before they expire.
+retention_policy = RetentionPolicy.from_days(
+    float(os.environ.get('STATUS_RAW_TTL_DAYS', 0)),
+    float(os.environ.get('STATUS_MINUTE_ROLLUP_TTL_DAYS', 0)),
+)
+if retention_policy.raw_ttl is not None and rollup_interval <= 0:
+    raise RuntimeError(
+        "STATUS_RAW_TTL_DAYS needs the rollup refresher (STATUS_ROLLUP_INTERVAL_SECONDS > 0); "
+        "without it raw status checks would expire without being rolled up"
+    )
+
+# Operational endpoints under /api/admin are reachable through nginx, so they
+# need "Authorization: Bearer $ADMIN_TOKEN"; without ADMIN_TOKEN they are off.
+admin_token = os.environ.get('ADMIN_TOKEN')
+
+async def require_admin(authorization: Optional[str] = Header(None)):
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+# Waitlist submissions are forwarded to Supabase over one pooled client.
+# The client and everything built on it are opened in lifespan(), so a
+# second lifespan in the same process (tests, benchmarks) starts afresh.
+supabase_url = os.environ.get('SUPABASE_URL')
+supabase_key = os.environ.get('SUPABASE_KEY')
+waitlist_enabled = bool(supabase_url and supabase_key)
+postgrest: Optional[PostgrestClient] = None
+waitlist_batcher: Optional[WaitlistBatcher] = None
+# With WAITLIST_OUTBOX_PATH set, submissions are acknowledged once stored in
+# a local SQLite outbox and delivered to Supabase in the background.
+outbox_path = os.environ.get('WAITLIST_OUTBOX_PATH')
+waitlist_outbox: Optional[WaitlistOutbox] = None
+# Known emails are answered locally; the index is warmed from Supabase in
+# the background and rebuilt every WAITLIST_EMAIL_INDEX_REFRESH_SECONDS.
+email_index: Optional[EmailIndex] = None
+email_index_refresher: Optional[EmailIndexRefresher] = None
+
+register_stats("status_cache", "Status read-through cache", status_cache.stats)
+if write_behind_enabled:
+    register_stats(
+        "status_write_buffer",
+        "Status write-behind buffer",
+        lambda: write_buffer.stats() if write_buffer is not None else {},
+    )
+register_stats("rate_limiter", "Write endpoint rate limiter", rate_limiter.stats)
+if waitlist_enabled:
+    register_stats(
+        "waitlist_batcher",
+        "Waitlist insert batcher",
+        lambda: waitlist_batcher.stats() if waitlist_batcher is not None else {},
+    )
+    register_stats(
+        "waitlist_email_index",
+        "Waitlist duplicate-email index",
+        lambda: email_index.stats() if email_index is not None else {},
+    )
+if waitlist_enabled and outbox_path:
+    register_stats(
+        "waitlist_outbox",
+        "Waitlist durable outbox",
+        lambda: waitlist_outbox.stats() if waitlist_outbox is not None else {},
+    )
+
+# Readiness: the app only takes traffic once Mongo answers and the indexes
+# exist. Redis and the email index have fallbacks, so they are reported but
+# never hold readiness back.
+required_env = ['MONGO_URL', 'DB_NAME']
+if supabase_url or supabase_key or outbox_path:
+    required_env += ['SUPABASE_URL', 'SUPABASE_KEY']
+readiness = Readiness(timeout=float(os.environ.get('READINESS_TIMEOUT_SECONDS', 2)))
+
+async def check_env():
+    return missing_env(required_env)
+
+async def check_mongo():
+    if db is None:
+        return "not connected"
+    await db.command("ping")
+
+async def check_indexes():
+    return None if indexes_ready else "not ensured yet"
+
+readiness.add("env", check_env)
+readiness.add("mongo", check_mongo)
+readiness.add("indexes", check_indexes)
+if retention_policy.raw_ttl is not None:
+    async def check_retention():
+        status = await retention_status(db, retention_policy)
+        if status["archive_at_risk"]:
+            return f"raw status checks expire in {status['unarchived_expires_in_seconds']}s before being rolled up"
+    readiness.add("retention", check_retention, critical=False)
+if redis_url:
+    async def check_redis():
+        if redis_client is None:
+            return "not connected"
+        await redis_client.ping()
+    readiness.add("redis", check_redis, critical=False)
+if waitlist_enabled:
+    async def check_email_index():
+        return None if email_index is not None and email_index.warmed else "warming"
+    readiness.add("waitlist_email_index", check_email_index, critical=False)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db, indexes_ready, write_buffer, rollup_refresher, redis_client
+    global postgrest, waitlist_batcher, waitlist_outbox, email_index, email_index_refresher
+    client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandListener()])
+    db = client[db_name]
+    if redis_url:
+        redis_client = Redis.from_url(redis_url, socket_timeout=0.1, socket_connect_timeout=0.1)
+        status_cache.use_redis(redis_client)
+        rate_limiter.use_redis(redis_client)
+
+    await ensure_indexes(db)
+    await apply_retention(db, retention_policy)
+    # Opt-in because explain() adds a round trip per hot query to every boot.
+    if os.environ.get('STATUS_QUERY_PLAN_CHECK', '').lower() in ('1', 'true', 'yes'):
+        await check_query_plans(db)
+    indexes_ready = True
+
+    if write_behind_enabled:
+        write_buffer = WriteBehindBuffer(
+            db.status_checks,
+            max_batch=int(os.environ.get('STATUS_WRITE_BEHIND_MAX_BATCH', 500)),
+            max_delay=float(os.environ.get('STATUS_WRITE_BEHIND_MAX_DELAY_MS', 50)) / 1000,
+            max_queue=int(os.environ.get('STATUS_WRITE_BEHIND_MAX_QUEUE', 10000)),
+            on_flush=lambda: status_cache.invalidate("status"),
+        )
+        write_buffer.start()
+    if rollup_interval > 0:
+        rollup_refresher = RollupRefresher(
+            db, interval=rollup_interval, on_refresh=lambda: status_cache.invalidate("rollups")
+        )
+        rollup_refresher.start()
+
+    if waitlist_enabled:
+        postgrest = PostgrestClient(supabase_url, supabase_key)
+        waitlist_batcher = WaitlistBatcher(postgrest)
+        waitlist_batcher.start()
+        email_index = EmailIndex(
+            max_exact_bytes=int(os.environ.get('WAITLIST_EMAIL_INDEX_MAX_BYTES', 64 * 1024 * 1024))
+        )
+        email_index_refresher = EmailIndexRefresher(
+            email_index, postgrest, interval=float(os.environ.get('WAITLIST_EMAIL_INDEX_REFRESH_SECONDS', 3600))
+        )
+        email_index_refresher.start()
+    if waitlist_enabled and outbox_path:
+        # The email index follows deliveries, not acknowledgements, so a row
+        # that is dead-lettered can be submitted again.
+        def index_delivered(rows):
+            for row in rows:
+                email_index.add(row["email"])
+
+        def unindex_dead_letters(rows):
+            for row in rows:
+                email_index.remove(row["email"])
+
+        waitlist_outbox = WaitlistOutbox(
+            outbox_path, postgrest, on_delivered=index_delivered, on_dead_letter=unindex_dead_letters
+        )
+        # Rows left over from a previous run are replayed by the drainer.
+        await waitlist_outbox.open()
+        waitlist_outbox.start()
+    app.state.waitlist_batcher = waitlist_batcher
+    app.state.waitlist_outbox = waitlist_outbox
+    app.state.email_index = email_index
+
+    yield
+
+    # Uvicorn only gets here once in-flight requests have finished (or
+    # --timeout-graceful-shutdown expired), so buffered work is complete.
+    if email_index_refresher is not None:
+        await email_index_refresher.close()
+        email_index_refresher = None
+    if waitlist_outbox is not None:
+        await waitlist_outbox.close()
+        waitlist_outbox = None
+    if waitlist_batcher is not None:
+        await waitlist_batcher.close()
+        waitlist_batcher = None
+    if postgrest is not None:
+        await postgrest.aclose()
+        postgrest = None
+    email_index = None
+    app.state.waitlist_batcher = app.state.waitlist_outbox = app.state.email_index = None
+    if rollup_refresher is not None:
+        await rollup_refresher.close()
+        rollup_refresher = None
+    # Flush buffered writes before the client they depend on goes away.
+    if write_buffer is not None:
+        await write_buffer.close()
+        write_buffer = None
+    client.close()
+    if redis_client is not None:
+        status_cache.use_redis(None)
+        rate_limiter.use_redis(None)
+        await redis_client.aclose()
+        redis_client = None
+    mark_process_dead()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -35,6 +301,25 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class StatusRollup(BaseModel):
+    granularity: str
+    client_name: str
+    bucket: datetime
+    count: int
+
+class StatusBatchItemResult(BaseModel):
+    index: int
+    ok: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class StatusBatchResult(BaseModel):
+    inserted: int
+    failed: int
+    results: List[StatusBatchItemResult]
+
+MAX_STATUS_BATCH_SIZE = 1000
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
@@ -42,18 +327,181 @@ async def root():
 
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
+    if per_client_limit is not None:
+        await rate_limiter.enforce(client_buckets(per_client_limit, [input.client_name]))
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    if write_buffer is not None:
+        try:
+            await write_buffer.submit(status_obj.dict())
+        except BufferFull as exc:
+            raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+    else:
+        _ = await db.status_checks.insert_one(status_obj.dict())
+        await status_cache.invalidate("status")
     return status_obj
 
+@api_router.get("/status/cache")
+async def get_status_cache_stats():
+    return status_cache.stats()
+
+@api_router.get("/admin/storage", dependencies=[Depends(require_admin)])
+async def get_storage_report():
+    return await storage_report(db, retention_policy)
+
+@api_router.get("/status/write-buffer")
+async def get_write_buffer_stats():
+    if write_buffer is None:
+        return {"enabled": False}
+    return {"enabled": True, **write_buffer.stats()}
+
+async def _read_batch_payload(request: Request) -> list:
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            return [orjson.loads(line) for line in body.splitlines() if line.strip()]
+        items = orjson.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON or NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of status checks")
+    return items
+
+@api_router.post("/status/batch", response_model=StatusBatchResult)
+async def create_status_checks_batch(request: Request):
+    items = await _read_batch_payload(request)
+    if len(items) > MAX_STATUS_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_STATUS_BATCH_SIZE} status checks")
+
+    results = []
+    documents = []
+    positions = []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise TypeError("Expected a JSON object")
+            status_obj = StatusCheck(**StatusCheckCreate(**item).dict())
+        except ValidationError as exc:
+            error = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+            results.append(StatusBatchItemResult(index=index, ok=False, error=error))
+            continue
+        except TypeError as exc:
+            results.append(StatusBatchItemResult(index=index, ok=False, error=str(exc)))
+            continue
+        results.append(StatusBatchItemResult(index=index, ok=True, id=status_obj.id))
+        documents.append(status_obj.dict())
+        positions.append(len(results) - 1)
+
+    # Charged per document, so one large batch costs as much as the single
+    # writes it replaces. The IP and global buckets are left to this handler
+    # by RateLimitMiddleware (sized_routes) and debited in the same check.
+    buckets = client_buckets(per_client_limit, [doc["client_name"] for doc in documents])
+    middleware = getattr(request.state, "rate_limit", None)
+    if middleware is not None:
+        buckets += middleware.buckets(request.scope, cost=max(1, len(documents)))
+    if buckets:
+        await rate_limiter.enforce(buckets)
+
+    if documents:
+        try:
+            await db.status_checks.insert_many(documents, ordered=False)
+        except BulkWriteError as exc:
+            # writeErrors index into `documents`; map them back to the request.
+            for write_error in exc.details.get("writeErrors", []):
+                result = results[positions[write_error["index"]]]
+                result.ok = False
+                result.error = write_error.get("errmsg")
+        await status_cache.invalidate("status")
+
+    inserted = sum(1 for result in results if result.ok)
+    return StatusBatchResult(inserted=inserted, failed=len(results) - inserted, results=results)
+
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+async def get_status_checks(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    order: Literal["desc", "asc"] = "desc",
+    cursor: Optional[str] = None,
+):
+    # Keyset pagination on (timestamp, id); the cursor for the following
+    # page is returned in the X-Next-Cursor header so the body stays a list.
+    try:
+        query, sort = keyset_query(cursor, order)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    # Revalidation is answered from the cache's version counter alone,
+    # which every write to status_checks bumps.
+    version, modified = await status_cache.version("status")
+    validators = {"ETag": make_etag(version, limit, order, cursor), "Cache-Control": "no-cache"}
+    if modified is not None:
+        validators["Last-Modified"] = http_date(modified)
+    if etag_matches(request.headers.get("if-none-match"), validators["ETag"]):
+        return Response(status_code=304, headers=validators)
+
+    async def load() -> bytes:
+        # Documents were validated as StatusCheck on the way in, so they are
+        # encoded as-is: no _id, no model round trip, no response_model pass.
+        status_checks = await db.status_checks.find(query, {"_id": 0}).sort(sort).limit(limit + 1).to_list(limit + 1)
+        following = next_cursor(status_checks, limit)
+        # Cached as "<next cursor>\n<body>" so a hit needs no decoding.
+        return (following or "").encode() + b"\n" + orjson.dumps(status_checks)
+
+    cached = await status_cache.get_or_load("status", cache_key(limit, order, cursor), load)
+    following, body = cached.split(b"\n", 1)
+    response = Response(content=body, media_type="application/json", headers=validators)
+    if following:
+        response.headers["X-Next-Cursor"] = following.decode()
+    return response
+
+@api_router.get("/status/rollups", response_model=List[StatusRollup])
+async def get_status_rollups(
+    granularity: Literal[tuple(GRANULARITIES)] = "hour",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+):
+    async def load() -> bytes:
+        return orjson.dumps(await get_rollups(db, granularity, since, until, client_name, limit))
+
+    key = cache_key(granularity, since, until, client_name, limit)
+    return Response(content=await status_cache.get_or_load("rollups", key, load), media_type="application/json")
+
+@api_router.get("/status/export")
+async def export_status_checks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    client_name: Optional[str] = None,
+):
+    # Stream straight from the cursor in timestamp order; the range filter is
+    # pushed down to Mongo and served by the (timestamp, id) index.
+    cursor = (
+        db.status_checks.find(time_range_query(since, until, client_name), {"_id": 0})
+        .sort([("timestamp", 1), ("id", 1)])
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+    return StreamingResponse(
+        STREAMERS[format](cursor),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="status_checks.{format}"'},
+    )
 
 # Include the router in the main app
 app.include_router(api_router)
+app.include_router(create_health_router(readiness))
+app.include_router(create_waitlist_router(duplicates=os.environ.get('WAITLIST_DUPLICATES', 'reject')))
+
+if rate_limit_enabled:
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=rate_limiter,
+        routes={("POST", "/api/status"), ("POST", "/api/waitlist")},
+        sized_routes={("POST", "/api/status/batch")},
+        per_ip=Limit.parse(os.environ.get('RATE_LIMIT_PER_IP', '10:50')),
+        global_writes=Limit.parse(os.environ.get('RATE_LIMIT_GLOBAL_WRITES', '500:1000')),
+    )
 
 app.add_middleware(
     CORSMiddleware,
@@ -61,15 +509,19 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor", "ETag", "Last-Modified",
+        "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After",
+    ],
 )
 
+# Outermost, so latency includes every other middleware.
+app.add_middleware(PrometheusMiddleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
@@ -0,0 +1,164 @@
+"""Write-behind buffer that coalesces single inserts into ``insert_many``.
+
+Producers enqueue documents into a bounded ``asyncio.Queue``; one worker
+task drains it and flushes a batch as soon as it reaches ``max_batch``
+documents or its oldest document has waited ``max_delay`` seconds. A full
+queue applies backpressure to producers instead of growing without bound.
+
+Producers are answered before their document is written. A flush that
+fails as a whole (e.g. the primary is unreachable) is retried with
+backoff up to ``flush_attempts`` times; documents that still fail, or are
+rejected individually in a ``BulkWriteError``, are lost and counted in
+``failed_documents``. A retried flush may report documents that a failed
+attempt already wrote as duplicate-id errors; those rows are stored.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BufferFull(Exception):
+    """Raised when a document cannot be queued within ``put_timeout``."""
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        collection,
+        max_batch: int = 500,
+        max_delay: float = 0.05,
+        max_queue: int = 10000,
+        put_timeout: float = 1.0,
+        on_flush: Optional[Callable[[], Awaitable[None]]] = None,
+        flush_attempts: int = 3,
+        retry_backoff: float = 0.1,
+    ):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.put_timeout = put_timeout
+        self.on_flush = on_flush
+        self.flush_attempts = flush_attempts
+        self.retry_backoff = retry_backoff
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.flush_count = 0
+        self.flushed_documents = 0
+        self.failed_documents = 0
+        self.retried_flushes = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, document: Dict[str, Any]):
+        """Queue ``document`` for insertion, waiting while the queue is full."""
+        if self._closing:
+            raise BufferFull("Write buffer is shutting down")
+        try:
+            await asyncio.wait_for(self._queue.put(document), self.put_timeout)
+        except asyncio.TimeoutError:
+            raise BufferFull("Write buffer is full")
+
+    async def close(self):
+        """Stop accepting documents and flush everything already queued."""
+        if self._worker is None or self._closing:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        await self._worker
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "max_batch": self.max_batch,
+            "max_delay_seconds": self.max_delay,
+            "flush_count": self.flush_count,
+            "flushed_documents": self.flushed_documents,
+            "failed_documents": self.failed_documents,
+            "retried_flushes": self.retried_flushes,
+            "last_flush_seconds": self.last_flush_seconds,
+            "max_flush_seconds": self.max_flush_seconds,
+            "avg_flush_seconds": self._total_flush_seconds / self.flush_count if self.flush_count else 0.0,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            document = await self._queue.get()
+            if document is _STOP:
+                break
+            batch = [document]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    document = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        document = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if document is _STOP:
+                    stopping = True
+                    break
+                batch.append(document)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        inserted = await self._insert(batch)
+        elapsed = time.perf_counter() - start
+        self.flush_count += 1
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self._total_flush_seconds += elapsed
+        if inserted and self.on_flush is not None:
+            try:
+                await self.on_flush()
+            except Exception:
+                logger.exception("Write-behind flush callback failed")
+
+    async def _insert(self, batch: List[Dict[str, Any]]) -> int:
+        """Insert ``batch``, retrying whole-batch failures; returns the number stored."""
+        for attempt in range(1, self.flush_attempts + 1):
+            try:
+                result = await self.collection.insert_many(batch, ordered=False)
+            except BulkWriteError as exc:
+                # Per-document errors (e.g. duplicate ids) fail the same way on retry.
+                inserted = exc.details.get("nInserted", 0)
+                self.flushed_documents += inserted
+                self.failed_documents += len(batch) - inserted
+                logger.error(
+                    "Write-behind flush dropped %d of %d status checks: %s",
+                    len(batch) - inserted, len(batch), exc.details.get("writeErrors", [])[:1],
+                )
+                return inserted
+            except Exception:
+                if attempt == self.flush_attempts:
+                    self.failed_documents += len(batch)
+                    logger.exception("Write-behind flush of %d status checks failed; dropping them", len(batch))
+                    return 0
+                self.retried_flushes += 1
+                logger.warning("Write-behind flush of %d status checks failed, retrying", len(batch), exc_info=True)
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                continue
+            self.flushed_documents += len(result.inserted_ids)
+            return len(result.inserted_ids)
+        return 0
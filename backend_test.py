@@ -62,5 +62,27 @@ class BackendAPITest(unittest.TestCase):
         self.assertIsInstance(data, list, "Expected response to be a list")
         logger.info("GET /status endpoint test passed")
 
+    def test_status_get_pagination(self):
+        """Test keyset pagination on the GET /status endpoint"""
+        logger.info("Testing GET /status pagination")
+        for _ in range(3):
+            requests.post(f"{API_URL}/status", json={"client_name": "PaginationClient"})
+
+        response = requests.get(f"{API_URL}/status", params={"limit": 2})
+        self.assertEqual(response.status_code, 200, f"Expected status code 200, got {response.status_code}")
+        first_page = response.json()
+        self.assertEqual(len(first_page), 2, "Expected a page of 2 status checks")
+        cursor = response.headers.get("X-Next-Cursor")
+        self.assertIsNotNone(cursor, "Expected X-Next-Cursor header for a partial page")
+
+        response = requests.get(f"{API_URL}/status", params={"limit": 2, "cursor": cursor})
+        self.assertEqual(response.status_code, 200, f"Expected status code 200, got {response.status_code}")
+        second_page_ids = {item["id"] for item in response.json()}
+        self.assertFalse(second_page_ids & {item["id"] for item in first_page}, "Expected pages not to overlap")
+
+        response = requests.get(f"{API_URL}/status", params={"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400, f"Expected status code 400, got {response.status_code}")
+        logger.info("GET /status pagination test passed")
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,308 @@
+"""Load test the status API with a mixed workload and keep JSON baselines.
+
+Requests are issued open-loop at a fixed rate, so a slow server cannot
+slow the generator down and hide its own latency. Each latency is
+measured from the request's scheduled start. ``--rps 0`` switches to
+closed-loop mode, in which ``--concurrency`` workers send requests as
+fast as responses come back.
+
+Targets:
+
+- ``--base-url http://localhost:8001`` loads a running backend (uvicorn,
+  one or more workers). Consider RATE_LIMIT_ENABLED=false on that server.
+- ``--in-process`` runs the app inside this process over ASGI. By default
+  it uses an in-memory Mongo stand-in (``mongomock-motor``, from
+  ``pip install -r benchmarks/requirements.txt``). With ``--mongo-url`` it
+  uses a real Mongo instead.
+
+Save a run as a baseline, then compare later runs against it:
+
+    python benchmarks/load_test.py --in-process --output benchmarks/baselines/main.json
+    python benchmarks/load_test.py --in-process --compare benchmarks/baselines/main.json
+
+``--compare`` exits with status 1 when a percentile or the throughput
+regresses by more than ``--max-regression``, or the error rate grows by
+more than one percentage point.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+Operation = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def post_status(client: httpx.AsyncClient, i: int):
+    return client.post("/api/status", json={"client_name": f"load-{i % 32}"})
+
+
+def post_status_batch(client: httpx.AsyncClient, i: int):
+    return client.post("/api/status/batch", json=[{"client_name": f"load-batch-{j % 32}"} for j in range(50)])
+
+
+def get_status(client: httpx.AsyncClient, i: int):
+    return client.get("/api/status", params={"limit": 100})
+
+
+def get_status_page(client: httpx.AsyncClient, i: int):
+    return client.get("/api/status", params={"limit": 20, "order": "asc"})
+
+
+def get_rollups(client: httpx.AsyncClient, i: int):
+    return client.get("/api/status/rollups", params={"granularity": "hour"})
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "post_status": post_status,
+    "post_status_batch": post_status_batch,
+    "get_status": get_status,
+    "get_status_page": get_status_page,
+    "get_rollups": get_rollups,
+}
+
+# Metrics compared against a baseline, and whether higher is better.
+COMPARED = {"p50_ms": False, "p95_ms": False, "p99_ms": False, "throughput_rps": True}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """``"post_status=1,get_status=4"`` -> relative weights per operation."""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[Tuple[float, bool]], elapsed: float) -> dict:
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+    }
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    mix: Dict[str, float],
+    rps: float,
+    duration: float,
+    concurrency: int,
+    warmup: float,
+    seed: int,
+) -> dict:
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples: Dict[str, List[Tuple[float, bool]]] = {name: [] for name in names}
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    async def issue(name: str, i: int, scheduled: float):
+        async with semaphore:
+            try:
+                response = await OPERATIONS[name](client, i)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+        if scheduled >= measure_from:
+            samples[name].append((loop.time() - scheduled, ok))
+
+    if rps > 0:
+        # Open loop: request i is due at start + i / rps, however long
+        # earlier requests take; in-flight requests are capped by the
+        # semaphore and the queueing shows up as latency.
+        tasks = []
+        i = 0
+        while True:
+            scheduled = start + i / rps
+            if scheduled >= stop_at:
+                break
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(issue(rng.choices(names, weights)[0], i, scheduled)))
+            i += 1
+        await asyncio.gather(*tasks)
+    else:
+        counter = iter(range(sys.maxsize))
+
+        async def worker():
+            while loop.time() < stop_at:
+                i = next(counter)
+                await issue(rng.choices(names, weights)[0], i, loop.time())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    elapsed = max(loop.time(), stop_at) - measure_from
+    every = [sample for per_operation in samples.values() for sample in per_operation]
+    return {
+        "overall": summarize(every, elapsed),
+        "operations": {name: summarize(samples[name], elapsed) for name in names},
+    }
+
+
+@asynccontextmanager
+async def in_process_client(mongo_url: Optional[str]):
+    """Import the app from backend/ and serve it over ASGI in this process."""
+    os.environ["MONGO_URL"] = mongo_url or "mongodb://localhost:27017"
+    # A throwaway database, dropped afterwards; never the configured one.
+    os.environ["DB_NAME"] = f"loadtest_{os.getpid()}"
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    sys.path.insert(0, str(REPO_DIR / "backend"))
+    import server
+
+    if mongo_url is None:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--in-process without --mongo-url needs mongomock-motor (pip install -r benchmarks/requirements.txt)")
+        server.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient()
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.lifespan(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            yield client
+        if mongo_url is not None:
+            await server.client.drop_database(server.db_name)
+
+
+@asynccontextmanager
+async def remote_client(base_url: str, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        yield client
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    if args.in_process:
+        target = "in-process" + ("" if args.mongo_url else " (mongomock)")
+        opened = in_process_client(args.mongo_url)
+    else:
+        target = args.base_url
+        opened = remote_client(args.base_url, args.concurrency)
+    async with opened as client:
+        results = await drive(client, args.mix, args.rps, args.duration, args.concurrency, args.warmup, args.seed)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "recorded_at": datetime.utcnow().isoformat() + "Z",
+            "target": target,
+            "mix": args.mix,
+            "rps": args.rps,
+            "duration_seconds": args.duration,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        **results,
+    }
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Print a per-operation comparison; return the regressions found."""
+    regressions = []
+    sections = [("overall", current["overall"], baseline.get("overall", {}))]
+    for name, stats in current["operations"].items():
+        sections.append((name, stats, baseline.get("operations", {}).get(name, {})))
+
+    print(f"{'operation':<20} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, stats, before in sections:
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), stats.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > max_regression else ""
+            print(f"{name:<20} {metric:<15} {old:>10} {new:>10} {change:>+8.1%}{flag}")
+            if flag:
+                regressions.append(f"{name} {metric}: {old} -> {new} ({change:+.1%})")
+        old_errors, new_errors = before.get("error_rate", 0.0), stats.get("error_rate", 0.0)
+        if new_errors - old_errors > 0.01:
+            regressions.append(f"{name} error_rate: {old_errors} -> {new_errors}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-workload load test for the status API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://localhost:8001", help="Backend base URL")
+    target.add_argument("--in-process", action="store_true", help="Serve the app in this process over ASGI")
+    parser.add_argument("--mongo-url", help="With --in-process, use this Mongo instead of mongomock")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=parse_mix("post_status=1,get_status=4"),
+        help=f"Weighted operations, e.g. post_status=1,get_status=4 (from: {', '.join(OPERATIONS)})",
+    )
+    parser.add_argument("--rps", type=float, default=200, help="Target request rate; 0 for closed-loop max throughput")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unmeasured load first")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the operation mix")
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="Tolerated relative regression")
+
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, indent=2) + "\n")
+    if args.compare:
+        regressions = compare(result, json.loads(args.compare.read_text()), args.max_regression)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
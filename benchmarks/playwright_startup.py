@@ -0,0 +1,84 @@
+"""Per-job startup cost of playwright_executor: one-shot vs warm pool.
+
+One-shot runs launch Chromium for every job, as the plain CLI does.
+Pooled runs take a fresh context from an already running browser, as
+daemon mode does. Startup is the time until a blank page is ready for the
+script; the script and navigation themselves are not included.
+
+    python benchmarks/playwright_startup.py --jobs 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / ".devcontainer"))
+
+from browser_pool import BrowserPool  # noqa: E402
+
+
+async def one_shot(jobs: int) -> list:
+    timings = []
+    for _ in range(jobs):
+        start = time.perf_counter()
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            context = await browser.new_context()
+            await context.new_page()
+            timings.append(time.perf_counter() - start)
+            await browser.close()
+    return timings
+
+
+async def pooled(jobs: int) -> list:
+    pool = BrowserPool(size=1)
+    await pool.start()
+    timings = []
+    try:
+        for _ in range(jobs):
+            start = time.perf_counter()
+            async with pool.browser() as browser:
+                context = await browser.new_context()
+                await context.new_page()
+                timings.append(time.perf_counter() - start)
+                await context.close()
+    finally:
+        await pool.close()
+    return timings
+
+
+def summary(timings: list) -> dict:
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "mean_ms": round(statistics.mean(timings) * 1000, 1),
+        "max_ms": round(max(timings) * 1000, 1),
+    }
+
+
+async def run(jobs: int) -> dict:
+    cold = summary(await one_shot(jobs))
+    warm = summary(await pooled(jobs))
+    return {
+        "jobs": jobs,
+        "one_shot": cold,
+        "pooled": warm,
+        "speedup": round(cold["median_ms"] / warm["median_ms"], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-job browser startup cost with and without a pool")
+    parser.add_argument("--jobs", type=int, default=20, help="Jobs per mode")
+
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.jobs)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Per-job script loading cost in playwright_executor: files vs in-memory cache.
+
+The file path is what the executor used to do for every job: decode,
+re-indent, write the script to the run directory and to a temporary file,
+then import it with importlib. It decodes and wraps through script_cache,
+so both paths load exactly the same source; only the file round trip and
+the per-job compile differ. The cached path looks the script up by hash
+in a ScriptCache and builds ``run_test`` from the compiled code. No browser
+is needed; only loading is timed, not running the script.
+
+    python benchmarks/script_loading.py --jobs 2000 --distinct 10
+"""
+import argparse
+import base64
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / ".devcontainer"))
+
+from script_cache import ScriptCache, decode_script, wrap_script  # noqa: E402
+
+SCRIPT = """
+await page.fill("#email", "person@example.com")
+await page.click("text=Join the waitlist")
+await page.wait_for_selector(".toast", timeout=5000)
+items = await page.eval_on_selector_all("li", "els => els.map(e => e.textContent)")
+await page.screenshot(path=f"{output_dir}/after_submit.png")
+return {"items": items, "title": await page.title()}
+"""
+
+
+def scripts(distinct: int) -> list:
+    return [
+        "base64:" + base64.b64encode(f"# variant {i}\n{SCRIPT}".encode()).decode()
+        for i in range(distinct)
+    ]
+
+
+def load_from_files(script: str, run_dir: Path):
+    test_script = wrap_script(decode_script(script))
+    with open(run_dir / "test_script.py", "w") as f:
+        f.write(test_script)
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
+        f.write(test_script)
+        script_path = f.name
+    try:
+        spec = importlib.util.spec_from_file_location("dynamic_script", script_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.run_test
+    finally:
+        os.unlink(script_path)
+
+
+def time_jobs(load, workload: list) -> list:
+    timings = []
+    for script in workload:
+        start = time.perf_counter()
+        load(script)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summary(timings: list) -> dict:
+    return {
+        "median_us": round(statistics.median(timings) * 1e6, 1),
+        "mean_us": round(statistics.mean(timings) * 1e6, 1),
+        "total_ms": round(sum(timings) * 1000, 1),
+    }
+
+
+def run(jobs: int, distinct: int) -> dict:
+    variants = scripts(distinct)
+    workload = [variants[i % distinct] for i in range(jobs)]
+    with tempfile.TemporaryDirectory() as run_dir:
+        files = summary(time_jobs(lambda script: load_from_files(script, Path(run_dir)), workload))
+    cache = ScriptCache()
+    cached = summary(time_jobs(lambda script: cache.get(script).run_test(), workload))
+    return {
+        "jobs": jobs,
+        "distinct_scripts": distinct,
+        "files": files,
+        "cached": cached,
+        "cache": cache.stats(),
+        "speedup": round(files["mean_us"] / cached["mean_us"], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-job script loading with and without the script cache")
+    parser.add_argument("--jobs", type=int, default=2000, help="Jobs to load")
+    parser.add_argument("--distinct", type=int, default=10, help="Distinct scripts among the jobs")
+
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.jobs, args.distinct), indent=2))
+
+
+if __name__ == "__main__":
+    main()
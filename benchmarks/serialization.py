@@ -0,0 +1,70 @@
+"""Micro-benchmark: CPU cost of serializing one page of status checks.
+
+Compares the original list path (StatusCheck per document, FastAPI's
+response_model validation and jsonable_encoder, then json.dumps) with the
+fast path used by GET /api/status (projected documents straight through
+orjson). No database is involved; documents are shaped like Motor's.
+
+    python benchmarks/serialization.py --rows 1000
+"""
+import argparse
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+import orjson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import StatusCheck  # noqa: E402
+
+
+def make_documents(rows: int, with_id: bool) -> List[dict]:
+    start = datetime(2025, 4, 5)
+    docs = []
+    for i in range(rows):
+        doc = {"id": str(uuid.uuid4()), "client_name": f"client-{i % 32}", "timestamp": start + timedelta(milliseconds=i)}
+        if with_id:
+            doc["_id"] = ObjectId()
+        docs.append(doc)
+    return docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark status check list serialization")
+    parser.add_argument("--rows", type=int, default=1000, help="Documents per page")
+    parser.add_argument("--repeat", type=int, default=200, help="Pages serialized per measurement")
+
+    args = parser.parse_args()
+
+    raw_docs = make_documents(args.rows, with_id=True)
+    projected_docs = [{k: v for k, v in doc.items() if k != "_id"} for doc in raw_docs]
+    response_adapter = TypeAdapter(List[StatusCheck])
+
+    def before():
+        models = [StatusCheck(**doc) for doc in raw_docs]
+        validated = response_adapter.validate_python(models, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated)).encode()
+
+    def after():
+        return orjson.dumps(projected_docs)
+
+    assert json.loads(before()) == json.loads(after())
+
+    results = {}
+    for name, fn in (("before", before), ("after", after)):
+        best = min(timeit.repeat(fn, number=args.repeat, repeat=5)) / args.repeat
+        results[name] = {"ms_per_page": round(best * 1000, 3), "us_per_row": round(best * 1e6 / args.rows, 3)}
+    results["speedup"] = round(results["before"]["ms_per_page"] / results["after"]["ms_per_page"], 1)
+    print(json.dumps({"rows": args.rows, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compare insert throughput of POST /api/status and POST /api/status/batch.
+
+Run against a live backend, e.g.:
+
+    python benchmarks/status_batch.py --base-url http://localhost:8001 --total 5000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+
+async def bench_single(client: httpx.AsyncClient, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post_one(i: int):
+        async with semaphore:
+            response = await client.post("/api/status", json={"client_name": f"bench-single-{i % 16}"})
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(post_one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+async def bench_batch(client: httpx.AsyncClient, total: int, concurrency: int, batch_size: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post_batch(offset: int):
+        items = [{"client_name": f"bench-batch-{i % 16}"} for i in range(offset, min(offset + batch_size, total))]
+        async with semaphore:
+            response = await client.post("/api/status/batch", json=items)
+            response.raise_for_status()
+            if response.json()["failed"]:
+                raise RuntimeError(f"Batch at offset {offset} reported failures")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(post_batch(offset) for offset in range(0, total, batch_size)))
+    return time.perf_counter() - start
+
+
+async def run(base_url: str, total: int, concurrency: int, batch_size: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        single = await bench_single(client, total, concurrency)
+        batch = await bench_batch(client, total, concurrency, batch_size)
+    return {
+        "total": total,
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "single": {"seconds": round(single, 3), "docs_per_second": round(total / single, 1)},
+        "batch": {"seconds": round(batch, 3), "docs_per_second": round(total / batch, 1)},
+        "speedup": round(single / batch, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single vs batch status check inserts")
+    parser.add_argument("--base-url", default="http://localhost:8001", help="Backend base URL")
+    parser.add_argument("--total", type=int, default=2000, help="Documents to insert per mode")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent requests in flight")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per batch request")
+
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.base_url, args.total, args.concurrency, args.batch_size))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
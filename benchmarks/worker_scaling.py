@@ -0,0 +1,136 @@
+"""Measure how request throughput scales with the number of uvicorn workers.
+
+For each worker count the backend is started from ``backend/`` with the
+current environment (MONGO_URL, DB_NAME, ...), loaded with concurrent
+requests for a fixed duration, then stopped with SIGTERM, e.g.:
+
+    python benchmarks/worker_scaling.py --workers 1 2 4 --duration 10
+
+Rate limits are disabled for the spawned servers so they do not cap the
+measurement.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = {**os.environ, "RATE_LIMIT_ENABLED": "false", "STATUS_ROLLUP_INTERVAL_SECONDS": "0"}
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "server:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+
+async def wait_until_up(base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Backend at {base_url} did not come up within {timeout}s")
+
+
+async def load(base_url: str, path: str, method: str, concurrency: int, duration: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    completed = 0
+    errors = 0
+    latencies = []
+
+    async def worker(client: httpx.AsyncClient, stop_at: float):
+        nonlocal completed, errors
+        i = 0
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            if method == "POST":
+                response = await client.post(path, json={"client_name": f"bench-scaling-{i % 16}"})
+            else:
+                response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            completed += 1
+            i += 1
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        stop_at = start + duration
+        await asyncio.gather(*(worker(client, stop_at) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": completed,
+        "errors": errors,
+        "requests_per_second": round(completed / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2) if latencies else None,
+    }
+
+
+def run(worker_counts, port: int, path: str, method: str, concurrency: int, duration: float) -> dict:
+    base_url = f"http://127.0.0.1:{port}"
+    results = []
+    for workers in worker_counts:
+        server = start_server(workers, port)
+        try:
+            asyncio.run(wait_until_up(base_url))
+            result = asyncio.run(load(base_url, path, method, concurrency, duration))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+        results.append({"workers": workers, **result})
+        print(json.dumps(results[-1]), file=sys.stderr)
+
+    baseline = results[0]["requests_per_second"] or 1
+    for result in results:
+        result["speedup"] = round(result["requests_per_second"] / baseline, 2)
+    return {
+        "cpus": os.cpu_count(),
+        "method": method,
+        "path": path,
+        "concurrency": concurrency,
+        "duration_seconds": duration,
+        "results": results,
+    }
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, 2, max(1, cpus // 2), cpus})
+
+    parser = argparse.ArgumentParser(description="Benchmark throughput against the number of uvicorn workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers, help="Worker counts to test")
+    parser.add_argument("--port", type=int, default=8011, help="Port for the spawned backend")
+    parser.add_argument("--path", default="/api/status?limit=100", help="Path to request")
+    parser.add_argument("--method", choices=["GET", "POST"], default="GET", help="GET the path or POST status checks to it")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent requests in flight")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per worker count")
+
+    args = parser.parse_args()
+
+    result = run(args.workers, args.port, args.path, args.method, args.concurrency, args.duration)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,25 +4,58 @@ set -e
 # Start the FastAPI backend
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
-echo "Starting FastAPI backend"
+# One worker per core unless WEB_CONCURRENCY says otherwise. Each worker
+# opens its own Mongo/Redis clients in the app's lifespan handler.
+WORKERS="${WEB_CONCURRENCY:-$(nproc 2>/dev/null || echo 1)}"
+# Seconds a stopping worker waits for in-flight requests before exiting.
+GRACEFUL_TIMEOUT="${GRACEFUL_TIMEOUT:-20}"
+
+# Request metrics are aggregated across workers through this directory;
+# it must start empty.
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+echo "Starting FastAPI backend with $WORKERS workers"
 # Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+uvicorn server:app --host 0.0.0.0 --port 8001 \
+    --workers "$WORKERS" \
+    --timeout-graceful-shutdown "$GRACEFUL_TIMEOUT" &
 BACKEND_PID=$!
 
-echo "Waiting for backend to start..."
-sleep 30
-
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Backend failed to start at initialization, exiting"
-    exit 1
-fi
+# Start nginx as soon as the backend reports ready rather than after a
+# fixed delay; give up after STARTUP_TIMEOUT seconds.
+STARTUP_TIMEOUT="${STARTUP_TIMEOUT:-120}"
+echo "Waiting for backend to become ready..."
+STARTED_AT=$(date +%s)
+until wget -q -O /dev/null http://127.0.0.1:8001/api/readyz 2>/dev/null; do
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "Backend failed to start at initialization, exiting"
+        exit 1
+    fi
+    if [ $(( $(date +%s) - STARTED_AT )) -ge "$STARTUP_TIMEOUT" ]; then
+        echo "Backend not ready after ${STARTUP_TIMEOUT}s, exiting"
+        kill $BACKEND_PID
+        exit 1
+    fi
+    sleep 0.5
+done
+echo "Backend ready after $(( $(date +%s) - STARTED_AT ))s"
 
 # Start Nginx
 nginx -g 'daemon off;' &
 NGINX_PID=$!
 
-# Handle termination signals
-trap 'kill $BACKEND_PID $NGINX_PID; exit 0' SIGTERM SIGINT
+# On SIGTERM, stop nginx from taking new connections first, then let
+# uvicorn finish in-flight requests and flush its buffers before exiting.
+shutdown() {
+    nginx -s quit 2>/dev/null || kill $NGINX_PID
+    kill -TERM $BACKEND_PID
+    wait $BACKEND_PID
+    wait $NGINX_PID
+    exit 0
+}
+trap shutdown TERM INT
 
 # Check if processes are still running
 while kill -0 $BACKEND_PID 2>/dev/null && kill -0 $NGINX_PID 2>/dev/null; do
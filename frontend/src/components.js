@@ -1,18 +1,7 @@
 import React, { useState } from 'react';
-import { createClient } from '@supabase/supabase-js';
-
-// Initialize Supabase client with error handling
-const supabaseUrl = process.env.REACT_APP_SUPABASE_URL;
-const supabaseKey = process.env.REACT_APP_SUPABASE_ANON_KEY;
-
-let supabase = null;
-if (supabaseUrl && supabaseKey) {
-  try {
-    supabase = createClient(supabaseUrl, supabaseKey);
-  } catch (error) {
-    console.warn('Supabase initialization failed:', error);
-  }
-}
+
+// Waitlist submissions go through the backend, which holds the Supabase key
+const backendUrl = process.env.REACT_APP_BACKEND_URL || '';
 
 // Header Component
 const Header = () => {
@@ -1138,24 +1127,10 @@ const WaitlistForm = () => {
     setError('');
 
     try {
-      // Check if Supabase credentials are available
-      if (!supabaseUrl || !supabaseKey) {
-        console.error('Missing Supabase environment variables:', {
-          supabaseUrl: supabaseUrl ? 'Present' : 'Missing',
-          supabaseKey: supabaseKey ? 'Present' : 'Missing'
-        });
-        setError('Configuration error: Supabase credentials not found. Please contact support.');
-        return;
-      }
-
-      // Use direct REST API call to Supabase
-      const response = await fetch(`${supabaseUrl}/rest/v1/waitlist`, {
+      const response = await fetch(`${backendUrl}/api/waitlist`, {
         method: 'POST',
         headers: {
-          'Content-Type': 'application/json',
-          'apikey': supabaseKey,
-          'Authorization': `Bearer ${supabaseKey}`,
-          'Prefer': 'return=minimal'
+          'Content-Type': 'application/json'
         },
         body: JSON.stringify({
           first_name: formData.firstName,
@@ -1168,7 +1143,7 @@ const WaitlistForm = () => {
         })
       });
 
-      if (response.status === 201) {
+      if (response.ok) {
         setIsSubmitted(true);
         setFormData({
           firstName: '',
@@ -1179,8 +1154,10 @@ const WaitlistForm = () => {
           role: '',
           callCentreAgents: ''
         });
+      } else if (response.status === 409) {
+        setError('This email is already on the waitlist.');
       } else {
-        console.error('Supabase error:', await response.text());
+        console.error('Waitlist error:', await response.text());
         setError('There was an error submitting your information. Please try again.');
       }
     } catch (err) {
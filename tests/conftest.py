@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+# playwright_executor and its helper modules.
+EXECUTOR_DIR = Path(__file__).resolve().parent.parent / ".devcontainer"
+sys.path.insert(1, str(EXECUTOR_DIR))
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
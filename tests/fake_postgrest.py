@@ -0,0 +1,141 @@
+"""In-process stand-in for Supabase's PostgREST ``/rest/v1/waitlist``.
+
+Serve it through ``httpx.ASGITransport`` so tests exercise the real HTTP
+client without network access, or with :meth:`FakePostgrest.serve` on a
+local port when the client's connection pooling should be exercised too.
+
+With ``keys`` set, requests are authorized like Supabase with row-level
+security: the ``apikey`` header selects a role, an unknown key is a 401,
+an insert the role has no policy for is a 401 for ``anon`` and a 403 for
+other roles, and a select without a policy returns no rows.
+"""
+import asyncio
+import contextlib
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+ANON_KEY = "anon-key"
+SERVICE_KEY = "service-key"
+
+
+class FakePostgrest:
+    def __init__(
+        self,
+        unique_email: bool = True,
+        keys: Optional[Dict[str, str]] = None,
+        policies: Optional[Dict[str, Set[str]]] = None,
+        latency: float = 0.0,
+    ):
+        self.unique_email = unique_email
+        # apikey -> role; None disables authorization entirely.
+        self.keys = keys
+        # role -> allowed operations ("insert", "select").
+        self.policies = policies if policies is not None else {
+            "anon": {"insert"},
+            "service_role": {"insert", "select"},
+        }
+        # Seconds added to every response.
+        self.latency = latency
+        self.rows: List[Dict[str, Any]] = []
+        self.requests: List[Dict[str, Any]] = []
+        # Status codes to answer the next requests with, before any insert.
+        self.fail_next: List[int] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Client (host, port) pairs seen, i.e. distinct connections.
+        self.peers: Set[tuple] = set()
+        self.app = FastAPI()
+        self.app.add_api_route("/rest/v1/waitlist", self.insert, methods=["POST"])
+        self.app.add_api_route("/rest/v1/waitlist", self.select, methods=["GET"])
+        self.app.middleware("http")(self._track)
+
+    async def _track(self, request: Request, call_next):
+        if request.client is not None:
+            self.peers.add((request.client.host, request.client.port))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return await call_next(request)
+        finally:
+            self.in_flight -= 1
+
+    def _role(self, request: Request) -> Optional[str]:
+        return self.keys.get(request.headers.get("apikey", "")) if self.keys is not None else "service_role"
+
+    def _allowed(self, role: str, operation: str) -> bool:
+        return self.keys is None or operation in self.policies.get(role, set())
+
+    async def select(self, request: Request):
+        role = self._role(request)
+        if role is None:
+            return JSONResponse({"message": "Invalid API key"}, status_code=401)
+        if not self._allowed(role, "select"):
+            # RLS filters rows rather than failing the query.
+            return []
+
+        rows = self.rows
+        for column, value in request.query_params.items():
+            if value.startswith("eq."):
+                rows = [row for row in rows if str(row.get(column)) == value[3:]]
+        columns = request.query_params.get("select", "*")
+        start, end = 0, len(rows) - 1
+        if "range" in request.headers:
+            start, end = (int(part) for part in request.headers["range"].split("-"))
+        page = rows[start:end + 1]
+        if columns != "*":
+            page = [{column: row.get(column) for column in columns.split(",")} for row in page]
+        return page
+
+    async def insert(self, request: Request):
+        payload = await request.json()
+        rows = payload if isinstance(payload, list) else [payload]
+        prefer = request.headers.get("prefer")
+        self.requests.append({"rows": rows, "prefer": prefer, "apikey": request.headers.get("apikey")})
+        if self.fail_next:
+            return Response('{"message":"injected failure"}', status_code=self.fail_next.pop(0))
+
+        role = self._role(request)
+        if role is None:
+            return JSONResponse({"message": "Invalid API key"}, status_code=401)
+        if not self._allowed(role, "insert"):
+            body = {"code": "42501", "message": 'new row violates row-level security policy for table "waitlist"'}
+            return JSONResponse(body, status_code=401 if role == "anon" else 403)
+
+        for row in rows:
+            if not row.get("email"):
+                return Response('{"code":"23502","message":"null value in column \\"email\\""}', status_code=400)
+        existing = {row["email"] for row in self.rows}
+        emails = [row["email"] for row in rows]
+        if self.unique_email and (existing & set(emails) or len(set(emails)) != len(emails)):
+            return Response('{"code":"23505","message":"duplicate key value"}', status_code=409)
+
+        # PostgREST applies a bulk insert atomically.
+        self.rows.extend(rows)
+        if prefer and "return=representation" in prefer:
+            return JSONResponse(rows, status_code=201)
+        return Response(status_code=201)
+
+    @contextlib.contextmanager
+    def serve(self) -> Iterator[str]:
+        """Run on an ephemeral local port in a background thread; yields the base URL."""
+        server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=0, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 10
+        while not server.started:
+            if not thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Fake PostgREST server did not start")
+            time.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        try:
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
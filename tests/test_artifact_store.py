@@ -0,0 +1,88 @@
+import os
+
+from artifact_store import ArtifactStore
+
+
+def test_identical_bytes_are_stored_once(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+
+    first = store.put(b"same pixels", ".jpeg")
+    second = store.put(b"same pixels", ".jpeg")
+    other = store.put(b"other pixels", ".jpeg")
+
+    assert first == second != other
+    assert first.read_bytes() == b"same pixels" and first.suffix == ".jpeg"
+    assert store.stats()["stored"] == 2 and store.stats()["deduplicated"] == 1
+
+
+def test_latest_link_is_replaced_and_shares_the_object(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    latest = tmp_path / "shots" / "screenshot.jpeg"
+    latest.parent.mkdir()
+    latest.write_bytes(b"left over from an older run")
+
+    store.link(store.put(b"one"), latest)
+    second = store.put(b"two")
+    store.link(second, latest)
+
+    assert latest.read_bytes() == b"two"
+    assert os.path.samefile(latest, second)
+    assert [path.name for path in latest.parent.iterdir()] == ["screenshot.jpeg"]
+
+
+def test_prune_evicts_expired_then_least_recently_used(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"), max_bytes=10, max_age=100)
+    now = 1_000_000.0
+    expired = store.put(b"aaaa")
+    old = store.put(b"bbbb")
+    recent = store.put(b"cccc")
+    reused = store.put(b"dddd")
+    os.utime(expired, (now - 200, now - 200))
+    os.utime(old, (now - 50, now - 50))
+    os.utime(recent, (now - 10, now - 10))
+    os.utime(reused, (now - 40, now - 40))
+    # Storing it again counts as a use.
+    store.put(b"dddd")
+
+    report = store.prune(now)
+
+    assert not expired.exists() and not old.exists()
+    assert recent.exists() and reused.exists()
+    assert report["evicted"] == 2 and report["bytes"] == 8
+
+
+def test_prune_keeps_the_newest_runs_and_the_store(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"), runs_dir=str(tmp_path), max_runs=2, max_age=100)
+    store.put(b"kept")
+    now = 1_000_000.0
+    runs = {"20250101_000003_a": 30, "20250101_000002_b": 20, "20250101_000001_c": 10, "20240101_000000_old": 500}
+    for name, age in runs.items():
+        (tmp_path / name).mkdir()
+        os.utime(tmp_path / name, (now - age, now - age))
+
+    report = store.prune(now)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["20250101_000001_c", "20250101_000002_b", "artifacts"]
+    assert report["runs_removed"] == 2
+
+
+def test_maybe_prune_is_throttled(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"), prune_interval=60)
+
+    assert store.maybe_prune(1000.0) is not None
+    assert store.maybe_prune(1030.0) is None
+    assert store.maybe_prune(1061.0) is not None
+
+
+def test_prune_leaves_directories_it_did_not_create(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts"), runs_dir=str(tmp_path), max_runs=0, max_age=100)
+    har_dir = tmp_path / "har"
+    har_dir.mkdir()
+    (har_dir / "example.test_0123.har").write_text("{}")
+    os.utime(har_dir, (0, 0))
+    (tmp_path / "20250101_000000_run").mkdir()
+
+    report = store.prune(1_000_000.0)
+
+    assert (har_dir / "example.test_0123.har").exists()
+    assert report["runs_removed"] == 1
@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from browser_pool import BrowserPool  # noqa: E402
+
+
+class FakeBrowser:
+    def __init__(self, number):
+        self.number = number
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowserType:
+    def __init__(self, launch_delay=0.0):
+        self.launch_delay = launch_delay
+        self.browsers = []
+
+    async def launch(self, **options):
+        await asyncio.sleep(self.launch_delay)
+        self.browsers.append(FakeBrowser(len(self.browsers)))
+        return self.browsers[-1]
+
+
+async def start_pool(launch_delay=0.0, **kwargs):
+    browser_type = FakeBrowserType(launch_delay)
+    pool = BrowserPool(browser_type=browser_type, max_browser_memory_mb=0, **kwargs)
+    await pool.start()
+    return pool, browser_type
+
+
+@pytest.mark.anyio
+async def test_jobs_spread_across_warm_browsers():
+    pool, browser_type = await start_pool(size=2, contexts_per_browser=2)
+    used = []
+
+    async def job():
+        async with pool.browser() as browser:
+            used.append(browser.number)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(job() for _ in range(8)))
+    await pool.close()
+
+    assert len(browser_type.browsers) == 2
+    assert sorted(set(used)) == [0, 1]
+    assert pool.stats()["jobs"] == 8
+    assert all(browser.closed for browser in browser_type.browsers)
+
+
+@pytest.mark.anyio
+async def test_capacity_bounds_concurrent_jobs():
+    pool, _ = await start_pool(size=1, contexts_per_browser=2)
+    active = peak = 0
+
+    async def job():
+        nonlocal active, peak
+        async with pool.browser():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(job() for _ in range(6)))
+    await pool.close()
+    assert peak == 2
+
+
+@pytest.mark.anyio
+async def test_browsers_are_recycled_after_max_jobs():
+    pool, browser_type = await start_pool(size=1, max_jobs_per_browser=2)
+    for _ in range(5):
+        async with pool.browser():
+            pass
+
+    assert pool.stats()["recycled"] == 2
+    assert [browser.closed for browser in browser_type.browsers] == [True, True, False]
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_retired_browser_closes_after_its_last_job():
+    pool, browser_type = await start_pool(size=1, contexts_per_browser=2)
+    first = browser_type.browsers[0]
+    release = asyncio.Event()
+
+    async def long_job():
+        async with pool.browser():
+            await release.wait()
+
+    running = asyncio.create_task(long_job())
+    await asyncio.sleep(0)
+    first.connected = False
+    async with pool.browser():
+        pass
+
+    # Replaced, but still serving the long job.
+    assert pool.stats()["retiring"] == 1 and not first.closed
+    release.set()
+    await running
+    assert first.closed
+    assert pool.stats()["retiring"] == 0
+    await pool.close()
+
+
+@pytest.mark.anyio
+async def test_jobs_finishing_together_replace_a_browser_once():
+    pool, browser_type = await start_pool(size=1, contexts_per_browser=4, max_jobs_per_browser=2, launch_delay=0.01)
+    first = browser_type.browsers[0]
+
+    async def job():
+        async with pool.browser():
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(job() for _ in range(4)))
+
+    assert len(browser_type.browsers) == 2
+    assert pool.stats()["recycled"] == 1 and pool.stats()["retiring"] == 0
+    assert first.closed and not browser_type.browsers[1].closed
+    await pool.close()
+    assert all(browser.closed for browser in browser_type.browsers)
+
+
+@pytest.mark.anyio
+async def test_replacement_launched_during_close_is_not_leaked():
+    pool, browser_type = await start_pool(size=1, max_jobs_per_browser=1, launch_delay=0.01)
+
+    async def job():
+        async with pool.browser():
+            pass
+
+    running = asyncio.create_task(job())
+    await asyncio.sleep(0.001)
+    await pool.close()
+    await running
+
+    assert len(browser_type.browsers) == 2
+    assert all(browser.closed for browser in browser_type.browsers)
+
+
+@pytest.mark.anyio
+async def test_close_while_a_retiring_browser_is_busy():
+    pool, browser_type = await start_pool(size=1, contexts_per_browser=2)
+    first = browser_type.browsers[0]
+    release = asyncio.Event()
+
+    async def long_job():
+        async with pool.browser():
+            await release.wait()
+
+    running = asyncio.create_task(long_job())
+    await asyncio.sleep(0)
+    first.connected = False
+    async with pool.browser():
+        pass
+    assert pool.stats()["retiring"] == 1
+
+    await pool.close()
+    release.set()
+    await running
+
+    assert all(browser.closed for browser in browser_type.browsers)
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from cache import ReadThroughCache, cache_key
+
+
+class UnreachableRedis:
+    def register_script(self, script):
+        async def run(keys, args):
+            raise ConnectionError("connection refused")
+
+        return run
+
+    async def incr(self, key):
+        raise ConnectionError("connection refused")
+
+    async def set(self, key, value, px=None):
+        raise ConnectionError("connection refused")
+
+
+def counting_loader(value=b"payload", delay=0.0):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+
+    return load, calls
+
+
+@pytest.mark.anyio
+async def test_hit_after_miss_and_invalidation():
+    cache = ReadThroughCache()
+    load, calls = counting_loader()
+    key = cache_key(100, "desc", None)
+
+    assert await cache.get_or_load("status", key, load) == b"payload"
+    assert await cache.get_or_load("status", key, load) == b"payload"
+    assert len(calls) == 1
+
+    await cache.invalidate("status")
+    await cache.get_or_load("status", key, load)
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+@pytest.mark.anyio
+async def test_concurrent_misses_share_one_load():
+    cache = ReadThroughCache()
+    load, calls = counting_loader(delay=0.01)
+
+    values = await asyncio.gather(*(cache.get_or_load("status", "k", load) for _ in range(10)))
+
+    assert values == [b"payload"] * 10
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 9
+
+
+@pytest.mark.anyio
+async def test_expired_entries_are_reloaded():
+    cache = ReadThroughCache(ttl=0.01)
+    load, calls = counting_loader()
+    await cache.get_or_load("status", "k", load)
+    await asyncio.sleep(0.02)
+    await cache.get_or_load("status", "k", load)
+    assert len(calls) == 2
+
+
+@pytest.mark.anyio
+async def test_lru_is_bounded():
+    cache = ReadThroughCache(lru_size=2)
+    for key in ("a", "b", "c"):
+        await cache.get_or_load("status", key, counting_loader()[0])
+    assert cache.stats()["lru_entries"] == 2
+
+
+@pytest.mark.anyio
+async def test_falls_back_to_memory_when_redis_is_unreachable():
+    cache = ReadThroughCache(UnreachableRedis(), retry_after=60)
+    load, calls = counting_loader()
+
+    assert await cache.get_or_load("status", "k", load) == b"payload"
+    assert await cache.get_or_load("status", "k", load) == b"payload"
+
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["backend"] == "memory"
+    assert stats["redis_errors"] == 1
+
+
+@pytest.mark.anyio
+async def test_cancelled_leader_does_not_fail_coalesced_waiters():
+    cache = ReadThroughCache()
+    load, calls = counting_loader(delay=0.05)
+    key = cache_key(1)
+
+    leader = asyncio.create_task(cache.get_or_load("status", key, load))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.create_task(cache.get_or_load("status", key, load)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await asyncio.gather(*followers) == [b"payload"] * 3
+    assert leader.cancelled()
+    assert len(calls) == 1
+    # The load still completed and was stored for later readers.
+    assert await cache.get_or_load("status", key, load) == b"payload"
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_version_changes_on_invalidation():
+    cache = ReadThroughCache()
+    version, modified = await cache.version("status")
+    assert modified is None
+    assert await cache.version("status") == (version, None)
+
+    await cache.invalidate("status")
+    bumped, modified = await cache.version("status")
+    assert bumped != version and modified is not None
+    # Other scopes are unaffected.
+    assert (await cache.version("rollups"))[1] is None
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from conditional import etag_matches, http_date, make_etag
+
+
+def test_etag_depends_on_request_parameters():
+    assert make_etag("1:x", 100, "desc", None) == make_etag("1:x", 100, "desc", None)
+    assert make_etag("1:x", 100, "desc", None) != make_etag("1:x", 50, "desc", None)
+    assert make_etag("1:x", 100, "desc", None) != make_etag("2:x", 100, "desc", None)
+
+
+def test_etag_matches():
+    etag = make_etag("1:x")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_http_date_treats_naive_as_utc():
+    assert http_date(datetime(2025, 1, 2, 3, 4, 5, 678)) == "Thu, 02 Jan 2025 03:04:05 GMT"
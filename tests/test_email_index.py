@@ -0,0 +1,81 @@
+import httpx
+import pytest
+
+from external_integrations.email_index import BloomFilter, EmailIndex
+from external_integrations.postgrest import PostgrestClient
+from tests.fake_postgrest import FakePostgrest
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    emails = [f"user{i}@example.edu" for i in range(1000)]
+    for email in emails:
+        bloom.add(email)
+    assert all(email in bloom for email in emails)
+    false_positives = sum(f"other{i}@example.edu" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_exact_set_resolves_bloom_positives():
+    index = EmailIndex(expected_items=100)
+    index.add("Ada@University.edu ")
+    assert index.contains("ada@university.edu") is True
+    assert index.contains("grace@university.edu") is False
+    index.add("ada@university.edu")
+    assert index.stats()["emails"] == 1
+
+
+def test_over_budget_falls_back_to_bloom_only():
+    index = EmailIndex(expected_items=100, max_exact_bytes=200)
+    for i in range(5):
+        index.add(f"user{i}@example.edu")
+    assert index.stats()["exact"] is False
+    assert index.contains("user0@example.edu") is None
+    assert index.contains("nobody@example.edu") is False
+
+
+@pytest.mark.anyio
+async def test_rebuild_pages_through_the_waitlist_table():
+    fake = FakePostgrest()
+    fake.rows = [{"email": f"user{i}@example.edu", "first_name": "x"} for i in range(25)]
+    postgrest = PostgrestClient("http://postgrest.local", "key", transport=httpx.ASGITransport(app=fake.app))
+    index = EmailIndex(expected_items=10)
+    index.add("deleted@example.edu")
+
+    await index.rebuild(postgrest, page_size=10)
+    await postgrest.aclose()
+
+    assert index.warmed
+    assert index.stats()["emails"] == 25
+    assert index.contains("user24@example.edu") is True
+    # Not in the table any more, so the rebuild drops it.
+    assert index.contains("deleted@example.edu") is False
+
+
+@pytest.mark.anyio
+async def test_rebuild_keeps_emails_added_while_paging():
+    fake = FakePostgrest()
+    fake.rows = [{"email": f"user{i}@example.edu", "first_name": "x"} for i in range(25)]
+    postgrest = PostgrestClient("http://postgrest.local", "key", transport=httpx.ASGITransport(app=fake.app))
+    index = EmailIndex(expected_items=10)
+    select = postgrest.select
+
+    async def select_then_add(*args, **kwargs):
+        rows = await select(*args, **kwargs)
+        index.add("pending@example.edu")
+        return rows
+
+    postgrest.select = select_then_add
+    await index.rebuild(postgrest, page_size=10)
+    await postgrest.aclose()
+
+    assert index.contains("pending@example.edu") is True
+    assert index.stats()["emails"] == 26
+
+
+def test_remove_forgets_an_email():
+    index = EmailIndex(expected_items=100)
+    index.add("ada@university.edu")
+    index.remove("Ada@University.edu")
+    assert index.contains("ada@university.edu") is False
+    assert index.stats()["emails"] == 0
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from export import stream_csv, stream_ndjson, time_range_query
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+def make_docs(count):
+    return [
+        {"id": str(i), "client_name": f"client-{i % 2}", "timestamp": datetime(2025, 4, 5, 0, 0, i)}
+        for i in range(count)
+    ]
+
+
+def test_time_range_query():
+    since, until = datetime(2025, 4, 1), datetime(2025, 4, 2)
+    assert time_range_query() == {}
+    assert time_range_query(since, until, "a") == {
+        "timestamp": {"$gte": since, "$lt": until},
+        "client_name": "a",
+    }
+
+
+@pytest.mark.anyio
+async def test_stream_ndjson_chunks_by_batch():
+    chunks = [chunk async for chunk in stream_ndjson(FakeCursor(make_docs(5)), batch_size=2)]
+    assert len(chunks) == 3
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [row["id"] for row in rows] == ["0", "1", "2", "3", "4"]
+    assert rows[1]["timestamp"] == "2025-04-05T00:00:01"
+
+
+@pytest.mark.anyio
+async def test_stream_csv_emits_header_once():
+    chunks = [chunk async for chunk in stream_csv(FakeCursor(make_docs(3)), batch_size=2)]
+    assert len(chunks) == 2
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [row["client_name"] for row in rows] == ["client-0", "client-1", "client-0"]
+
+
+@pytest.mark.anyio
+async def test_stream_csv_empty_export_has_header():
+    chunks = [chunk async for chunk in stream_csv(FakeCursor([]))]
+    assert b"".join(chunks).decode().strip() == "id,client_name,timestamp"
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from har_cache import HarCache, cache_key, plan_from_options
+
+
+class FakeContext:
+    def __init__(self):
+        self.routes = []
+
+    async def route_from_har(self, har, **kwargs):
+        self.routes.append((har, kwargs))
+
+    async def close(self):
+        # Playwright writes recorded HARs when the context closes.
+        for har, kwargs in self.routes:
+            if kwargs.get("update"):
+                with open(har, "w") as f:
+                    f.write('{"log": {"entries": []}}')
+
+
+def test_cache_keys_normalize_urls():
+    assert cache_key("HTTP://Example.test?b=2&a=1#top") == "http://example.test/?a=1&b=2"
+    assert cache_key("http://example.test/p?a=1", key="path") == "http://example.test/p"
+    assert cache_key("http://example.test/", "return 1", "script") != cache_key("http://example.test/", "return 2",
+                                                                                   "script")
+    with pytest.raises(ValueError):
+        cache_key("http://example.test/", key="cookie")
+
+
+@pytest.mark.anyio
+async def test_auto_records_once_then_replays(tmp_path):
+    cache = HarCache(str(tmp_path))
+
+    recording = cache.plan("auto", "http://example.test/")
+    context = FakeContext()
+    await recording.attach(context)
+    assert not recording.path.exists()
+    await context.close()
+    recording.commit()
+
+    replay = cache.plan("auto", "http://example.test/#ignored")
+    context = FakeContext()
+    await replay.attach(context)
+
+    assert recording.mode == "record" and replay.mode == "replay"
+    assert replay.path == recording.path and replay.path.exists()
+    assert context.routes == [(str(replay.path), {"not_found": "abort"})]
+    assert os.listdir(tmp_path) == [replay.path.name]
+
+
+@pytest.mark.anyio
+async def test_discarded_recording_leaves_nothing_behind(tmp_path):
+    plan = HarCache(str(tmp_path)).plan("record", "http://example.test/")
+    context = FakeContext()
+    await plan.attach(context)
+    await context.close()
+
+    plan.discard()
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_stale_or_refreshed_recordings_are_recorded_again(tmp_path):
+    cache = HarCache(str(tmp_path), max_age=60)
+    path = cache.path_for(cache_key("http://example.test/"))
+    path.write_text("{}")
+
+    assert cache.plan("auto", "http://example.test/").mode == "replay"
+    assert cache.plan("auto", "http://example.test/", refresh=True).mode == "record"
+    os.utime(path, (path.stat().st_mtime - 120,) * 2)
+    assert cache.plan("auto", "http://example.test/").mode == "record"
+    # An explicit replay still uses a stale recording.
+    assert cache.plan("replay", "http://example.test/").mode == "replay"
+
+
+def test_replay_without_a_recording_fails(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        HarCache(str(tmp_path)).plan("replay", "http://example.test/")
+
+
+def test_plan_from_job_options(tmp_path):
+    assert plan_from_options(None, "http://example.test/", "") is None
+    assert plan_from_options({"mode": "off"}, "http://example.test/", "") is None
+
+    plan = plan_from_options({"mode": "record", "dir": str(tmp_path), "not_found": "fallback"},
+                             "http://example.test/", "")
+
+    assert plan.mode == "record" and plan.not_found == "fallback"
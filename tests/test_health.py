@@ -0,0 +1,94 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from health import Readiness, create_health_router, missing_env
+from metrics import PrometheusMiddleware
+
+
+def make_app(readiness):
+    app = FastAPI()
+    app.include_router(create_health_router(readiness))
+    return app
+
+
+async def ok():
+    return None
+
+
+async def warming():
+    return "warming"
+
+
+async def broken():
+    raise ConnectionError("connection refused")
+
+
+async def hangs():
+    await asyncio.sleep(10)
+
+
+def test_healthz_does_not_run_checks():
+    readiness = Readiness()
+    readiness.add("mongo", broken)
+    with TestClient(make_app(readiness)) as client:
+        assert client.get("/api/healthz").json() == {"status": "ok"}
+
+
+def test_readyz_reports_each_check():
+    readiness = Readiness(timeout=0.05)
+    readiness.add("mongo", ok)
+    readiness.add("indexes", broken)
+    readiness.add("redis", hangs, critical=False)
+    with TestClient(make_app(readiness)) as client:
+        response = client.get("/api/readyz")
+
+    assert response.status_code == 503
+    assert response.json() == {
+        "status": "not_ready",
+        "checks": {
+            "mongo": "ok",
+            "indexes": "ConnectionError: connection refused",
+            "redis": "timed out after 0.05s",
+        },
+    }
+    assert readiness.ready_after is None
+
+
+def test_non_critical_checks_do_not_block_readiness():
+    readiness = Readiness()
+    readiness.add("mongo", ok)
+    readiness.add("waitlist_email_index", warming, critical=False)
+    with TestClient(make_app(readiness)) as client:
+        response = client.get("/api/readyz")
+
+    assert response.status_code == 200
+    assert response.json()["checks"]["waitlist_email_index"] == "warming"
+    assert readiness.ready_after is not None
+
+
+def test_missing_env(monkeypatch):
+    monkeypatch.setenv("PRESENT", "1")
+    monkeypatch.delenv("ABSENT", raising=False)
+    assert missing_env(["PRESENT"]) is None
+    assert missing_env(["PRESENT", "ABSENT"]) == "missing ABSENT"
+
+
+def test_cold_start_ignores_probes():
+    readiness = Readiness()
+    app = make_app(readiness)
+
+    @app.get("/api/")
+    async def root():
+        return {}
+
+    app.add_middleware(PrometheusMiddleware, started_at=0.0)
+    with TestClient(app) as client:
+        client.get("/api/healthz")
+        middleware = app.middleware_stack
+        while not isinstance(middleware, PrometheusMiddleware):
+            middleware = middleware.app
+        assert middleware.cold_start is None
+        client.get("/api/")
+        assert middleware.cold_start > 0
@@ -0,0 +1,58 @@
+import pytest
+
+from indexes import INDEXES, QueryPlanError, _plan_stages, check_query_plans
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def sort(self, sort):
+        return self
+
+    def limit(self, limit):
+        return self
+
+    async def explain(self):
+        return {"queryPlanner": {"winningPlan": self.plan}}
+
+
+class FakeCollection:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def find(self, filter):
+        return FakeCursor(self.plan)
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        return self["*"]
+
+
+IXSCAN_PLAN = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}
+COLLSCAN_PLAN = {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}
+
+
+def test_registry_has_unique_id_index():
+    keys = {tuple(model.document["key"].items()): model.document for model in INDEXES["status_checks"]}
+    assert keys[(("id", 1),)]["unique"] is True
+    assert (("timestamp", -1), ("id", -1)) in keys
+    assert (("client_name", 1), ("timestamp", -1)) in keys
+
+
+def test_plan_stages_walks_nested_plans():
+    plan = {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"queryPlan": {"stage": "COLLSCAN"}}]}
+    assert list(_plan_stages(plan)) == ["OR", "IXSCAN", "COLLSCAN"]
+
+
+@pytest.mark.anyio
+async def test_check_query_plans_accepts_index_scans():
+    plans = await check_query_plans(FakeDB({"*": FakeCollection(IXSCAN_PLAN)}))
+    assert all("IXSCAN" in stages for stages in plans.values())
+
+
+@pytest.mark.anyio
+async def test_check_query_plans_fails_on_collscan():
+    with pytest.raises(QueryPlanError, match="status_page"):
+        await check_query_plans(FakeDB({"*": FakeCollection(COLLSCAN_PLAN)}))
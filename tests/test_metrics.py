@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from metrics import MongoCommandListener, PrometheusMiddleware, metrics_endpoint, register_stats
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_middleware_labels_by_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: str):
+        return {"id": item_id}
+
+    app.add_middleware(PrometheusMiddleware)
+    app.add_route("/metrics", metrics_endpoint)
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+    unmatched = sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+
+    with TestClient(app) as client:
+        client.get("/items/a")
+        client.get("/items/b")
+        client.get("/missing")
+        body = client.get("/metrics").text
+
+    assert sample("http_request_duration_seconds_count", **labels) == before + 2
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") == unmatched + 1
+    assert "http_requests_in_progress" in body
+
+
+def test_mongo_listener_labels_by_collection():
+    listener = MongoCommandListener()
+    labels = {"collection": "status_checks", "command": "find"}
+    before = sample("mongodb_command_duration_seconds_count", **labels)
+
+    listener.started(SimpleNamespace(command={"find": "status_checks"}, command_name="find", connection_id=1, request_id=7))
+    listener.succeeded(SimpleNamespace(command_name="find", connection_id=1, request_id=7, duration_micros=1500))
+    listener.started(SimpleNamespace(command={"getMore": 42, "collection": "status_checks"}, command_name="getMore", connection_id=1, request_id=8))
+    listener.failed(SimpleNamespace(command_name="getMore", connection_id=1, request_id=8, duration_micros=10))
+
+    assert sample("mongodb_command_duration_seconds_count", **labels) == before + 1
+    assert sample("mongodb_command_failures_total", collection="status_checks", command="getMore") >= 1
+
+
+def test_register_stats_exposes_numeric_values():
+    register_stats("test_component", "Test component", lambda: {"depth": 3, "backend": "memory", "enabled": True})
+    assert REGISTRY.get_sample_value("test_component_depth") == 3
+    assert REGISTRY.get_sample_value("test_component_enabled") is None
@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from external_integrations.outbox import CircuitBreaker, WaitlistOutbox
+from external_integrations.postgrest import PostgrestClient
+from tests.fake_postgrest import FakePostgrest
+
+
+def row(i):
+    return {"first_name": "Ada", "last_name": "Lovelace", "email": f"ada{i}@university.edu"}
+
+
+@pytest.fixture
+def fake():
+    return FakePostgrest()
+
+
+@pytest.fixture
+async def postgrest(fake):
+    client = PostgrestClient("http://postgrest.local", "service-key", transport=httpx.ASGITransport(app=fake.app))
+    yield client
+    await client.aclose()
+
+
+async def open_outbox(path, postgrest, **kwargs):
+    kwargs.setdefault("push_retries", 1)
+    outbox = WaitlistOutbox(str(path), postgrest, **kwargs)
+    await outbox.open()
+    return outbox
+
+
+@pytest.mark.anyio
+async def test_submissions_are_delivered_in_one_batch(tmp_path, fake, postgrest):
+    outbox = await open_outbox(tmp_path / "outbox.db", postgrest)
+    for i in range(3):
+        await outbox.submit(row(i))
+    assert outbox.stats()["queue_depth"] == 3
+
+    assert await outbox.drain_once() == 3
+    await outbox.close()
+
+    assert len(fake.requests) == 1
+    assert [r["email"] for r in fake.rows] == [f"ada{i}@university.edu" for i in range(3)]
+    assert outbox.stats()["queue_depth"] == 0
+
+
+@pytest.mark.anyio
+async def test_pending_rows_are_replayed_after_restart(tmp_path, fake, postgrest):
+    outbox = await open_outbox(tmp_path / "outbox.db", postgrest)
+    await outbox.submit(row(1))
+    await outbox.close()
+    assert fake.rows == []
+
+    restarted = await open_outbox(tmp_path / "outbox.db", postgrest)
+    assert restarted.stats()["queue_depth"] == 1
+    assert await restarted.drain_once() == 1
+    await restarted.close()
+    assert [r["email"] for r in fake.rows] == ["ada1@university.edu"]
+
+
+@pytest.mark.anyio
+async def test_workers_sharing_a_file_do_not_push_the_same_rows(tmp_path, fake, postgrest):
+    first = await open_outbox(tmp_path / "outbox.db", postgrest)
+    second = await open_outbox(tmp_path / "outbox.db", postgrest, claim_timeout=0)
+    await first.submit(row(1))
+
+    claimed = await first._run_sync(first._claim_due, time.time(), 10)
+    assert len(claimed) == 1
+    assert await second.drain_once() == 0
+
+    # An abandoned claim lapses and the row is picked up again.
+    assert await second._run_sync(second._claim_due, time.time() + 121, 10) == claimed
+    await first.close()
+    await second.close()
+
+
+@pytest.mark.anyio
+async def test_transient_failures_reschedule_and_open_the_breaker(tmp_path, fake, postgrest):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    outbox = await open_outbox(tmp_path / "outbox.db", postgrest, breaker=breaker)
+    await outbox.submit(row(1))
+
+    fake.fail_next = [503]
+    assert await outbox.drain_once() == 0
+    # Rescheduled with backoff, so not due yet.
+    assert await outbox.drain_once() == 0
+    assert outbox.stats()["queue_depth"] == 1
+    assert outbox.stats()["push_failures"] == 1
+
+    breaker.record_failure()
+    assert outbox.stats()["circuit_open"] is True
+    await outbox.close()
+
+
+@pytest.mark.anyio
+async def test_permanent_failures_are_dead_lettered_and_replayable(tmp_path, fake, postgrest):
+    outbox = await open_outbox(tmp_path / "outbox.db", postgrest)
+    await outbox.submit(row(1))
+    await outbox.submit(row(2))
+
+    # Batch fails, first row fails alone, second row goes through.
+    fake.fail_next = [400, 400]
+    assert await outbox.drain_once() == 2
+    assert outbox.stats()["dead_letters"] == 1
+    assert [r["email"] for r in fake.rows] == ["ada2@university.edu"]
+
+    assert await outbox.replay_dead_letters() == 1
+    assert await outbox.drain_once() == 1
+    await outbox.close()
+    assert outbox.stats()["dead_letters"] == 0
+    assert len(fake.rows) == 2
+
+
+@pytest.mark.anyio
+async def test_duplicates_upstream_are_settled(tmp_path, fake, postgrest):
+    fake.rows.append(row(1))
+    outbox = await open_outbox(tmp_path / "outbox.db", postgrest)
+    await outbox.submit(row(1))
+    assert await outbox.drain_once() == 1
+    await outbox.close()
+    assert outbox.stats()["duplicates"] == 1
+    assert outbox.stats()["dead_letters"] == 0
+
+
+@pytest.mark.anyio
+async def test_callbacks_report_delivered_and_dead_lettered_rows(tmp_path, fake, postgrest):
+    delivered, dead = [], []
+    outbox = await open_outbox(
+        tmp_path / "outbox.db",
+        postgrest,
+        on_delivered=lambda rows: delivered.extend(r["email"] for r in rows),
+        on_dead_letter=lambda rows: dead.extend(r["email"] for r in rows),
+    )
+    await outbox.submit(row(1))
+    await outbox.submit(row(2))
+
+    fake.fail_next = [400, 400]
+    assert await outbox.drain_once() == 2
+    await outbox.close()
+    assert delivered == ["ada2@university.edu"]
+    assert dead == ["ada1@university.edu"]
+
+
+@pytest.mark.anyio
+async def test_close_cancels_an_in_flight_push(tmp_path, fake, postgrest):
+    fake.latency = 10
+    outbox = await open_outbox(tmp_path / "outbox.db", postgrest, push_retries=3)
+    await outbox.submit(row(1))
+    outbox.start()
+    while fake.in_flight == 0:
+        await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(outbox.close(), 2)
+    # The claim lapses, so the row is pushed again after a restart.
+    assert fake.rows == []
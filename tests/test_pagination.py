@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_query, next_cursor
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2025, 4, 5, 12, 30, 15, 123000)
+    cursor = encode_cursor(timestamp, "abc")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, "abc")
+
+
+def test_decode_rejects_garbage():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+
+def test_keyset_query_direction():
+    timestamp = datetime(2025, 4, 5)
+    cursor = encode_cursor(timestamp, "abc")
+
+    query, sort = keyset_query(cursor, "desc")
+    assert sort == [("timestamp", -1), ("id", -1)]
+    assert query["$or"][0] == {"timestamp": {"$lt": timestamp}}
+    assert query["$or"][1] == {"timestamp": timestamp, "id": {"$lt": "abc"}}
+
+    query, sort = keyset_query(cursor, "asc")
+    assert sort == [("timestamp", 1), ("id", 1)]
+    assert query["$or"][0] == {"timestamp": {"$gt": timestamp}}
+
+    assert keyset_query(None, "desc")[0] == {}
+
+
+def test_next_cursor_trims_look_ahead_row():
+    rows = [{"timestamp": datetime(2025, 4, 5, 0, 0, i), "id": str(i)} for i in range(3)]
+    cursor = next_cursor(rows, 2)
+    assert len(rows) == 2
+    assert decode_cursor(cursor) == (rows[-1]["timestamp"], "1")
+    assert next_cursor(rows, 2) is None
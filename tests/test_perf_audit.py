@@ -0,0 +1,103 @@
+import pytest
+
+import perf_audit
+
+RAW = {
+    "navigation": {"ttfb_ms": 40.0, "dom_interactive_ms": 300.0, "dom_content_loaded_ms": 320.0, "load_ms": 600.0,
+                   "transfer_bytes": 2048},
+    "fcp_ms": 350.0,
+    "lcp_ms": 480.0,
+    "lcp_element": "h1",
+    "cls": 0.01,
+    "long_tasks": [{"start_ms": 100.0, "duration_ms": 120.0}, {"start_ms": 400.0, "duration_ms": 45.0}],
+    "resources": [
+        {"url": "http://example.test/main.js", "type": "script", "transfer_bytes": 300 * 1024, "body_bytes": 0,
+         "duration_ms": 80.0},
+        {"url": "http://example.test/logo.png", "type": "img", "transfer_bytes": 10 * 1024, "body_bytes": 0,
+         "duration_ms": 20.0},
+    ],
+}
+
+
+class FakeSession:
+    async def send(self, method):
+        if method == "Performance.getMetrics":
+            return {"metrics": [{"name": "JSHeapUsedSize", "value": 8 * 1024 * 1024},
+                                {"name": "JSHeapTotalSize", "value": 16 * 1024 * 1024}]}
+        return {}
+
+    async def detach(self):
+        pass
+
+
+class FakeContext:
+    def __init__(self, cdp=True):
+        self.cdp = cdp
+        self.init_scripts = []
+
+    async def add_init_script(self, script):
+        self.init_scripts.append(script)
+
+    async def new_cdp_session(self, page):
+        if not self.cdp:
+            raise RuntimeError("CDP session is only available in Chromium")
+        return FakeSession()
+
+
+class FakePage:
+    async def evaluate(self, script):
+        return RAW
+
+
+@pytest.mark.anyio
+async def test_collect_derives_metrics_from_performance_api_and_cdp():
+    context = FakeContext()
+    await perf_audit.prepare(context)
+
+    sample = await perf_audit.collect(context, FakePage())
+
+    assert "PerformanceObserver" in context.init_scripts[0]
+    metrics = sample["metrics"]
+    assert metrics["lcp_ms"] == 480.0 and metrics["fcp_ms"] == 350.0 and metrics["cls"] == 0.01
+    assert metrics["long_tasks"] == 2 and metrics["total_blocking_time_ms"] == 70.0
+    assert metrics["js_heap_used_mb"] == 8.0
+    assert metrics["transfer_kb"] == 312.0 and metrics["script_kb"] == 300.0 and metrics["requests"] == 3
+    assert sample["resources"][0]["url"].endswith("main.js")
+
+
+@pytest.mark.anyio
+async def test_heap_is_missing_without_cdp():
+    sample = await perf_audit.collect(FakeContext(cdp=False), FakePage())
+
+    assert sample["metrics"]["js_heap_used_mb"] is None
+
+
+def test_summary_is_the_median_of_runs():
+    samples = [{"metrics": {"lcp_ms": value, "cls": None}, "lcp_element": "h1", "resources": []}
+               for value in (500.0, 400.0, 900.0)]
+
+    summary = perf_audit.summarize(samples)
+
+    assert summary["runs"] == 3
+    assert summary["metrics"] == {"lcp_ms": 500.0, "cls": None}
+
+
+def test_compare_flags_only_changes_beyond_both_thresholds():
+    baseline = {"metrics": {"lcp_ms": 1000.0, "fcp_ms": 100.0, "cls": 0.0, "script_kb": 300.0}}
+    current = {"metrics": {"lcp_ms": 1100.0, "fcp_ms": 140.0, "cls": 0.1, "script_kb": 400.0}}
+
+    comparison = perf_audit.compare(current, baseline)
+
+    # +10% LCP and +40 ms FCP are within tolerance; CLS and the bundle size are not.
+    assert comparison["regressions"] == ["cls: 0.0 -> 0.1", "script_kb: 300.0 -> 400.0"]
+    assert comparison["changes"]["lcp_ms"] == {"baseline": 1000.0, "current": 1100.0, "change": 100.0,
+                                               "regressed": False}
+
+
+def test_thresholds_can_be_overridden():
+    thresholds = perf_audit.parse_thresholds(["lcp_ms=0.05", "cls=0.5:0.2"])
+
+    assert thresholds["lcp_ms"] == (0.05, 50)
+    assert thresholds["cls"] == (0.5, 0.2)
+    with pytest.raises(ValueError):
+        perf_audit.parse_thresholds(["bogus=1"])
@@ -0,0 +1,266 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip("playwright")
+
+import playwright_executor  # noqa: E402
+
+
+class FakePool:
+    def __init__(self):
+        self.started = self.closed = False
+        self.jobs = 0
+
+    async def start(self):
+        self.started = True
+
+    async def close(self):
+        self.closed = True
+
+    @asynccontextmanager
+    async def browser(self):
+        self.jobs += 1
+        yield "warm-browser"
+
+    def stats(self):
+        return {"jobs": self.jobs}
+
+
+async def wait_for_socket(path):
+    for _ in range(200):
+        if path.exists():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("daemon did not start")
+
+
+@pytest.mark.anyio
+async def test_daemon_runs_jobs_on_pooled_browsers(tmp_path, monkeypatch):
+    async def fake_run_job(browser, url, script, output_dir, capture_logs, automation_output_dir, timeout,
+                           *options):
+        return {"status": "success", "data": {"output": [browser, url, script, timeout]}}
+
+    monkeypatch.setattr(playwright_executor, "run_job", fake_run_job)
+    socket_path = tmp_path / "executor.sock"
+    pool = FakePool()
+    daemon = asyncio.create_task(playwright_executor.serve(str(socket_path), pool))
+    await wait_for_socket(socket_path)
+
+    jobs = [{"url": f"http://example.test/{i}", "script": "pass", "timeout": 5} for i in range(3)]
+    results = await asyncio.gather(*(playwright_executor.submit_to_daemon(str(socket_path), job) for job in jobs))
+    stats = await playwright_executor.submit_to_daemon(str(socket_path), {"op": "stats"})
+
+    daemon.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await daemon
+
+    assert [result["data"]["output"][1] for result in results] == [job["url"] for job in jobs]
+    assert results[0]["data"]["output"][0] == "warm-browser"
+    assert stats == {"jobs": 3, "script_cache": playwright_executor.SCRIPT_CACHE.stats()}
+    assert pool.closed and not socket_path.exists()
+
+
+@pytest.mark.anyio
+async def test_daemon_socket_is_owner_only_and_not_taken_over(tmp_path):
+    socket_path = tmp_path / "executor.sock"
+    # A socket file left behind by a daemon that died is replaced.
+    socket_path.touch()
+    first_pool = FakePool()
+    daemon = asyncio.create_task(playwright_executor.serve(str(socket_path), first_pool))
+    while await playwright_executor.submit_to_daemon(str(socket_path), {"op": "stats"}) is None:
+        await asyncio.sleep(0.01)
+    assert socket_path.stat().st_mode & 0o077 == 0
+
+    second_pool = FakePool()
+    with pytest.raises(playwright_executor.DaemonAlreadyRunning):
+        await playwright_executor.serve(str(socket_path), second_pool)
+    assert not second_pool.started
+    assert await playwright_executor.submit_to_daemon(str(socket_path), {"op": "stats"}) is not None
+
+    daemon.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await daemon
+
+
+@pytest.mark.anyio
+async def test_no_daemon_listening(tmp_path):
+    assert await playwright_executor.submit_to_daemon(str(tmp_path / "missing.sock"), {"op": "stats"}) is None
+
+
+@pytest.mark.anyio
+async def test_batch_bounds_concurrency_and_streams_results_as_they_finish():
+    in_flight = peak = 0
+
+    async def runner(job):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(job["delay"])
+        in_flight -= 1
+        if job["id"] == "broken":
+            raise RuntimeError("boom")
+        return {"status": "success", "data": {"output": job["url"]}}
+
+    jobs = [{"id": "slow", "url": "http://example.test/slow", "delay": 0.2}]
+    jobs += [{"id": i, "url": f"http://example.test/{i}", "delay": 0.02} for i in range(6)]
+    jobs += [{"id": "broken", "url": "http://example.test/broken", "delay": 0.01}]
+    emitted = []
+
+    summary = await playwright_executor.run_batch(jobs, 3, runner, emitted.append)
+
+    assert peak == 3
+    assert len(emitted) == len(jobs)
+    # The slow job started first but is not held back to the front of the output.
+    assert emitted[-1]["job"]["id"] == "slow"
+    broken = next(result for result in emitted if result["job"]["id"] == "broken")
+    assert broken["status"] == "error" and "boom" in broken["data"]["error"]
+    assert all({"queued_ms", "job_ms"} <= set(result["timing"]) for result in emitted)
+    assert summary["summary"]["jobs"] == 8 and summary["summary"]["failed"] == 1
+    # Wall time tracks the slowest lane, not the sum of all jobs.
+    assert summary["summary"]["wall_ms"] < summary["summary"]["sum_job_ms"]
+
+
+def test_manifest_accepts_json_lines_and_script_files(tmp_path):
+    (tmp_path / "check.py").write_text("await page.title()")
+    manifest = tmp_path / "jobs.jsonl"
+    manifest.write_text(
+        '{"url": "http://example.test/a", "script": "pass", "id": "a"}\n'
+        '\n'
+        '{"url": "http://example.test/b", "script_file": "check.py", "timeout": 5}\n'
+    )
+    args = playwright_executor.build_parser().parse_args(["--manifest", str(manifest), "--output", "shots"])
+
+    jobs = playwright_executor.load_manifest(str(manifest), args)
+
+    assert [job["id"] for job in jobs] == ["a", 1]
+    assert jobs[1]["script"] == "await page.title()"
+    assert jobs[1]["timeout"] == 5 and jobs[0]["timeout"] == args.timeout
+    assert jobs[0]["output_dir"].endswith("shots")
+
+
+def test_manifest_entry_without_script_is_rejected(tmp_path):
+    manifest = tmp_path / "jobs.json"
+    manifest.write_text('[{"url": "http://example.test/"}]')
+    args = playwright_executor.build_parser().parse_args(["--manifest", str(manifest)])
+
+    with pytest.raises(ValueError):
+        playwright_executor.load_manifest(str(manifest), args)
+
+
+class FakePage:
+    def __init__(self):
+        self.screenshots = []
+
+    def on(self, event, handler):
+        pass
+
+    async def goto(self, url, **kwargs):
+        pass
+
+    async def screenshot(self, **kwargs):
+        self.screenshots.append(kwargs)
+        return b"jpeg bytes"
+
+    async def evaluate(self, script):
+        return {"navigation": None, "lcp_ms": 100.0, "resources": [], "long_tasks": []}
+
+
+class FakeContext:
+    def __init__(self, page):
+        self.page = page
+        self.har = None
+
+    async def add_init_script(self, script):
+        pass
+
+    async def new_cdp_session(self, page):
+        raise RuntimeError("no CDP here")
+
+    async def route_from_har(self, har, **kwargs):
+        self.har = (har, kwargs)
+
+    async def new_page(self):
+        return self.page
+
+    async def close(self):
+        if self.har is not None and self.har[1].get("update"):
+            with open(self.har[0], "w") as f:
+                f.write("{}")
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.page = FakePage()
+
+    async def new_context(self):
+        return FakeContext(self.page)
+
+
+@pytest.mark.anyio
+async def test_final_screenshot_is_captured_once_into_the_store(tmp_path):
+    browser = FakeBrowser()
+    shots, runs = tmp_path / "shots", tmp_path / "runs"
+
+    first = await playwright_executor.run_job(browser, "http://example.test/", "return 1", str(shots),
+                                              automation_output_dir=str(runs), screenshot="viewport")
+    second = await playwright_executor.run_job(browser, "http://example.test/", "return 2", str(shots),
+                                               automation_output_dir=str(runs), screenshot="viewport")
+
+    assert first["status"] == second["status"] == "success"
+    assert browser.page.screenshots == [{"type": "jpeg", "quality": 50, "full_page": False}] * 2
+    # Identical captures share one stored object, and "latest" links to it.
+    assert first["data"]["screenshots"] == second["data"]["screenshots"]
+    stored = first["data"]["screenshots"][0]
+    assert stored.startswith(str(runs / "artifacts"))
+    assert os.path.samefile(shots / "screenshot.jpeg", stored)
+
+
+@pytest.mark.anyio
+async def test_screenshots_taken_by_the_script_are_reported(tmp_path):
+    browser = FakeBrowser()
+    script = "open(f'{output_dir}/step.png', 'wb').close()"
+
+    result = await playwright_executor.run_job(browser, "http://example.test/", script, str(tmp_path / "shots"),
+                                               automation_output_dir=str(tmp_path / "runs"))
+
+    assert browser.page.screenshots == []
+    assert [os.path.basename(path) for path in result["data"]["screenshots"]] == ["step.png"]
+
+
+def test_screenshot_options():
+    assert playwright_executor.screenshot_options("full") == {"full_page": True}
+    assert playwright_executor.screenshot_options("clip", [0, 0, 800, 600]) == {
+        "clip": {"x": 0, "y": 0, "width": 800, "height": 600}
+    }
+    with pytest.raises(ValueError):
+        playwright_executor.screenshot_options("clip")
+
+
+@pytest.mark.anyio
+async def test_har_auto_mode_records_then_replays(tmp_path):
+    har = {"mode": "auto", "dir": str(tmp_path / "har")}
+    runs = str(tmp_path / "runs")
+
+    first = await playwright_executor.run_job(FakeBrowser(), "http://example.test/", "return 1", str(tmp_path / "shots"),
+                                              automation_output_dir=runs, har=har)
+    second = await playwright_executor.run_job(FakeBrowser(), "http://example.test/", "return 1", str(tmp_path / "shots"),
+                                               automation_output_dir=runs, har=har)
+    # Keyed by script as well, there is no recording to replay yet.
+    by_script = {**har, "mode": "replay", "key": "script"}
+    failed = await playwright_executor.run_job(FakeBrowser(), "http://example.test/", "return 1", str(tmp_path / "shots"),
+                                               automation_output_dir=runs, har=by_script)
+
+    assert first["har"]["mode"] == "record" and second["har"]["mode"] == "replay"
+    assert os.path.exists(second["har"]["path"])
+    assert failed["status"] == "error" and "No HAR recorded" in failed["data"]["error"]
+
+
+@pytest.mark.anyio
+async def test_audit_loads_the_page_in_fresh_contexts():
+    audit = await playwright_executor.run_audit(FakeBrowser(), "http://example.test/", runs=3)
+
+    assert audit["url"] == "http://example.test/" and audit["runs"] == 3
+    assert audit["metrics"]["lcp_ms"] == 100.0 and audit["metrics"]["js_heap_used_mb"] is None
@@ -0,0 +1,130 @@
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError
+
+from rate_limit import Limit, RateLimiter, RateLimitMiddleware, client_buckets
+
+
+class UnreachableRedis:
+    def register_script(self, script):
+        async def run(keys, args):
+            raise ConnectionError("connection refused")
+
+        return run
+
+
+def test_limit_parse():
+    assert Limit.parse("10:50") == Limit(10.0, 50)
+    assert Limit.parse("2.5") == Limit(2.5, 3)
+
+
+@pytest.mark.anyio
+async def test_bucket_allows_burst_then_refuses():
+    limiter = RateLimiter()
+    bucket = [("ip:1.2.3.4", Limit(1, 3), 1)]
+    decisions = [await limiter.check(bucket) for _ in range(4)]
+
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+    assert decisions[-1].headers()["Retry-After"] == "1"
+    assert decisions[0].headers()["RateLimit-Limit"] == "3"
+
+
+@pytest.mark.anyio
+async def test_refusal_debits_no_bucket():
+    limiter = RateLimiter()
+    roomy, tight = ("a", Limit(1, 10), 1), ("b", Limit(1, 1), 1)
+    assert (await limiter.check([roomy, tight])).allowed
+    assert not (await limiter.check([roomy, tight])).allowed
+    # Only the first, admitted request was charged to the roomy bucket.
+    assert (await limiter.check([roomy])).remaining == 8
+
+
+@pytest.mark.anyio
+async def test_tokens_refill_over_time(monkeypatch):
+    limiter = RateLimiter()
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    bucket = [("k", Limit(2, 2), 1)]
+    for _ in range(2):
+        await limiter.check(bucket)
+    assert not (await limiter.check(bucket)).allowed
+    now[0] += 0.5
+    assert (await limiter.check(bucket)).allowed
+
+
+@pytest.mark.anyio
+async def test_falls_back_to_local_buckets_without_redis():
+    limiter = RateLimiter(UnreachableRedis(), retry_after=60)
+    bucket = [("k", Limit(1, 1), 1)]
+    assert (await limiter.check(bucket)).allowed
+    assert not (await limiter.check(bucket)).allowed
+    assert limiter.stats()["redis_errors"] == 1
+
+
+def test_client_buckets_cost_one_token_per_item():
+    buckets = client_buckets(Limit(1, 5), ["a", "b", "a"])
+    assert sorted((key, cost) for key, _, cost in buckets) == [("client:a", 2), ("client:b", 1)]
+    assert client_buckets(None, ["a"]) == []
+
+
+@pytest.mark.anyio
+async def test_one_large_batch_drains_the_client_bucket():
+    limiter = RateLimiter()
+    limit = Limit(0.001, 100)
+    assert (await limiter.check(client_buckets(limit, ["a"] * 60))).allowed
+    assert not (await limiter.check(client_buckets(limit, ["a"] * 60))).allowed
+    assert (await limiter.check(client_buckets(limit, ["a"] * 40))).allowed
+
+
+def test_middleware_limits_only_selected_routes():
+    app = FastAPI()
+
+    @app.post("/write")
+    async def write():
+        return {"ok": True}
+
+    @app.get("/read")
+    async def read():
+        return {"ok": True}
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=RateLimiter(),
+        routes={("POST", "/write")},
+        per_ip=Limit(0.001, 2),
+        global_writes=Limit(100, 100),
+    )
+    with TestClient(app) as client:
+        responses = [client.post("/write") for _ in range(3)]
+        assert [r.status_code for r in responses] == [200, 200, 429]
+        assert responses[0].headers["RateLimit-Remaining"] == "1"
+        assert "Retry-After" in responses[2].headers
+        assert client.get("/read").status_code == 200
+
+
+def test_sized_routes_are_charged_by_the_handler():
+    app = FastAPI()
+    limiter = RateLimiter()
+
+    @app.post("/batch")
+    async def batch(request: Request):
+        items = await request.json()
+        await limiter.enforce(request.state.rate_limit.buckets(request.scope, cost=len(items)))
+        return {"ok": True}
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=limiter,
+        routes=set(),
+        sized_routes={("POST", "/batch")},
+        per_ip=Limit(0.001, 10),
+        global_writes=Limit(100, 100),
+    )
+    with TestClient(app) as client:
+        assert client.post("/batch", json=[1] * 8).status_code == 200
+        assert client.post("/batch", json=[1] * 8).status_code == 429
+        assert client.post("/batch", json=[1] * 2).status_code == 200
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from retention import (
+    MINUTE_ROLLUP_TTL_INDEX,
+    RAW_TTL_INDEX,
+    RetentionPolicy,
+    apply_retention,
+    collection_stats,
+    retention_status,
+    storage_report,
+)
+
+
+class FakeCursor:
+    def __init__(self, items):
+        self.items = items
+
+    async def to_list(self, length):
+        return list(self.items)
+
+
+class FakeCollection:
+    def __init__(self, name, db):
+        self.name = name
+        self.db = db
+        self.indexes = [{"name": "_id_", "key": {"_id": 1}}]
+        self.docs = []
+        self.storage_stats = []
+
+    def list_indexes(self):
+        return FakeCursor(self.indexes)
+
+    async def create_indexes(self, models):
+        self.indexes.extend(model.document for model in models)
+
+    async def drop_index(self, name):
+        self.indexes = [index for index in self.indexes if index["name"] != name]
+
+    async def find_one(self, query, projection=None, sort=None):
+        docs = [doc for doc in self.docs if all(doc.get(k) == v for k, v in query.items())]
+        if sort:
+            docs.sort(key=lambda doc: doc[sort[0][0]], reverse=sort[0][1] < 0)
+        return docs[0] if docs else None
+
+    def aggregate(self, pipeline):
+        if not self.storage_stats:
+            raise OperationFailure("ns not found", code=26)
+        return FakeCursor(self.storage_stats)
+
+
+class FakeDB(dict):
+    def __init__(self):
+        super().__init__()
+        self.commands = []
+        self.server_status = {"wiredTiger": {"cache": {"maximum bytes configured": 1000,
+                                                       "bytes currently in the cache": 400}}}
+
+    def __missing__(self, name):
+        self[name] = FakeCollection(name, self)
+        return self[name]
+
+    def __getattr__(self, name):
+        return self[name]
+
+    async def command(self, name, value=None, **kwargs):
+        self.commands.append((name, value, kwargs))
+        if name == "serverStatus":
+            return self.server_status
+        if name == "collMod":
+            for index in self[value].indexes:
+                if index["name"] == kwargs["index"]["name"]:
+                    index["expireAfterSeconds"] = kwargs["index"]["expireAfterSeconds"]
+        return {"ok": 1}
+
+
+def ttl(db, collection, name):
+    return next(index for index in db[collection].indexes if index["name"] == name).get("expireAfterSeconds")
+
+
+def test_minute_rollups_must_outlive_raw_events():
+    with pytest.raises(ValueError):
+        RetentionPolicy(raw_ttl=timedelta(days=30), minute_rollup_ttl=timedelta(days=30, minutes=30))
+    # An hour is enough: day buckets are derived from hour buckets.
+    RetentionPolicy(raw_ttl=timedelta(days=30), minute_rollup_ttl=timedelta(days=30, hours=1))
+    assert RetentionPolicy.from_days(0, 0) == RetentionPolicy(None, None)
+
+
+@pytest.mark.anyio
+async def test_ttl_indexes_are_created_updated_in_place_and_dropped():
+    db = FakeDB()
+
+    created = await apply_retention(db, RetentionPolicy.from_days(30, 90))
+    unchanged = await apply_retention(db, RetentionPolicy.from_days(30, 90))
+    updated = await apply_retention(db, RetentionPolicy.from_days(7, 90))
+
+    assert created == {RAW_TTL_INDEX: "created", MINUTE_ROLLUP_TTL_INDEX: "created"}
+    assert unchanged == {RAW_TTL_INDEX: "unchanged", MINUTE_ROLLUP_TTL_INDEX: "unchanged"}
+    assert updated == {RAW_TTL_INDEX: "updated", MINUTE_ROLLUP_TTL_INDEX: "unchanged"}
+    assert ttl(db, "status_checks", RAW_TTL_INDEX) == 7 * 86400
+    assert [command[0] for command in db.commands] == ["collMod"]
+    minute_index = next(i for i in db["status_rollups"].indexes if i["name"] == MINUTE_ROLLUP_TTL_INDEX)
+    assert minute_index["partialFilterExpression"] == {"granularity": "minute"}
+
+    dropped = await apply_retention(db, RetentionPolicy.from_days(0, 90))
+
+    assert dropped[RAW_TTL_INDEX] == "dropped"
+    assert all(index["name"] != RAW_TTL_INDEX for index in db["status_checks"].indexes)
+
+
+@pytest.mark.anyio
+async def test_unarchived_events_close_to_expiry_are_at_risk():
+    db = FakeDB()
+    now = datetime(2025, 3, 1)
+    policy = RetentionPolicy.from_days(30, 90)
+    db["status_checks"].docs = [{"timestamp": now - timedelta(days=29, hours=12)}]
+
+    never_rolled_up = await retention_status(db, policy, now)
+    db["rollup_state"].docs = [{"_id": "status_checks", "high_water_mark": now - timedelta(minutes=2)}]
+    current = await retention_status(db, policy, now)
+
+    assert never_rolled_up["archive_at_risk"] is True
+    assert never_rolled_up["unarchived_expires_in_seconds"] == 12 * 3600
+    assert current["archive_at_risk"] is False
+    assert current["oldest_raw"] == now - timedelta(days=29, hours=12)
+
+
+@pytest.mark.anyio
+async def test_storage_report_sums_shards_and_compares_indexes_with_cache():
+    db = FakeDB()
+    db["status_checks"].storage_stats = [
+        {"storageStats": {"count": 3, "size": 300, "storageSize": 200, "totalIndexSize": 400,
+                          "indexSizes": {"_id_": 100, RAW_TTL_INDEX: 300}}},
+        {"storageStats": {"count": 1, "size": 100, "storageSize": 50, "totalIndexSize": 700,
+                          "indexSizes": {"_id_": 700}}},
+    ]
+
+    report = await storage_report(db, RetentionPolicy.from_days(30, 90), datetime(2025, 3, 1))
+
+    checks = report["collections"]["status_checks"]
+    assert checks["count"] == 4 and checks["avg_doc_bytes"] == 100
+    assert checks["indexes"] == {"_id_": 800, RAW_TTL_INDEX: 300}
+    assert report["collections"]["status_rollups"] == {"exists": False}
+    assert report["index_bytes"] == 1100 and report["indexes_fit_in_cache"] is False
+    assert report["retention"]["raw_ttl_seconds"] == 30 * 86400
+
+
+@pytest.mark.anyio
+async def test_collection_stats_reraises_other_failures():
+    db = FakeDB()
+
+    def unauthorized(pipeline):
+        raise OperationFailure("not authorized", code=13)
+
+    db["status_checks"].aggregate = unauthorized
+    with pytest.raises(OperationFailure):
+        await collection_stats(db, "status_checks")
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from rollups import (
+    LEASE_ID,
+    STATE_COLLECTION,
+    STATE_ID,
+    RollupRefresher,
+    acquire_lease,
+    ceil_time,
+    derive_pipeline,
+    floor_time,
+    raw_to_minutes_pipeline,
+    refresh_rollups,
+    release_lease,
+)
+
+
+class FakeAggregation:
+    async def to_list(self, length):
+        return []
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.pipelines = []
+
+    async def find_one(self, query, projection=None, sort=None):
+        return self.docs[0] if self.docs else None
+
+    async def update_one(self, query, update, upsert=False):
+        current = self.docs[0] if self.docs else dict(query)
+        for field, value in update["$max"].items():
+            current[field] = max(current.get(field, value), value)
+        self.docs = [current]
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return FakeAggregation()
+
+
+class FakeDB(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+
+def test_floor_and_ceil_time():
+    value = datetime(2025, 4, 5, 13, 47, 12, 500)
+    assert floor_time(value, "minute") == datetime(2025, 4, 5, 13, 47)
+    assert floor_time(value, "hour") == datetime(2025, 4, 5, 13)
+    assert floor_time(value, "day") == datetime(2025, 4, 5)
+    assert ceil_time(value, "hour") == datetime(2025, 4, 5, 14)
+    assert ceil_time(datetime(2025, 4, 5), "day") == datetime(2025, 4, 5)
+
+
+def test_pipelines_replace_whole_buckets():
+    start, end = datetime(2025, 4, 5, 13), datetime(2025, 4, 5, 14)
+    minutes = raw_to_minutes_pipeline(start, end)
+    assert minutes[0] == {"$match": {"timestamp": {"$gte": start, "$lt": end}}}
+    assert minutes[-1]["$merge"]["whenMatched"] == "replace"
+
+    hours = derive_pipeline("hour", start, end)
+    assert hours[0]["$match"]["granularity"] == "minute"
+    assert hours[1]["$group"]["count"] == {"$sum": "$count"}
+
+
+@pytest.mark.anyio
+async def test_refresh_advances_high_water_mark_in_windows():
+    oldest = {"timestamp": datetime(2025, 4, 3, 23, 59, 30)}
+    db = FakeDB(
+        status_checks=FakeCollection([oldest]),
+        status_rollups=FakeCollection(),
+        rollup_state=FakeCollection(),
+    )
+    now = datetime(2025, 4, 5, 12, 0, 30)
+
+    high_water_mark = await refresh_rollups(db, now=now, settle=timedelta(seconds=60))
+
+    assert high_water_mark == datetime(2025, 4, 5, 11, 59)
+    assert db.rollup_state.docs[0]["high_water_mark"] == high_water_mark
+    # Two windows (bounded to one day each), each deriving hour and day buckets.
+    assert len(db.status_checks.pipelines) == 2
+    assert len(db.status_rollups.pipelines) == 4
+
+    assert await refresh_rollups(db, now=now, settle=timedelta(seconds=60)) == high_water_mark
+    assert len(db.status_checks.pipelines) == 2
+
+
+@pytest.mark.anyio
+async def test_refresh_on_empty_collection_is_a_no_op():
+    db = FakeDB(status_checks=FakeCollection(), status_rollups=FakeCollection(), rollup_state=FakeCollection())
+    assert await refresh_rollups(db, now=datetime(2025, 4, 5)) is None
+
+
+@pytest.mark.anyio
+async def test_only_one_refresher_holds_the_lease():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["rollups"]
+    now = datetime(2025, 4, 5, 12)
+    lease = timedelta(seconds=90)
+
+    assert await acquire_lease(db, "worker-1", lease, now) is True
+    assert await acquire_lease(db, "worker-2", lease, now + timedelta(seconds=30)) is False
+    # The holder renews; others only get in once it lapses.
+    assert await acquire_lease(db, "worker-1", lease, now + timedelta(seconds=60)) is True
+    assert await acquire_lease(db, "worker-2", lease, now + timedelta(seconds=120)) is False
+    assert await acquire_lease(db, "worker-2", lease, now + timedelta(seconds=151)) is True
+
+    await release_lease(db, "worker-1")
+    assert await acquire_lease(db, "worker-1", lease, now + timedelta(seconds=160)) is False
+    await release_lease(db, "worker-2")
+    assert await acquire_lease(db, "worker-1", lease, now + timedelta(seconds=160)) is True
+
+
+@pytest.mark.anyio
+async def test_followers_skip_the_refresh_but_see_new_rollups():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["rollups"]
+    refreshed = []
+
+    async def on_refresh():
+        refreshed.append(True)
+
+    leader = RollupRefresher(db, owner="leader")
+    follower = RollupRefresher(db, owner="follower", on_refresh=on_refresh)
+    await leader.run_once()
+    await follower.run_once()
+    assert leader.leader and not follower.leader and refreshed == []
+
+    mark = datetime(2025, 4, 5, 12)
+    await db[STATE_COLLECTION].update_one({"_id": STATE_ID}, {"$set": {"high_water_mark": mark}}, upsert=True)
+    await follower.run_once()
+
+    assert follower.high_water_mark == mark and refreshed == [True]
+    # Only the lease and the high-water mark live in rollup_state.
+    assert await db[STATE_COLLECTION].count_documents({}) == 2
+    await leader.close()
+    assert await db[STATE_COLLECTION].find_one({"_id": LEASE_ID}) is None
@@ -0,0 +1,76 @@
+import base64
+import traceback
+
+import pytest
+
+from script_cache import ScriptCache, decode_script, wrap_script
+
+
+def test_wrap_script_indents_the_body_of_run_test():
+    assert wrap_script("x = 1\n\nreturn x") == "async def run_test(page, output_dir):\n    x = 1\n\n    return x\n"
+
+
+def test_decode_script_accepts_plain_and_base64():
+    assert decode_script("return 1") == "return 1"
+    assert decode_script("base64:" + base64.b64encode(b"return 1").decode()) == "return 1"
+
+
+@pytest.mark.anyio
+async def test_compiled_script_runs_with_page_and_output_dir():
+    cache = ScriptCache()
+
+    run_test = cache.get("await page.goto('x')\nreturn [page.visited, output_dir]").run_test()
+
+    class Page:
+        visited = None
+
+        async def goto(self, url):
+            self.visited = url
+
+    assert await run_test(Page(), "/runs/1") == ["x", "/runs/1"]
+
+
+def test_repeated_and_base64_scripts_hit_the_cache():
+    cache = ScriptCache()
+    encoded = "base64:" + base64.b64encode(b"return 1").decode()
+
+    first = cache.get("return 1")
+    assert cache.get("return 1") is first
+    assert cache.get(encoded) is cache.get(encoded)
+    assert cache.get(encoded).source == first.source
+    assert cache.stats() == {"entries": 2, "hits": 3, "misses": 2}
+
+
+def test_every_job_gets_a_fresh_namespace():
+    compiled = ScriptCache().get("return 1")
+
+    assert compiled.run_test() is not compiled.run_test()
+
+
+def test_least_recently_used_script_is_evicted():
+    cache = ScriptCache(max_entries=2)
+    a = cache.get("return 'a'")
+    cache.get("return 'b'")
+    cache.get("return 'a'")
+    cache.get("return 'c'")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get("return 'a'") is a
+    assert cache.stats()["misses"] == 3
+    cache.get("return 'b'")
+    assert cache.stats()["misses"] == 4
+
+
+@pytest.mark.anyio
+async def test_tracebacks_show_the_script_source():
+    run_test = ScriptCache().get("x = 1\nraise ValueError('bad step')").run_test()
+
+    with pytest.raises(ValueError) as exc_info:
+        await run_test(None, "")
+
+    assert "raise ValueError('bad step')" in "".join(traceback.format_tb(exc_info.tb))
+
+
+def test_syntax_errors_surface_at_compile_time():
+    with pytest.raises(SyntaxError):
+        ScriptCache().get("return (")
@@ -0,0 +1,144 @@
+import uuid
+
+import httpx
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+from external_integrations.postgrest import PostgrestClient  # noqa: E402
+from tests.fake_postgrest import FakePostgrest  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "AsyncIOMotorClient", lambda *args, **kwargs: mongomock_motor.AsyncMongoMockClient())
+    with TestClient(server.app) as client:
+        yield client
+
+
+def test_batch_reports_a_result_per_item(client):
+    response = client.post("/api/status/batch", json=[{"client_name": "a"}, {"nope": 1}, "x", {"client_name": "b"}])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["inserted"] == 2 and body["failed"] == 2
+    assert [(r["index"], r["ok"]) for r in body["results"]] == [(0, True), (1, False), (2, False), (3, True)]
+    assert "client_name" in body["results"][1]["error"]
+    assert body["results"][2]["error"] == "Expected a JSON object"
+    stored = client.get("/api/status", params={"limit": 10}).json()
+    assert {doc["id"] for doc in stored} == {body["results"][0]["id"], body["results"][3]["id"]}
+
+
+def test_batch_accepts_ndjson_with_blank_lines(client):
+    body = b'{"client_name": "a"}\n\n{"client_name": "b"}\n   \n{"oops": true}\n'
+
+    response = client.post("/api/status/batch", content=body, headers={"content-type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert [r["ok"] for r in response.json()["results"]] == [True, True, False]
+
+
+def test_batch_rejects_malformed_bodies(client):
+    assert client.post("/api/status/batch", content=b"{not json", headers={"content-type": "application/json"}
+                       ).status_code == 400
+    assert client.post("/api/status/batch", json={"client_name": "a"}).status_code == 400
+
+
+def test_batch_over_the_limit_is_rejected(client):
+    items = [{"client_name": "a"}] * (server.MAX_STATUS_BATCH_SIZE + 1)
+
+    response = client.post("/api/status/batch", json=items)
+
+    assert response.status_code == 413
+    assert client.get("/api/status").json() == []
+
+
+def test_batch_maps_write_errors_back_to_request_positions(client, monkeypatch):
+    existing = client.post("/api/status/batch", json=[{"client_name": "a"}]).json()["results"][0]["id"]
+    # The second valid item collides with the unique id index.
+    ids = iter([uuid.uuid4(), uuid.UUID(existing)])
+    monkeypatch.setattr(server.uuid, "uuid4", lambda: next(ids))
+
+    response = client.post("/api/status/batch", json=[5, {"client_name": "b"}, {"client_name": "c"}])
+
+    body = response.json()
+    assert body["inserted"] == 1 and body["failed"] == 2
+    assert [r["ok"] for r in body["results"]] == [False, True, False]
+    assert "E11000" in body["results"][2]["error"]
+
+
+def test_batch_larger_than_the_remaining_budget_is_refused(client, monkeypatch):
+    # Only the per-IP bucket (RATE_LIMIT_PER_IP, 50 tokens by default) applies.
+    monkeypatch.setattr(server, "rate_limiter", server.RateLimiter())
+    monkeypatch.setattr(server, "per_client_limit", None)
+    assert client.post("/api/status/batch", json=[{"client_name": "a"}] * 40).status_code == 200
+
+    response = client.post("/api/status/batch", json=[{"client_name": "a"}] * 20)
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert len(client.get("/api/status", params={"limit": 100}).json()) == 40
+
+
+def test_status_revalidation_answers_304_until_the_next_write(client):
+    client.post("/api/status", json={"client_name": "a"})
+    first = client.get("/api/status")
+    etag = first.headers["ETag"]
+    assert "Last-Modified" in first.headers
+
+    assert client.get("/api/status", headers={"If-None-Match": etag}).status_code == 304
+    client.post("/api/status", json={"client_name": "b"})
+    second = client.get("/api/status", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert [doc["client_name"] for doc in second.json()] == ["b", "a"]
+
+
+def test_admin_storage_is_off_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(server, "admin_token", None)
+
+    assert client.get("/api/admin/storage", headers={"Authorization": "Bearer anything"}).status_code == 404
+
+
+def test_admin_storage_requires_the_admin_token(client, monkeypatch):
+    monkeypatch.setattr(server, "admin_token", "s3cret")
+
+    async def fake_report(db, policy):
+        return {"collections": {}}
+
+    monkeypatch.setattr(server, "storage_report", fake_report)
+
+    assert client.get("/api/admin/storage").status_code == 401
+    assert client.get("/api/admin/storage", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/api/admin/storage", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200 and response.json() == {"collections": {}}
+
+
+def test_waitlist_clients_are_rebuilt_for_every_lifespan(monkeypatch, tmp_path):
+    fake = FakePostgrest()
+    monkeypatch.setattr(server, "AsyncIOMotorClient", lambda *args, **kwargs: mongomock_motor.AsyncMongoMockClient())
+    monkeypatch.setattr(
+        server,
+        "PostgrestClient",
+        lambda url, key: PostgrestClient(url, key, transport=httpx.ASGITransport(app=fake.app)),
+    )
+    monkeypatch.setattr(server, "supabase_url", "http://postgrest.local")
+    monkeypatch.setattr(server, "supabase_key", "service-key")
+    monkeypatch.setattr(server, "waitlist_enabled", True)
+    monkeypatch.setattr(server, "outbox_path", str(tmp_path / "outbox.db"))
+    submission = {
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "phone_number": "+1 555 0100",
+        "institution": "Test University",
+        "role": "Admissions Director",
+        "student_count": "1,000 - 5,000",
+    }
+
+    for i in range(2):
+        with TestClient(server.app) as client:
+            response = client.post("/api/waitlist", json={**submission, "email": f"ada{i}@university.edu"})
+            assert response.status_code == 202
+    assert server.waitlist_outbox is None and server.postgrest is None
@@ -0,0 +1,146 @@
+"""Supabase waitlist scenarios against a local PostgREST stand-in.
+
+Replaces the manual scripts that probed a live project (table access,
+RLS insert/select policies, read-back) with offline checks. The fake is
+served over real sockets, each role uses one pooled client, and
+independent scenarios run concurrently.
+"""
+import asyncio
+import contextlib
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from external_integrations.outbox import WaitlistOutbox
+from external_integrations.postgrest import PostgrestClient, PostgrestError
+from external_integrations.waitlist import WAITLIST_TABLE, WaitlistBatcher, create_waitlist_router
+from tests.fake_postgrest import ANON_KEY, SERVICE_KEY, FakePostgrest
+
+KEYS = {ANON_KEY: "anon", SERVICE_KEY: "service_role", "user-jwt": "authenticated"}
+
+
+def row(i, **overrides):
+    values = {
+        "first_name": "Emma",
+        "last_name": "Davis",
+        "email": f"emma{i}@university.edu",
+        "phone_number": "+1 555 0100",
+        "institution": "Test University",
+        "role": "Registrar",
+        "student_count": "1,000 - 5,000",
+    }
+    values.update(overrides)
+    return values
+
+
+@pytest.fixture
+def serve():
+    with contextlib.ExitStack() as stack:
+        yield lambda fake: stack.enter_context(fake.serve())
+
+
+@pytest.fixture
+async def clients():
+    opened = []
+
+    def connect(base_url, key=SERVICE_KEY, **kwargs):
+        client = PostgrestClient(base_url, key, **kwargs)
+        opened.append(client)
+        return client
+
+    yield connect
+    await asyncio.gather(*(client.aclose() for client in opened))
+
+
+async def status_of(call) -> int:
+    try:
+        await call
+    except PostgrestError as exc:
+        return exc.status_code
+    return 201
+
+
+@pytest.mark.anyio
+async def test_rls_policies(serve, clients):
+    fake = FakePostgrest(keys=KEYS)
+    base_url = serve(fake)
+    anon, service, bogus = clients(base_url, ANON_KEY), clients(base_url, SERVICE_KEY), clients(base_url, "wrong")
+
+    async def anon_can_insert_but_not_read():
+        assert await status_of(anon.insert(WAITLIST_TABLE, [row(1)])) == 201
+        assert await anon.select(WAITLIST_TABLE, {"select": "*"}) == []
+
+    async def service_reads_back_by_filter():
+        await service.insert(WAITLIST_TABLE, [row(2, first_name="Ada")])
+        found = await service.select(WAITLIST_TABLE, {"select": "email", "first_name": "eq.Ada"})
+        assert found == [{"email": "emma2@university.edu"}]
+
+    async def unknown_key_is_rejected():
+        assert await status_of(bogus.insert(WAITLIST_TABLE, [row(3)])) == 401
+        with pytest.raises(PostgrestError) as excinfo:
+            await bogus.select(WAITLIST_TABLE, {"select": "*"})
+        assert excinfo.value.status_code == 401
+
+    await asyncio.gather(anon_can_insert_but_not_read(), service_reads_back_by_filter(), unknown_key_is_rejected())
+    assert sorted(r["email"] for r in fake.rows) == ["emma1@university.edu", "emma2@university.edu"]
+
+
+@pytest.mark.anyio
+async def test_missing_insert_policy(serve, clients, tmp_path):
+    fake = FakePostgrest(keys=KEYS, policies={"service_role": {"insert", "select"}})
+    base_url = serve(fake)
+
+    statuses = await asyncio.gather(
+        status_of(clients(base_url, ANON_KEY).insert(WAITLIST_TABLE, [row(1)])),
+        status_of(clients(base_url, "user-jwt").insert(WAITLIST_TABLE, [row(2)])),
+    )
+    assert statuses == [401, 403]
+
+    # A policy problem is a configuration error: rows wait in the outbox.
+    outbox = WaitlistOutbox(str(tmp_path / "outbox.db"), clients(base_url, ANON_KEY), push_retries=1)
+    await outbox.open()
+    await outbox.submit(row(3))
+    assert await outbox.drain_once() == 0
+    stats = outbox.stats()
+    await outbox.close()
+    assert (stats["queue_depth"], stats["dead_letters"]) == (1, 0)
+
+
+@pytest.mark.anyio
+async def test_injected_latency_overlaps_on_pooled_connections(serve, clients):
+    fake = FakePostgrest(keys=KEYS, latency=0.2)
+    postgrest = clients(serve(fake), ANON_KEY, max_connections=10)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(postgrest.insert(WAITLIST_TABLE, [row(i)]) for i in range(20)))
+    elapsed = time.perf_counter() - start
+
+    # Sequential calls would take 20 * 0.2s; ten connections need about 0.4s.
+    assert elapsed < 2.0
+    assert fake.max_in_flight > 1
+    assert len(fake.peers) <= 10
+    assert len(fake.rows) == 20
+
+
+@pytest.mark.anyio
+async def test_waitlist_endpoint_against_slow_supabase(serve, clients):
+    fake = FakePostgrest(keys=KEYS, latency=0.05)
+    batcher = WaitlistBatcher(clients(serve(fake), ANON_KEY), max_batch=50, max_delay=0.02)
+    app = FastAPI()
+    app.include_router(create_waitlist_router())
+    app.state.waitlist_batcher = batcher
+    batcher.start()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend") as client:
+        responses = await asyncio.gather(*(client.post("/api/waitlist", json=row(i)) for i in range(30)))
+        # Concurrent sign-ups were coalesced into a handful of bulk inserts.
+        assert len(fake.requests) < 10
+        duplicate = await client.post("/api/waitlist", json=row(0, first_name="Again"))
+    await batcher.close()
+
+    assert [response.status_code for response in responses] == [201] * 30
+    assert duplicate.status_code == 409
+    assert {request["apikey"] for request in fake.requests} == {ANON_KEY}
@@ -0,0 +1,185 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from external_integrations.email_index import EmailIndex
+from external_integrations.outbox import WaitlistOutbox
+from external_integrations.postgrest import PostgrestClient, PostgrestError
+from external_integrations.waitlist import BatcherClosed, WaitlistBatcher, WaitlistSubmission, create_waitlist_router
+from tests.fake_postgrest import FakePostgrest
+
+
+def submission(i, **overrides):
+    row = {
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "email": f"ada{i}@university.edu",
+        "phone_number": "+1 555 0100",
+        "institution": "Test University",
+        "role": "Admissions Director",
+        "student_count": "1,000 - 5,000",
+    }
+    row.update(overrides)
+    return row
+
+
+def make_client(fake):
+    return PostgrestClient("http://postgrest.local", "service-key", transport=httpx.ASGITransport(app=fake.app))
+
+
+@pytest.mark.anyio
+async def test_concurrent_submissions_are_coalesced():
+    fake = FakePostgrest()
+    postgrest = make_client(fake)
+    batcher = WaitlistBatcher(postgrest, max_batch=50, max_delay=0.05)
+    batcher.start()
+
+    await asyncio.gather(*(batcher.submit(submission(i)) for i in range(20)))
+    await batcher.close()
+    await postgrest.aclose()
+
+    assert len(fake.rows) == 20
+    assert len(fake.requests) == 1
+    assert fake.requests[0]["prefer"] == "return=minimal"
+
+
+@pytest.mark.anyio
+async def test_bad_row_does_not_fail_the_batch():
+    fake = FakePostgrest()
+    fake.rows.append(submission(0))
+    postgrest = make_client(fake)
+    batcher = WaitlistBatcher(postgrest, max_batch=50, max_delay=0.05)
+    batcher.start()
+
+    results = await asyncio.gather(*(batcher.submit(submission(i)) for i in range(3)), return_exceptions=True)
+    await batcher.close()
+    await postgrest.aclose()
+
+    assert isinstance(results[0], PostgrestError) and results[0].status_code == 409
+    assert results[1:] == [None, None]
+    assert len(fake.rows) == 3
+
+
+@pytest.mark.anyio
+async def test_retryable_failures_are_retried():
+    fake = FakePostgrest()
+    postgrest = make_client(fake)
+    batcher = WaitlistBatcher(postgrest, max_delay=0.001, max_backoff=0.01)
+    batcher.start()
+
+    fake.fail_next = [503, 429]
+    await batcher.submit(submission(1))
+    await batcher.close()
+    await postgrest.aclose()
+
+    assert [row["email"] for row in fake.rows] == ["ada1@university.edu"]
+    assert batcher.stats()["failed"] == 0
+
+
+@pytest.mark.anyio
+async def test_submit_after_close_fails_fast():
+    postgrest = make_client(FakePostgrest())
+    batcher = WaitlistBatcher(postgrest)
+    batcher.start()
+    await batcher.close()
+    await postgrest.aclose()
+
+    with pytest.raises(BatcherClosed):
+        await asyncio.wait_for(batcher.submit(submission(1)), 1)
+
+
+def test_rows_leave_created_at_to_the_table_default():
+    row = WaitlistSubmission(**submission(1, email="Ada@University.edu")).to_row()
+    assert "created_at" not in row
+    assert row["email"] == "ada@university.edu"
+
+
+def test_waitlist_route_validates_and_forwards():
+    fake = FakePostgrest()
+    postgrest = make_client(fake)
+    batcher = WaitlistBatcher(postgrest, max_delay=0.001)
+    app = FastAPI()
+    app.include_router(create_waitlist_router())
+    app.state.waitlist_batcher = batcher
+    app.add_event_handler("startup", batcher.start)
+    app.add_event_handler("shutdown", batcher.close)
+
+    with TestClient(app) as client:
+        assert client.post("/api/waitlist", json=submission(1, email="Ada@University.edu")).status_code == 201
+        assert client.post("/api/waitlist", json=submission(2, email="ada@university.edu")).status_code == 409
+        assert client.post("/api/waitlist", json=submission(3, email="not-an-email")).status_code == 422
+
+    assert [row["email"] for row in fake.rows] == ["ada@university.edu"]
+
+
+def test_waitlist_route_without_supabase_is_unavailable():
+    app = FastAPI()
+    app.include_router(create_waitlist_router())
+    with TestClient(app) as client:
+        assert client.post("/api/waitlist", json=submission(1)).status_code == 503
+
+
+def test_known_duplicates_are_answered_locally():
+    fake = FakePostgrest()
+    postgrest = make_client(fake)
+    batcher = WaitlistBatcher(postgrest, max_delay=0.001)
+    index = EmailIndex()
+    index.add("known@university.edu")
+    app = FastAPI()
+    app.include_router(create_waitlist_router())
+    app.state.waitlist_batcher = batcher
+    app.state.email_index = index
+    app.add_event_handler("startup", batcher.start)
+    app.add_event_handler("shutdown", batcher.close)
+
+    with TestClient(app) as client:
+        assert client.post("/api/waitlist", json=submission(1, email="Known@University.edu")).status_code == 409
+        assert client.post("/api/waitlist", json=submission(2)).status_code == 201
+        assert client.post("/api/waitlist", json=submission(2)).status_code == 409
+
+    # Neither duplicate reached PostgREST.
+    assert len(fake.requests) == 1
+
+    ignoring = FastAPI()
+    ignoring.include_router(create_waitlist_router(duplicates="ignore"))
+    ignoring.state.email_index = index
+    with TestClient(ignoring) as client:
+        response = client.post("/api/waitlist", json=submission(2))
+    assert response.status_code == 200
+    assert response.json() == {"status": "exists"}
+
+
+def test_queued_submissions_are_indexed_only_once_delivered(tmp_path):
+    fake = FakePostgrest()
+    postgrest = make_client(fake)
+    index = EmailIndex()
+    outbox = WaitlistOutbox(
+        str(tmp_path / "outbox.db"),
+        postgrest,
+        push_retries=1,
+        on_delivered=lambda rows: [index.add(row["email"]) for row in rows],
+        on_dead_letter=lambda rows: [index.remove(row["email"]) for row in rows],
+    )
+    app = FastAPI()
+    app.include_router(create_waitlist_router())
+    app.state.waitlist_outbox = outbox
+    app.state.email_index = index
+    app.add_event_handler("startup", outbox.open)
+    app.add_event_handler("shutdown", outbox.close)
+
+    with TestClient(app) as client:
+        assert client.post("/api/waitlist", json=submission(1)).status_code == 202
+        # Not delivered yet, so a retry is queued again rather than rejected.
+        assert client.post("/api/waitlist", json=submission(1)).status_code == 202
+        assert index.contains("ada1@university.edu") is False
+
+        fake.fail_next = [400, 400, 400]
+        client.portal.call(outbox.drain_once)
+        assert index.contains("ada1@university.edu") is False
+        assert client.post("/api/waitlist", json=submission(1)).status_code == 202
+        client.portal.call(outbox.drain_once)
+        assert index.contains("ada1@university.edu") is True
+        assert client.post("/api/waitlist", json=submission(1)).status_code == 409
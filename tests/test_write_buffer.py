@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from write_buffer import BufferFull, WriteBehindBuffer
+
+
+class FakeCollection:
+    def __init__(self, delay=0.0, failures=0):
+        self.batches = []
+        self.delay = delay
+        self.failures = failures
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("primary unreachable")
+        self.batches.append(list(documents))
+
+        class Result:
+            inserted_ids = [doc["id"] for doc in documents]
+
+        return Result()
+
+
+@pytest.mark.anyio
+async def test_concurrent_submits_are_coalesced():
+    collection = FakeCollection()
+    buffer = WriteBehindBuffer(collection, max_batch=10, max_delay=0.05)
+    buffer.start()
+    await asyncio.gather(*(buffer.submit({"id": str(i)}) for i in range(25)))
+    await buffer.close()
+
+    assert [len(batch) for batch in collection.batches] == [10, 10, 5]
+    stats = buffer.stats()
+    assert stats["flushed_documents"] == 25
+    assert stats["queue_depth"] == 0
+    assert stats["flush_count"] == 3
+
+
+@pytest.mark.anyio
+async def test_partial_batch_flushes_after_max_delay():
+    collection = FakeCollection()
+    buffer = WriteBehindBuffer(collection, max_batch=100, max_delay=0.01)
+    buffer.start()
+    await buffer.submit({"id": "a"})
+    await asyncio.sleep(0.05)
+
+    assert collection.batches == [[{"id": "a"}]]
+    await buffer.close()
+
+
+@pytest.mark.anyio
+async def test_full_queue_applies_backpressure():
+    buffer = WriteBehindBuffer(FakeCollection(), max_queue=1, put_timeout=0.01)
+    await buffer.submit({"id": "a"})
+    with pytest.raises(BufferFull):
+        await buffer.submit({"id": "b"})
+
+
+@pytest.mark.anyio
+async def test_failed_flush_is_retried_then_counted():
+    collection = FakeCollection(failures=2)
+    buffer = WriteBehindBuffer(collection, max_delay=0.001, flush_attempts=3, retry_backoff=0.001)
+    buffer.start()
+    await buffer.submit({"id": "a"})
+    await buffer.close()
+    assert collection.batches == [[{"id": "a"}]]
+    assert buffer.stats()["retried_flushes"] == 2
+
+    collection = FakeCollection(failures=3)
+    buffer = WriteBehindBuffer(collection, max_delay=0.001, flush_attempts=3, retry_backoff=0.001)
+    buffer.start()
+    await buffer.submit({"id": "b"})
+    await buffer.close()
+    assert collection.batches == []
+    assert buffer.stats()["failed_documents"] == 1
+
+
+@pytest.mark.anyio
+async def test_failing_on_flush_does_not_stop_the_writer():
+    calls = []
+
+    async def on_flush():
+        calls.append(1)
+        raise ConnectionError("redis down")
+
+    collection = FakeCollection()
+    buffer = WriteBehindBuffer(collection, max_delay=0.001, on_flush=on_flush)
+    buffer.start()
+    await buffer.submit({"id": "a"})
+    await asyncio.sleep(0.02)
+    await buffer.submit({"id": "b"})
+    await buffer.close()
+
+    assert collection.batches == [[{"id": "a"}], [{"id": "b"}]]
+    assert len(calls) == 2